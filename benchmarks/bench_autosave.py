@@ -0,0 +1,46 @@
+"""自動保存でメインスレッドを占有する時間のベンチマーク。
+
+従来の save_with_revision()（保存用の辞書全体の構築）と、不変のスナップショットの取得を比較する。
+スナップショットは初回（全ノードのレコード作成）と、1ノードの編集後の2回目を計測する。
+
+    python -m benchmarks.bench_autosave [ノード数]
+"""
+import sys
+import time
+
+from py_mind_memo.models import MindMapModel
+
+IMAGE_DATA = "iVBORw0KGgo" * 2000
+
+
+def build_model(node_count: int) -> MindMapModel:
+    model = MindMapModel("Benchmark Root")
+    with model.transaction():
+        parents = [model.root]
+        for i in range(node_count - 1):
+            node = model.add_node(parents[i // 5], f"Topic {i}")
+            if i % 100 == 0:
+                node.image_data = IMAGE_DATA
+            parents.append(node)
+    return model, parents
+
+
+def measure(func) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(node_count: int = 50000):
+    model, nodes = build_model(node_count)
+    print(f"nodes: {node_count}")
+    print(f"save_with_revision():        {measure(model.save_with_revision):8.2f} ms (main thread)")
+    print(f"snapshot() first:            {measure(model.snapshot):8.2f} ms (main thread)")
+    nodes[len(nodes) // 2].text = "Edited"
+    print(f"snapshot() after 1 edit:     {measure(model.snapshot):8.2f} ms (main thread)")
+    snapshot = model.snapshot()
+    print(f"snapshot.to_dict():          {measure(snapshot.to_dict):8.2f} ms (worker thread)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,47 @@
+"""画像の多いマップを読み込んだ後のメモリ使用量のベンチマーク。
+
+画像をノードごとに埋め込んだ形式（内容はすべて異なる）のデータを読み込み、保存データを破棄した後に
+モデルが保持しているメモリ量を tracemalloc で計測する。
+
+    python -m benchmarks.bench_image_memory [画像数] [画像1つあたりの KiB]
+"""
+import base64
+import gc
+import os
+import sys
+import tracemalloc
+
+from py_mind_memo.models import MindMapModel
+
+
+def build_data(image_count: int, image_kib: int) -> dict:
+    children = []
+    for i in range(image_count):
+        children.append({
+            "id": f"n{i}", "text": f"Image {i}", "children": [],
+            "image_data": base64.b64encode(os.urandom(image_kib * 1024)).decode("ascii"),
+        })
+    return {"root": {"id": "root", "text": "Root", "children": children}, "references": []}
+
+
+def run(image_count: int = 500, image_kib: int = 30):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    # 保存データの文字列をモデルがそのまま保持する場合も計測されるよう、構築から計測する
+    data = build_data(image_count, image_kib)
+    model = MindMapModel()
+    model.load(data)
+    del data
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    raw = image_count * image_kib * 1024
+    print(f"images: {image_count} x {image_kib} KiB (raw {raw / 1024 / 1024:.1f} MiB)")
+    print(f"retained by model: {retained / 1024 / 1024:.1f} MiB ({retained / raw:.2f} x raw)")
+    return model
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
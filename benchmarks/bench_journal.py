@@ -0,0 +1,48 @@
+"""ジャーナルによる自動保存のベンチマーク。
+
+マップの大きさを変えながら、1つのトピックの編集ごとにジャーナルへ追記する時間と記録の大きさを、
+文書全体の書き出し（ストリーミングの JSON 形式）と比較する。
+
+    python -m benchmarks.bench_journal [最大ノード数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_save import build_model
+from py_mind_memo.persistence import PersistenceHandler
+
+EDITS = 200
+
+
+def run(max_nodes: int = 100000):
+    sizes = [n for n in (10000, 50000, 100000, 200000) if n <= max_nodes]
+    print(f"{'nodes':>8} {'journal/edit':>14} {'bytes/edit':>11} {'sync':>9} {'full save':>11}")
+    for node_count in sizes:
+        model = build_model(node_count)
+        handler = PersistenceHandler(model, lambda **kwargs: None)
+        nodes = list(model.walk())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            started = time.perf_counter()
+            handler._write_to_file(path)
+            full = time.perf_counter() - started
+            journal = handler.journal
+            size = journal.size
+            started = time.perf_counter()
+            for i in range(EDITS):
+                # 変更の配信ごとに1件の記録を追記する
+                nodes[(i * 7919) % len(nodes)].text = f"Edited {i}"
+            per_edit = (time.perf_counter() - started) / EDITS
+            record_bytes = (journal.size - size) / EDITS
+            started = time.perf_counter()
+            journal.sync()
+            sync = time.perf_counter() - started
+            handler.discard_journal()
+        print(f"{node_count:>8} {per_edit * 1000:>11.3f} ms {record_bytes:>11.0f} {sync * 1000:>6.2f} ms "
+              f"{full * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
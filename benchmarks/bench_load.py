@@ -0,0 +1,64 @@
+"""ファイル読み込みの時間とピークメモリのベンチマーク。
+
+従来の経路（json.load で辞書全体を構築し model.load）と、チャンク単位で読みながらノードを
+直接構築し、画像データをファイル内の位置として保持するストリーミング経路を比較する。
+
+    python -m benchmarks.bench_load [ノード数]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from py_mind_memo.json_loader import load_document
+from py_mind_memo.models import MindMapModel
+from py_mind_memo.persistence import PersistenceHandler
+
+from benchmarks.bench_save import build_model
+
+
+def measure(label: str, func):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms   peak +{(peak - base) / 1024 / 1024:8.1f} MiB"
+          f"   retained +{(current - base) / 1024 / 1024:8.1f} MiB")
+    return result
+
+
+def load_with_json(path: str) -> MindMapModel:
+    model = MindMapModel()
+    with open(path, "r", encoding="utf-8") as f:
+        model.load(json.load(f))
+    return model
+
+
+def load_streaming(path: str) -> MindMapModel:
+    model = MindMapModel()
+    with open(path, "rb") as f:
+        model.load_tree(*load_document(f, path))
+    return model
+
+
+def run(node_count: int = 50000):
+    source = build_model(node_count)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.json")
+        PersistenceHandler(source, lambda **kwargs: None)._perform_write_to_file(path, source.snapshot())
+        del source
+        print(f"nodes: {node_count}, file size: {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+        a = measure("json.load + model.load", lambda: load_with_json(path))
+        del a
+        b = measure("streaming loader", lambda: load_streaming(path))
+        del b
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
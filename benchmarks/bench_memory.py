@@ -0,0 +1,47 @@
+"""モデルのメモリ使用量のベンチマーク。
+
+tracemalloc でノード生成前後の確保量を比較し、ノード1つあたりのバイト数を計測する。
+レイアウト・描画で付与されるキャッシュ（サイズ、サブツリー高さ）も設定した状態で測る。
+
+    python -m benchmarks.bench_memory [ノード数]
+"""
+import sys
+import tracemalloc
+
+from py_mind_memo.models import MindMapModel, Reference
+
+
+def build_model(node_count: int) -> MindMapModel:
+    model = MindMapModel("Benchmark Root")
+    parents = [model.root]
+    i = 0
+    while i < node_count - 1:
+        parent = parents[i // 5]
+        node = model.add_node(parent, f"Topic {i}")
+        # レイアウト・描画後と同じ状態にする
+        node.subtree_height = node.height
+        node._size_cache = (100, 35)
+        node._size_cache_key = (node.text, "Yu Gothic_10", None, None)
+        node._layout_dirty = False
+        parents.append(node)
+        i += 1
+    return model
+
+
+def run(node_count: int = 100000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    model = build_model(node_count)
+    after_nodes = tracemalloc.get_traced_memory()[0]
+    refs = [Reference(model.root.id, model.root.id) for _ in range(node_count // 10)]
+    after_refs = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"nodes: {node_count}")
+    print(f"bytes per node (incl. index, text, id): {(after_nodes - before) / node_count:.0f}")
+    print(f"bytes per reference: {(after_refs - after_nodes) / len(refs):.0f}")
+    return model, refs
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
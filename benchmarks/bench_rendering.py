@@ -0,0 +1,101 @@
+"""描画処理のベンチマーク。
+
+Tk の表示環境がなくても実行できるよう、呼び出し回数を数えるダミーの Canvas とフォントを使い、
+ノード1つあたりの Tcl 呼び出し数（Canvas 操作とフォント測定）とキャンバスアイテム数を計測する。
+
+    python -m benchmarks.bench_rendering [ノード数]
+"""
+import sys
+import time
+from collections import Counter
+
+from py_mind_memo.graphics import GraphicsEngine
+from py_mind_memo.layout import LayoutEngine
+from py_mind_memo.models import MindMapModel
+
+
+class CountingCanvas:
+    """呼び出されたメソッドを数え、生成されたアイテム数を追跡するダミー Canvas"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.live_items = set()
+        self._next_id = 1
+
+    def _create(self, *args, **kwargs):
+        item = self._next_id
+        self._next_id += 1
+        self.live_items.add(item)
+        return item
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.calls[name] += 1
+            if name.startswith("create_"):
+                return self._create()
+            if name == "delete":
+                for item in args:
+                    self.live_items.discard(item)
+            if name == "bbox":
+                return (0, 0, 40, 16)
+            return None
+        return method
+
+
+class CountingFont:
+    """文字数に比例した幅を返すダミーフォント"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def measure(self, text):
+        self.calls["font.measure"] += 1
+        return 7 * len(text)
+
+    def metrics(self, name):
+        self.calls["font.metrics"] += 1
+        return 16
+
+
+def build_model(node_count: int) -> MindMapModel:
+    model = MindMapModel("Benchmark Root")
+    parents = [model.root]
+    i = 0
+    while i < node_count - 1:
+        parent = parents[i // 5]
+        parents.append(model.add_node(parent, f"Topic {i} <b>bold</b> テキスト"))
+        i += 1
+    return model
+
+
+def run(node_count: int = 2000):
+    model = build_model(node_count)
+    canvas = CountingCanvas()
+    graphics = GraphicsEngine(canvas)
+    font = CountingFont(canvas.calls)
+    graphics._get_font = lambda family, size, style: font
+    graphics.measurer._get_font = graphics._get_font
+    LayoutEngine().apply_layout(model, graphics, 5000, 5000)
+
+    canvas.calls.clear()
+    start = time.perf_counter()
+    graphics.begin_frame()
+    stack = [model.root]
+    while stack:
+        node = stack.pop()
+        graphics.render_node(node)
+        stack.extend(node.children)
+    graphics.end_frame()
+    elapsed = time.perf_counter() - start
+
+    total_calls = sum(canvas.calls.values())
+    print(f"nodes: {node_count}")
+    print(f"draw time: {elapsed * 1000:.1f} ms")
+    print(f"Tcl calls per node: {total_calls / node_count:.1f}")
+    print(f"canvas items per node: {len(canvas.live_items) / node_count:.1f}")
+    for name, count in canvas.calls.most_common():
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,64 @@
+"""ファイル保存のピークメモリと時間のベンチマーク。
+
+従来の経路（model.save() で辞書全体を構築し json.dump(indent=4)）と、スナップショットを
+ツリーを辿りながら書き出すストリーミング経路（空白なし / indent=4）、コンテナ形式（.pmm）を比較する。
+
+    python -m benchmarks.bench_save [ノード数]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from py_mind_memo.models import MindMapModel
+from py_mind_memo.persistence import PersistenceHandler
+
+
+def build_model(node_count: int) -> MindMapModel:
+    model = MindMapModel("Benchmark Root")
+    with model.transaction():
+        parents = [model.root]
+        for i in range(node_count - 1):
+            node = model.add_node(parents[i // 5], f"Topic {i} " + "text " * 5)
+            if i % 50 == 0:
+                # 内容の異なる画像（約 20KB）
+                node.image_data = os.urandom(20 * 1024)
+            parents.append(node)
+    return model
+
+
+def measure(label: str, func):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed * 1000:9.1f} ms   peak +{peak / 1024 / 1024:8.1f} MiB")
+
+
+def run(node_count: int = 50000):
+    model = build_model(node_count)
+    handler = PersistenceHandler(model, lambda **kwargs: None)
+    model.snapshot()  # レコードを作成済みの状態（2回目以降の保存）で比較する
+    print(f"nodes: {node_count}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.json")
+        measure("save() + json.dump(indent=4)", lambda: handler._perform_write_to_file(path, model.save()))
+        size_dict = os.path.getsize(path)
+        measure("stream snapshot (compact)",
+                lambda: handler._perform_write_to_file(path, model.snapshot(), indent=None))
+        size_compact = os.path.getsize(path)
+        measure("stream snapshot (indent=4)", lambda: handler._perform_write_to_file(path, model.snapshot()))
+        container = os.path.join(tmp, "bench.pmm")
+        measure("container (.pmm)", lambda: handler._perform_write_to_file(container, model.snapshot(), indent=None))
+        size_container = os.path.getsize(container)
+    print(f"file size: indent=4 {size_dict / 1024 / 1024:.1f} MiB, compact {size_compact / 1024 / 1024:.1f} MiB, "
+          f"container {size_container / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,49 @@
+"""SQLite 形式の差分保存のベンチマーク。
+
+マップの大きさを変えながら、1つのトピックを編集した後の保存時間を、SQLite 形式（変更された行のみ
+書き込む）とストリーミングの JSON 形式（全体を書き出す）で比較する。
+
+    python -m benchmarks.bench_sqlite_save [最大ノード数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_save import build_model
+from py_mind_memo.persistence import PersistenceHandler
+
+EDITS = 20
+
+
+def measure_edits(handler, model, path, nodes) -> float:
+    """1つのトピックの編集と保存を繰り返し、保存1回あたりの平均時間（秒）を返す"""
+    elapsed = 0.0
+    for i in range(EDITS):
+        nodes[(i * 7919) % len(nodes)].text = f"Edited {i}"
+        snapshot = model.snapshot()
+        started = time.perf_counter()
+        handler._perform_write_to_file(path, snapshot, indent=None)
+        elapsed += time.perf_counter() - started
+    return elapsed / EDITS
+
+
+def run(max_nodes: int = 100000):
+    sizes = [n for n in (10000, 25000, 50000, 100000, 200000) if n <= max_nodes]
+    print(f"{'nodes':>8} {'initial .sqlite':>16} {'edit .sqlite':>14} {'edit .json':>12}")
+    for node_count in sizes:
+        model = build_model(node_count)
+        handler = PersistenceHandler(model, lambda **kwargs: None)
+        nodes = list(model.walk())
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.sqlite")
+            started = time.perf_counter()
+            handler._perform_write_to_file(db_path, model.snapshot(), indent=None)
+            initial = time.perf_counter() - started
+            edit_db = measure_edits(handler, model, db_path, nodes)
+            edit_json = measure_edits(handler, model, os.path.join(tmp, "bench.json"), nodes)
+        print(f"{node_count:>8} {initial * 1000:>13.1f} ms {edit_db * 1000:>11.2f} ms {edit_json * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
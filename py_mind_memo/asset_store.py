@@ -0,0 +1,56 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class AssetStore:
+    """画像・アイコンのデータを内容ハッシュ（Node.image_key 等）をキーとして保持する表。
+
+    同じ内容のデータを使う複数のノードは1つのオブジェクトを共有し、保存時もデータは1回だけ書き出す。
+    参照しているノードの数を数え、参照がなくなったデータは破棄する。
+    """
+
+    def __init__(self):
+        self._assets: Dict[str, object] = {}
+        self._ref_counts: Dict[str, int] = {}
+
+    def intern(self, key: str, data):
+        """データを登録して参照数を増やし、共有するオブジェクトを返す（登録済みなら既存のもの）"""
+        existing = self._assets.get(key)
+        if existing is None:
+            self._assets[key] = existing = data
+            self._ref_counts[key] = 0
+        self._ref_counts[key] += 1
+        return existing
+
+    def release(self, key: str):
+        """参照数を減らし、参照がなくなったデータを破棄する"""
+        count = self._ref_counts.get(key)
+        if count is None:
+            return
+        if count <= 1:
+            del self._ref_counts[key]
+            del self._assets[key]
+        else:
+            self._ref_counts[key] = count - 1
+
+    def get(self, key: str):
+        return self._assets.get(key)
+
+    def ref_count(self, key: str) -> int:
+        return self._ref_counts.get(key, 0)
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        return iter(self._assets.items())
+
+    def copy(self) -> Dict[str, object]:
+        """キーとデータの辞書のコピー（データ自体は共有する）"""
+        return dict(self._assets)
+
+    def clear(self):
+        self._assets.clear()
+        self._ref_counts.clear()
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        return key in self._assets
+
+    def __len__(self) -> int:
+        return len(self._assets)
@@ -17,11 +17,39 @@ EDIT_IMAGE_HEIGHT_BONUS = 4
 ICON_SIZE = 20
 ICON_PADDING = 10
 
+# デコード済み PhotoImage キャッシュの上限（ピクセルバイト数）
+PHOTO_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# ファイルを読み込む際に一度に読み出すバイト数
+LOAD_CHUNK_BYTES = 1024 * 1024
+# 大きなマップを開いた直後に表示するノード数の目安（これを超える深い階層はアイドル時に段階的に表示する）
+REVEAL_INITIAL_NODES = 2000
+# 段階的な表示で、アイドル時の1回あたりにノードの大きさの計算に使う時間（秒）
+REVEAL_STEP_SECONDS = 0.02
+# 変更の記録（ジャーナル）をこの件数ごとにディスクへ同期する（自動保存のタイマーでも同期する）
+JOURNAL_SYNC_RECORDS = 64
+# ジャーナルがこの大きさを超えたら、自動保存で文書全体を書き出してジャーナルを空にする
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+
 # レイアウト関連
 DEFAULT_LOGICAL_CENTER_X = 5000
 DEFAULT_LOGICAL_CENTER_Y = 5000
 CANVAS_MARGIN = 500
 NODE_CLICK_PADDING = 10
+COLLAPSE_ICON_RADIUS = 8
+REFERENCE_HANDLE_RADIUS = 4
+# 参照線のクリック判定で許容する線からの距離
+REFERENCE_HIT_TOLERANCE = 4
+# 表示領域の外側で、先行してキャンバスアイテムを生成しておく範囲
+VIEWPORT_MARGIN = 300
+
+# 元に戻す履歴の上限（保持する変更の概算バイト数と操作数）
+UNDO_MEMORY_BUDGET = 64 * 1024 * 1024
+UNDO_MAX_STEPS = 1000
+# この秒数以内に続いた同じ対象への同種の変更（参照線の制御点のドラッグ等）は1回の操作として扱う
+UNDO_COALESCE_SECONDS = 1.0
+
+# 接続線の曲線の分割数（ルートからのテーパード曲線はこの2倍）
+BEZIER_STEPS = 15
 
 # デザイン関連
 COLOR_TEXT = "#333333"
@@ -35,6 +63,9 @@ FONT_FAMILY = "Yu Gothic"
 FONT_SIZE_NORMAL = 10
 FONT_SIZE_ROOT = 12
 
+# 折り返し結果のメモに保持するテキストレイアウト数
+TEXT_LAYOUT_CACHE_SIZE = 4096
+
 BRANCH_COLORS = [
     "#FF9D48", # Orange
     "#FF6B6B", # Red
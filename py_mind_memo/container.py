@@ -0,0 +1,115 @@
+import os
+import re
+import struct
+import time
+import zipfile
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from .constants import LOAD_CHUNK_BYTES
+from .json_loader import LoadError, load_document
+from .json_stream import write_snapshot
+from .lazy_payload import LazyPayload
+from .models import Node, Reference
+from .snapshot import ModelSnapshot
+
+# コンテナ形式（.pmm）は ZIP ファイルで、ツリーの構造を保存形式の JSON（"assets" を除いたもの）として
+# STRUCTURE_MEMBER に、画像データを内容ハッシュごとに1つの PNG ファイルとして assets/ に格納する。
+CONTAINER_SUFFIX = ".pmm"
+STRUCTURE_MEMBER = "document.json"
+_ASSET_MEMBER = re.compile(r"assets/([0-9a-f]{24})\.png\Z")
+
+# ZIP のローカルファイルヘッダー（ファイル名の長さと拡張フィールドの長さは 26 バイト目から）
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def is_container_path(file_path: str) -> bool:
+    """ファイル名からコンテナ形式で保存・読み込みするかを判定する"""
+    return file_path.lower().endswith(CONTAINER_SUFFIX)
+
+
+def asset_member(key: str) -> str:
+    return f"assets/{key}.png"
+
+
+def write_container(snapshot: ModelSnapshot, file: BinaryIO, indent: Optional[int] = None
+                    ) -> List[Tuple[LazyPayload, int, int, bool]]:
+    """スナップショットをコンテナ形式で file（シーク可能なバイナリファイル）に書き出す。
+
+    ツリーの構造は圧縮し、既に圧縮されている PNG は無圧縮のまま格納する。コンテナ内の画像を指す
+    遅延データはデコードも再圧縮もせずにバイト列をそのまま複製する。
+    遅延読み込みの画像データと、その PNG を書き出した位置・長さの組のリスト（replace_file() に渡す形式）を返す。
+    """
+    date_time = time.localtime()[:6]
+    moves: List[Tuple[LazyPayload, int, int, bool]] = []
+    with zipfile.ZipFile(file, "w") as archive:
+        info = zipfile.ZipInfo(STRUCTURE_MEMBER, date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, "w", force_zip64=True) as member:
+            write_snapshot(snapshot, member.write, indent=indent, assets=False)
+        for key, payload in snapshot.assets.items():
+            data = payload.load() if isinstance(payload, LazyPayload) else payload
+            info = zipfile.ZipInfo(asset_member(key), date_time)
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = len(data)
+            with archive.open(info, "w") as member:
+                # ローカルヘッダーの直後から PNG のバイト列がそのまま並ぶ
+                offset = file.tell()
+                member.write(data)
+            if isinstance(payload, LazyPayload) and payload.relocatable:
+                moves.append((payload, offset, len(data), False))
+    return moves
+
+
+def _read_assets(archive: zipfile.ZipFile, file_path: str) -> Dict[str, Union[LazyPayload, bytes]]:
+    """画像メンバーを内容ハッシュごとに返す。無圧縮のメンバーは読み込まずにファイル内の位置だけを記録する"""
+    assets: Dict[str, Union[LazyPayload, bytes]] = {}
+    with open(file_path, "rb") as f:
+        for info in archive.infolist():
+            match = _ASSET_MEMBER.match(info.filename)
+            if match is None:
+                continue
+            key = match.group(1)
+            if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+                # 他のツールで圧縮・暗号化されたメンバーはここで展開する
+                assets[key] = archive.read(info)
+                continue
+            f.seek(info.header_offset)
+            header = f.read(_LOCAL_HEADER.size)
+            if len(header) != _LOCAL_HEADER.size:
+                raise LoadError(f"Truncated container member: {info.filename}")
+            signature, name_length, extra_length = _LOCAL_HEADER.unpack(header)
+            if signature != _LOCAL_HEADER_SIGNATURE:
+                raise LoadError(f"Bad container member header: {info.filename}")
+            offset = info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+            assets[key] = LazyPayload(file_path, offset, info.file_size, key, encoded=False)
+    return assets
+
+
+def load_container(file_path: str, chunk_size: int = LOAD_CHUNK_BYTES,
+                   progress: Optional[Callable[[int], None]] = None,
+                   is_cancelled: Optional[Callable[[], bool]] = None) -> Tuple[Node, List[Reference]]:
+    """コンテナ形式のファイルを読み込み、ルートノードと参照のリストを返す。
+
+    画像メンバーは描画時に読み込む。progress には読み込んだ位置をファイル全体の大きさに換算して渡す。
+    """
+    try:
+        archive = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile as e:
+        raise LoadError(f"Not a mind map container: {e}")
+    with archive:
+        try:
+            info = archive.getinfo(STRUCTURE_MEMBER)
+        except KeyError:
+            raise LoadError(f"Missing {STRUCTURE_MEMBER} in container")
+        assets = _read_assets(archive, file_path)
+        scaled = None
+        if progress is not None:
+            total = os.path.getsize(file_path)
+            size = max(1, info.file_size)
+
+            def scaled(position):
+                progress(position * total // size)
+        with archive.open(info) as member:
+            # 展開したデータ内の位置はファイル内の位置ではないため、埋め込まれた画像データはメモリに読み込む
+            return load_document(member, None, chunk_size, scaled, is_cancelled, assets)
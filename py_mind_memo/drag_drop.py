@@ -3,7 +3,8 @@ from .models import Node
 
 class DragDropHandler:
     """ノードのドラッグ＆ドロップ移動を管理するクラス"""
-    def __init__(self, canvas, model, graphics, layout_engine, render_callback, find_node_at, logical_center_x, logical_center_y):
+    def __init__(self, canvas, model, graphics, layout_engine, render_callback, find_node_at, logical_center_x, logical_center_y,
+                 scroll_callback=None):
         self.canvas = canvas
         self.model = model
         self.graphics = graphics
@@ -12,6 +13,7 @@ class DragDropHandler:
         self.find_node_at = find_node_at
         self.logical_center_x = logical_center_x
         self.logical_center_y = logical_center_y
+        self.scroll_callback = scroll_callback  # 自動スクロール後の通知（表示領域のアイテム生成用）
         self.drag_data = {}
 
     def start_drag(self, event, node):
@@ -59,13 +61,14 @@ class DragDropHandler:
         
         if target_node and target_node != dropped_node and target_node != dropped_node.parent:
             if not target_node.is_descendant_of(dropped_node) and dropped_node != self.model.root:
-                dropped_node.move_to(target_node)
-                if target_node == self.model.root:
-                    dropped_node.direction = self.model.get_balanced_direction(exclude_node=dropped_node)
-                else:
-                    dropped_node.direction = target_node.direction
-                dropped_node.update_direction_recursive(dropped_node.direction)
-                self.model.is_modified = True
+                with self.model.transaction():
+                    dropped_node.move_to(target_node)
+                    if target_node == self.model.root:
+                        dropped_node.direction = self.model.get_balanced_direction(exclude_node=dropped_node)
+                    else:
+                        dropped_node.direction = target_node.direction
+                    dropped_node.update_direction_recursive(dropped_node.direction)
+                    self.model.is_modified = True
                 self.render_callback()
         
         self.drag_data = {}
@@ -79,6 +82,8 @@ class DragDropHandler:
             elif event.x > cv_w - margin: self.canvas.xview_scroll(1, "units")
             if event.y < margin: self.canvas.yview_scroll(-1, "units")
             elif event.y > cv_h - margin: self.canvas.yview_scroll(1, "units")
+            if self.scroll_callback:
+                self.scroll_callback()
 
     def show_move_shadow(self, dragged_node: Node, target_node: Node):
         if self.drag_data.get("shadow_target_id") == target_node.id: return
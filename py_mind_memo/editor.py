@@ -1,9 +1,8 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import base64
 from .models import Node
 from .graphics import GraphicsEngine
-from .image_utils import calculate_subsample, load_image_as_base64
+from .image_utils import calculate_subsample, decode_image_data
 from .constants import (
     MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT,
     EDIT_WINDOW_MIN_WIDTH, EDIT_WINDOW_PADDING_X,
@@ -56,20 +55,22 @@ class ImageHandler:
         except tk.TclError as e:
             raise ValueError(f"Failed to load image: {e}")
 
-    def get_photo_from_base64(self, base64_data: str) -> tk.PhotoImage:
-        """Base64文字列から PhotoImage を生成する"""
+    def get_photo_from_bytes(self, data: bytes) -> tk.PhotoImage:
+        """画像データ（PNG のバイト列）から PhotoImage を生成する"""
         try:
-            img_data = base64.b64decode(base64_data)
-            photo = tk.PhotoImage(data=img_data)
+            photo = tk.PhotoImage(data=data)
             self.add_to_cache(photo)
             return photo
-        except (base64.binascii.Error, tk.TclError) as e:
+        except tk.TclError as e:
             raise ValueError(f"Failed to decode image data: {e}")
 
-    def base64_from_photo(self, photo: tk.PhotoImage) -> str:
-        """PhotoImageからBase64文字列を生成する"""
+    def png_from_photo(self, photo: tk.PhotoImage) -> bytes:
+        """PhotoImageから PNG のバイト列を生成する"""
         raw_data = photo.tk.call(photo.name, 'data', '-format', 'png')
-        return base64.b64encode(raw_data).decode('utf-8')
+        if isinstance(raw_data, str):
+            # Tk のバージョンによっては Base64 文字列で返される
+            return decode_image_data(raw_data)
+        return bytes(raw_data)
 
 class NodeEditor:
     """ノードのテキスト編集（インライン編集）を管理するクラス"""
@@ -101,7 +102,7 @@ class NodeEditor:
         lines = node.text.count("\n") + 1
         height = min(10, max(1, lines))
         
-        if node.image_data:
+        if node.image_key is not None:
             height += EDIT_IMAGE_HEIGHT_BONUS
 
         entry = tk.Text(self.canvas, font=self.graphics.font, 
@@ -109,12 +110,12 @@ class NodeEditor:
                          relief="flat", highlightbackground="#0078d7", highlightthickness=2,
                          padx=5, pady=5)
         
-        if node.image_data:
+        if node.image_key is not None:
             try:
-                photo = self.image_handler.get_photo_from_base64(node.image_data)
+                photo = self.image_handler.get_photo_from_bytes(node.image_data)
                 entry.image_create("1.0", image=photo)
-            except ValueError as e:
-                # 画像のデコード失敗時はエラー内容をコンソールに出力して継続
+            except (ValueError, OSError) as e:
+                # 画像のデコード（保存ファイルからの読み込み）失敗時はエラー内容をコンソールに出力して継続
                 print(f"Warning: {e}")
                 pass
 
@@ -179,9 +180,11 @@ class NodeEditor:
             self.editing_entry.image_create("1.0", image=photo)
             
             # モデルの更新（この時点では一時的、finish_editで確定）
-            node.image_data = self.image_handler.base64_from_photo(photo)
-            node.image_path = file_path
-            self.model.is_modified = True
+            image_data = self.image_handler.png_from_photo(photo)
+            with self.model.transaction():
+                node.image_data = image_data
+                node.image_path = file_path
+                self.model.is_modified = True
         except ValueError as e:
             messagebox.showerror("Error", str(e))
         except tk.TclError as e:
@@ -205,16 +208,18 @@ class NodeEditor:
         
         # エディタ内に画像が残っているかチェック
         has_image = len(self.editing_entry.image_names()) > 0
-        image_was_present = bool(target_node.image_data or target_node.image_path)
+        image_was_present = bool(target_node.image_key or target_node.image_path)
         
-        if not has_image and image_was_present:
-            target_node.image_data = None
-            target_node.image_path = None
-            self.model.is_modified = True
-
-        if new_text is not None and new_text != target_node.text:
-            target_node.text = new_text
-            self.model.is_modified = True
+        # 画像の削除とテキストの変更は1回の操作として取り消せるようにする
+        with self.model.transaction():
+            if not has_image and image_was_present:
+                target_node.image_data = None
+                target_node.image_path = None
+                self.model.is_modified = True
+
+            if new_text is not None and new_text != target_node.text:
+                target_node.text = new_text
+                self.model.is_modified = True
             
         self._cleanup()
         self.on_finish()
@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, List, Optional
+
+
+class ChangeType(Enum):
+    """モデルの変更の種類"""
+    NODE_ADDED = "node_added"            # node が parent の index 番目に追加された
+    NODE_REMOVED = "node_removed"        # node が parent の index 番目から削除された
+    NODE_MOVED = "node_moved"            # node が old_parent から parent の index 番目へ移動した。
+                                         # old_value は移動前の (index, color, direction)
+    TEXT_CHANGED = "text_changed"        # old_value -> new_value
+    MEDIA_CHANGED = "media_changed"      # attribute は "image_data", "image_path", "icon_data", "icon_path"
+    COLLAPSED_TOGGLED = "collapsed_toggled"
+    REORDERED = "reordered"              # 兄弟内の位置が old_value -> new_value に変わった
+    REFERENCE_CHANGED = "reference_changed"  # attribute は "added", "removed", "control_points", "reset"
+                                             # （"reset" の old_value は変更前の参照のリスト）
+    MODEL_RESET = "model_reset"          # ルートの差し替え（ファイルの読み込み等）。old_value は旧ルート
+
+
+class ChangeEvent:
+    """1回の変更を表すイベント"""
+    __slots__ = ("type", "node", "parent", "old_parent", "index", "attribute",
+                 "old_value", "new_value", "reference")
+
+    def __init__(self, type: ChangeType, node=None, parent=None, old_parent=None, index: Optional[int] = None,
+                 attribute: Optional[str] = None, old_value: Any = None, new_value: Any = None, reference=None):
+        self.type = type
+        self.node = node
+        self.parent = parent
+        self.old_parent = old_parent
+        self.index = index
+        self.attribute = attribute
+        self.old_value = old_value
+        self.new_value = new_value
+        self.reference = reference
+
+    def __repr__(self):
+        target = self.reference.id if self.reference is not None else (self.node.id if self.node is not None else None)
+        return f"ChangeEvent({self.type.value}, {target})"
+
+
+ChangeListener = Callable[[List[ChangeEvent]], None]
+
+
+class ChangeBus:
+    """変更イベントをリスナーに配信する。
+
+    リスナーはイベントのリストを受け取る。batch() の内側で発生したイベントは、
+    最も外側の batch() を抜けた時点でまとめて1回だけ配信される。
+    """
+
+    def __init__(self):
+        self._listeners: List[ChangeListener] = []
+        self._depth = 0
+        self._pending: List[ChangeEvent] = []
+        self._recording = 0  # トランザクション等、リスナーがいなくてもイベントを保持する必要がある数
+        self._muted = 0
+
+    @property
+    def active(self) -> bool:
+        """イベントを生成する必要があるか（不要な場合は生成自体を省く）"""
+        return not self._muted and (bool(self._listeners) or self._recording > 0)
+
+    def subscribe(self, listener: ChangeListener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def emit(self, event: ChangeEvent):
+        if not self.active:
+            return
+        if self._depth:
+            self._pending.append(event)
+        else:
+            self._deliver([event])
+
+    @contextmanager
+    def batch(self):
+        """内側で発生したイベントをまとめて配信する"""
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._pending:
+                events, self._pending = self._pending, []
+                self._deliver(events)
+
+    @contextmanager
+    def recording(self):
+        """内側で発生したイベントを、リスナーの有無に関わらず配信待ちとして保持する。
+
+        保持を開始した時点の配信待ちイベント数を返すので、take_pending() で以降のイベントを取り出せる。
+        """
+        self._recording += 1
+        try:
+            with self.batch():
+                yield len(self._pending)
+        finally:
+            self._recording -= 1
+
+    def take_pending(self, start: int = 0) -> List[ChangeEvent]:
+        """配信待ちのイベントのうち start 番目以降を取り出す（取り出したイベントは配信されない）"""
+        events = self._pending[start:]
+        del self._pending[start:]
+        return events
+
+    @contextmanager
+    def muted(self):
+        """内側で発生したイベントを破棄する（変更の取り消し処理など）"""
+        self._muted += 1
+        try:
+            yield
+        finally:
+            self._muted -= 1
+
+    def _deliver(self, events: List[ChangeEvent]):
+        for listener in list(self._listeners):
+            listener(events)
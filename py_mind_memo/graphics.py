@@ -1,11 +1,13 @@
 import tkinter as tk
 import tkinter.font as tkfont
-import base64
 import re
-import hashlib
 import logging
-from typing import Dict
+from typing import Dict, Optional
 from .models import Node, Reference
+from .image_utils import IMAGE_HEADER_BYTES, image_size
+from .lazy_payload import LazyPayload
+from .photo_cache import PhotoImageCache
+from .text_metrics import TextLayout, TextMeasurer
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +15,8 @@ from .constants import (
     COLOR_TEXT, COLOR_ROOT_OUTLINE, COLOR_ROOT_FILL,
     COLOR_HIGHLIGHT_FILL, COLOR_HIGHLIGHT_OUTLINE,
     FONT_FAMILY, FONT_SIZE_NORMAL, FONT_SIZE_ROOT,
-    BRANCH_COLORS, IMAGE_SPACING, ICON_SIZE, ICON_PADDING
+    BRANCH_COLORS, IMAGE_SPACING, ICON_SIZE, ICON_PADDING, BEZIER_STEPS,
+    COLLAPSE_ICON_RADIUS, REFERENCE_HANDLE_RADIUS
 )
 
 class GraphicsEngine:
@@ -29,13 +32,28 @@ class GraphicsEngine:
         self.line_items: Dict[str, list] = {} 
         self.image_items: Dict[str, int] = {}
         self.reference_items: Dict[str, list] = {} # ref_id -> list of item ids (line and handles)
-        self.image_cache: Dict[str, tk.PhotoImage] = {}  # GC防止用のキャッシュ
-        self.icon_cache: Dict[str, tk.PhotoImage] = {}
+        # 内容ハッシュをキーとする PhotoImage の共有キャッシュ（render をまたいで保持）
+        self.photo_cache = PhotoImageCache()
+        # 描画中のノードだけの node_id -> (PhotoImage, content key)。GC防止も兼ねる。
+        # 計測だけのノードは保持しないため、共有キャッシュの上限はレイアウト中も保たれる
+        self.image_cache: Dict[str, tuple] = {}
+        self.icon_cache: Dict[str, tuple] = {}
+        # 内容ハッシュ -> 画像の表示サイズ (幅, 高さ)。大きさが分からない画像は空のタプル
+        self._media_sizes: Dict[str, tuple] = {}
         self.icon_items: Dict[str, int] = {}
+
+        # 保持モード（retained mode）描画用の状態。
+        # True の場合、フレーム間でキャンバスアイテムを保持し、変化した部分のみ更新する
+        self.retained = True
+        self._node_states: Dict[str, tuple] = {}        # node_id -> (内容シグネチャ, x, y)
+        self._connection_states: Dict[str, tuple] = {}  # node_id -> 接続線シグネチャ
+        self._reference_states: Dict[str, tuple] = {}   # ref_id -> 参照線シグネチャ
+        self._frame_node_ids = set()
+        self._frame_ref_ids = set()
         
-        # 定数
-        self.BEZIER_STEPS = 15
-        self.TAPERED_BEZIER_STEPS = 30
+        # 接続線の曲線の分割数（set_curve_resolution で変更可能）
+        self.BEZIER_STEPS = BEZIER_STEPS
+        self.TAPERED_BEZIER_STEPS = BEZIER_STEPS * 2
         
         # デザイン設定
         self.text_color = COLOR_TEXT
@@ -45,6 +63,8 @@ class GraphicsEngine:
         
         self.branch_colors = BRANCH_COLORS
         self._font_cache = {}
+        # グリフ幅表と折り返し結果のメモ（サイズ計算と描画で共有する）
+        self.measurer = TextMeasurer(self._get_font)
 
     def _get_font(self, family, size, style):
         """キャッシュを利用してフォントオブジェクトを取得または作成する"""
@@ -124,156 +144,109 @@ class GraphicsEngine:
         リッチテキストを指定された幅で折り返す。
         戻り値は行のリスト。各行はセグメント (text, font_style, underline, color) のリスト。
         """
+        return self._layout_rich_text(text, base_font, max_width).lines
+
+    def _layout_rich_text(self, text: str, base_font, max_width: int) -> TextLayout:
+        """折り返しと寸法計算の結果を (text, font, max_width) 単位でメモ化して返す"""
+        key = (text, base_font[0], base_font[1], max_width)
+        layout = self.measurer.get_layout(key)
+        if layout is None:
+            layout = self._build_text_layout(text, base_font, max_width)
+            self.measurer.put_layout(key, layout)
+        return layout
+
+    def _build_text_layout(self, text: str, base_font, max_width: int) -> TextLayout:
         paragraphs = text.split("\n")
         all_wrapped_lines = []
+        all_seg_widths = []
         
         family = base_font[0]
         size = base_font[1]
-        
-        def get_font(style):
-            return self._get_font(family, size, style)
+        measurer = self.measurer
 
         for p in paragraphs:
             segments = self._parse_markup(p)
             if not segments:
                 all_wrapped_lines.append([])
+                all_seg_widths.append([])
                 continue
                 
             current_line_segments = []
+            current_seg_widths = []
             current_line_width = 0
             
             for txt, style, underline, color in segments:
-                font_obj = get_font(style)
+                font_key = (family, size, style)
                 
                 # 文字単位で分割（日本語対応のため）
                 # より高度にするなら単語単位が良いが、まずは確実な文字単位
                 pending_txt = ""
+                pending_w = 0
                 for char in txt:
-                    char_w = font_obj.measure(char)
+                    char_w = measurer.char_width(font_key, char)
                     if current_line_width + char_w > max_width and current_line_segments or (current_line_width + char_w > max_width and pending_txt):
                         # 現在の行を確定
                         if pending_txt:
                             current_line_segments.append((pending_txt, style, underline, color))
+                            current_seg_widths.append(pending_w)
                         all_wrapped_lines.append(current_line_segments)
+                        all_seg_widths.append(current_seg_widths)
                         current_line_segments = []
+                        current_seg_widths = []
                         current_line_width = 0
                         pending_txt = ""
+                        pending_w = 0
                     
                     pending_txt += char
+                    pending_w += char_w
                     current_line_width += char_w
                 
                 if pending_txt:
                     current_line_segments.append((pending_txt, style, underline, color))
+                    current_seg_widths.append(pending_w)
             
             if current_line_segments:
                 all_wrapped_lines.append(current_line_segments)
+                all_seg_widths.append(current_seg_widths)
             elif not p: # 空行の場合
                 all_wrapped_lines.append([])
+                all_seg_widths.append([])
 
-        return all_wrapped_lines
-
-    def _compute_first_line_width(self, wrapped_lines, family, size):
-        for line_segments in wrapped_lines:
-            if not line_segments:
-                continue
-            line_w = 0
-            for txt, style, _, _ in line_segments:
-                line_w += self._get_font(family, size, style).measure(txt)
-            return line_w
-        return 0
+        return TextLayout(all_wrapped_lines, all_seg_widths, measurer, family, size)
 
     def get_text_size(self, node: Node, base_font, max_width: int = 250):
         """マルチラインとマークアップ、自動折り返しを考慮したサイズ計算（画像分も含む）"""
         # キャッシュチェック（テキストとフォント、画像データに変更がなければキャッシュを返す）
-        font_key = f"{base_font[0]}_{base_font[1]}"
-        # image_data 自体をキーに含めると重いため、blake2b でハッシュ化して衝突を防ぐ
-        image_key = (
-            hashlib.blake2b(node.image_data.encode("utf-8"), digest_size=12).hexdigest()
-            if node.image_data else None
-        )
-        icon_data = getattr(node, 'icon_data', None)
-        icon_key = (
-            hashlib.blake2b(icon_data.encode("utf-8"), digest_size=12).hexdigest()
-            if icon_data else None
-        )
+        # フォントはタプルをそのままキーに使い、ノードごとに文字列を生成・保持しない
+        font_key = base_font
+        # 画像データはノードが設定時に計算した内容ハッシュで識別する（ここでは再計算しない）
+        image_key = node.image_key
+        icon_key = node.icon_key
         cache_key = (node.text, font_key, image_key, icon_key)
-        if hasattr(node, '_size_cache') and getattr(node, '_size_cache_key', None) == cache_key:
-            cache_valid = True
-            if node.image_data and node.id not in self.image_cache: cache_valid = False
-            if icon_data and node.id not in self.icon_cache: cache_valid = False
-            if cache_valid:
-                return node._size_cache
+        if node._size_cache_key == cache_key:
+            return node._size_cache
 
-        wrapped_lines = self._wrap_rich_text(node.text, base_font, max_width)
+        text_layout = self._layout_rich_text(node.text, base_font, max_width)
         
-        max_w = 0
-        total_h = 0
-        
-        # 画像のサイズを取得
+        # 画像のサイズを取得（PhotoImage は作らず、画像ヘッダーの大きさを使う）
         img_w = 0
         img_h = 0
-        if node.image_data:
-            current_data_hash = hash(node.image_data)
-            photo = None
-            if node.id in self.image_cache:
-                cached_photo, cached_data_hash = self.image_cache[node.id]
-                if cached_data_hash == current_data_hash: photo = cached_photo
-            
-            if photo is None:
-                try:
-                    photo = tk.PhotoImage(data=base64.b64decode(node.image_data))
-                    self.image_cache[node.id] = (photo, current_data_hash)
-                except Exception as e:
-                    logger.warning("Failed to decode image for node %s (data hash %s): %s", node.id, current_data_hash, e)
-            if photo:
-                img_w = photo.width()
-                img_h = photo.height() + IMAGE_SPACING
+        size = self._get_media_size(node.image_payload, image_key)
+        if size:
+            img_w = size[0]
+            img_h = size[1] + IMAGE_SPACING
         
         # アイコンのサイズを取得
         icon_w = 0
         icon_h = 0
-        if icon_data:
-            current_icon_hash = hash(icon_data)
-            photo = None
-            if node.id in self.icon_cache:
-                cached_photo, cached_data_hash = self.icon_cache[node.id]
-                if cached_data_hash == current_icon_hash: photo = cached_photo
-            
-            if photo is None:
-                try:
-                    photo = tk.PhotoImage(data=base64.b64decode(icon_data))
-                    self.icon_cache[node.id] = (photo, current_icon_hash)
-                except Exception as e:
-                    logger.warning("Failed to decode icon for node %s (icon hash %s): %s", node.id, current_icon_hash, e)
-            if photo:
-                icon_w = photo.width() + IMAGE_SPACING
-                icon_h = photo.height()
-        
-        family = base_font[0]
-        size = base_font[1]
-        
-        max_w = 0
-        total_h = 0
-        first_line_w = self._compute_first_line_width(wrapped_lines, family, size)
-        
-        def get_font_metrics(style):
-            return self._get_font(family, size, style)
-
-        for line_segments in wrapped_lines:
-            line_w = 0
-            line_max_h = 0
-            
-            if not line_segments:
-                total_h += size + 10
-                continue
-
-            for txt, style, underline, color in line_segments:
-                f_obj = get_font_metrics(style)
-                line_w += f_obj.measure(txt)
-                line_max_h = max(line_max_h, f_obj.metrics("linespace"))
-
-            max_w = max(max_w, line_w)
-            total_h += (line_max_h if line_max_h > 0 else size + 10)
+        size = self._get_media_size(node.icon_payload, icon_key)
+        if size:
+            icon_w = size[0] + IMAGE_SPACING
+            icon_h = size[1]
+        
+        max_w = text_layout.block_width
+        total_h = text_layout.height
+        first_line_w = text_layout.first_line_width
             
         result = (max(100, max_w, first_line_w + icon_w + 20, img_w + 20), max(35, total_h + 12 + img_h, icon_h + 12 + img_h))
             
@@ -282,21 +255,53 @@ class GraphicsEngine:
         node._size_cache_key = cache_key
         return result
 
+    def _get_media_size(self, data, key: Optional[str]) -> Optional[tuple]:
+        """画像（またはアイコン）の表示サイズ (幅, 高さ) を返す。
+
+        レイアウトのための計測ではデコードせず、画像ヘッダーから読み取った大きさを内容ハッシュごとに記録する。
+        ヘッダーから大きさが分からない形式だけは共有キャッシュでデコードして求める。
+        """
+        if not data:
+            return None
+        if key is None:
+            key = self.photo_cache.key_for(data)
+        size = self._media_sizes.get(key)
+        if size is None:
+            try:
+                head = data.head(IMAGE_HEADER_BYTES) if isinstance(data, LazyPayload) else data[:IMAGE_HEADER_BYTES]
+                size = image_size(head)
+            except (ValueError, OSError) as e:
+                logger.warning("Failed to read image header (content hash %s): %s", key, e)
+            if size is None:
+                photo = self.photo_cache.get(data, key)
+                size = (photo.width(), photo.height()) if photo else ()
+            self._media_sizes[key] = size
+        return size or None
+
+    def _get_node_photo(self, node: Node, data, key: Optional[str], node_cache: dict):
+        """描画するノードの画像（またはアイコン）の PhotoImage を共有キャッシュから取得し、ノード単位で保持する"""
+        if not data:
+            node_cache.pop(node.id, None)
+            return None
+        cached = node_cache.get(node.id)
+        if cached is not None and cached[1] == key:
+            return cached[0]
+        photo = self.photo_cache.get(data, key)
+        if photo is None:
+            node_cache.pop(node.id, None)
+            return None
+        node_cache[node.id] = (photo, key)
+        return photo
 
     def _draw_rich_text(self, x, y, node, base_font, tags):
         """リッチテキストを自動折り返しを考慮して描画する（画像対応）"""
-        wrapped_lines = self._wrap_rich_text(node.text, base_font, 250)
+        text_layout = self._layout_rich_text(node.text, base_font, 250)
+        wrapped_lines = text_layout.lines
         family, size = base_font[0], base_font[1]
         w, h = self.get_text_size(node, base_font)
         
-        text_block_w = 0
-        first_line_w = self._compute_first_line_width(wrapped_lines, family, size)
-        
-        for line_segments in wrapped_lines:
-            line_w = 0
-            for txt, style, _, _ in line_segments:
-                line_w += self._get_font(family, size, style).measure(txt)
-            text_block_w = max(text_block_w, line_w)
+        text_block_w = text_layout.block_width
+        first_line_w = text_layout.first_line_width
         
         # 1. 画像とアイコンの描画
         img_w_offset, img_h_offset = self._draw_node_media(x, y, first_line_w, h, node, tags)
@@ -307,14 +312,11 @@ class GraphicsEngine:
         center_x = content_left + img_w_offset + text_block_w / 2
         item_ids = []
         
-        for line_segments in wrapped_lines:
-            if not line_segments:
-                curr_y += size + 10
-                continue
-
-            line_item_ids, line_h = self._draw_text_line(center_x, curr_y, line_segments, family, size, tags)
-            item_ids.extend(line_item_ids)
-            curr_y += (line_h if line_h > 0 else size + 10)
+        for line_segments, seg_widths, line_h in zip(wrapped_lines, text_layout.seg_widths, text_layout.line_heights):
+            if line_segments:
+                line_item_ids = self._draw_text_line(center_x, curr_y, line_segments, seg_widths, family, size, tags)
+                item_ids.extend(line_item_ids)
+            curr_y += line_h
             
         return item_ids
 
@@ -323,59 +325,54 @@ class GraphicsEngine:
         h_offset = 0.0
         w_offset = 0.0
         
-        # 1. 画像の描画（上部）
-        if node.image_data and node.id in self.image_cache:
-            photo, _ = self.image_cache[node.id]
-            img_h = photo.height()
-            img_tags = list(tags) + ["node_image"]
-            img_id = self.canvas.create_image(x, y - total_h/2 + 10 + img_h/2, image=photo, tags=tuple(img_tags))
-            self.image_items[node.id] = img_id
+        # 1. 画像の描画（上部）。オフセットはレイアウトと同じく画像ヘッダーの大きさで求める
+        size = self._get_media_size(node.image_payload, node.image_key)
+        photo = self._get_node_photo(node, node.image_payload, node.image_key, self.image_cache)
+        if size:
+            img_h = size[1]
+            if photo is not None:
+                img_tags = list(tags) + ["node_image"]
+                img_id = self.canvas.create_image(x, y - total_h/2 + 10 + img_h/2, image=photo, tags=tuple(img_tags))
+                self.image_items[node.id] = img_id
             h_offset = img_h + IMAGE_SPACING
         
         # 2. アイコンの描画（左側）
-        icon_data = getattr(node, "icon_data", None)
-        if icon_data and node.id in self.icon_cache:
-            photo, _ = self.icon_cache[node.id]
-            img_w = photo.width()
-            img_tags = list(tags) + ["node_icon"]
+        size = self._get_media_size(node.icon_payload, node.icon_key)
+        photo = self._get_node_photo(node, node.icon_payload, node.icon_key, self.icon_cache)
+        if size:
+            img_w, img_h = size
             w_offset = img_w + IMAGE_SPACING
-            
-            # テキスト全体は w_offset / 2 だけ右にシフトされる。
-            # 一行目のテキストの左端 (first_line_left) に合わせてアイコンを配置する。
-            center_x = x + w_offset / 2
-            first_line_left = center_x - first_line_w / 2
-            icon_x = first_line_left - IMAGE_SPACING - img_w / 2
-            
-            # Y位置は上部の画像分のオフセットを考慮
-            icon_y = y - total_h / 2 + 10 + h_offset + photo.height() / 2
-            img_id = self.canvas.create_image(icon_x, icon_y, image=photo, tags=tuple(img_tags))
-            self.icon_items[node.id] = img_id
+            if photo is not None:
+                img_tags = list(tags) + ["node_icon"]
+                # テキスト全体は w_offset / 2 だけ右にシフトされる。
+                # 一行目のテキストの左端 (first_line_left) に合わせてアイコンを配置する。
+                center_x = x + w_offset / 2
+                first_line_left = center_x - first_line_w / 2
+                icon_x = first_line_left - IMAGE_SPACING - img_w / 2
+                
+                # Y位置は上部の画像分のオフセットを考慮
+                icon_y = y - total_h / 2 + 10 + h_offset + img_h / 2
+                img_id = self.canvas.create_image(icon_x, icon_y, image=photo, tags=tuple(img_tags))
+                self.icon_items[node.id] = img_id
             
         return w_offset, h_offset
 
-    def _draw_text_line(self, center_x, curr_y, line_segments, family, size, tags):
-        """1行分のリッチテキスト（複数セグメント）を中央寄せで描画し、描画アイテムIDと行高さを返す"""
-        line_w = 0
-        temp_segments = []
-        
-        # 行の幅を計算
-        for txt, style, underline, color in line_segments:
-            font = (family, size, style) if style != "normal" else (family, size)
-            tid = self.canvas.create_text(0, 0, text=txt, font=font)
-            bbox = self.canvas.bbox(tid)
-            self.canvas.delete(tid)
-            if bbox:
-                seg_w, seg_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-                line_w += seg_w
-                temp_segments.append((txt, font, underline, color, seg_w, seg_h))
+    def _draw_text_line(self, center_x, curr_y, line_segments, seg_widths, family, size, tags):
+        """1行分のリッチテキスト（複数セグメント）を中央寄せで描画し、描画アイテムIDを返す。
+
+        セグメントの幅は折り返し時に求めた値 (seg_widths) を使い、高さはフォントの linespace を使うため、
+        計測用の一時アイテムは作成しない。
+        """
+        line_w = sum(seg_widths)
         
         # 中央寄せのための開始位置
         curr_x = center_x - line_w / 2
-        max_line_h = 0
         line_item_ids = []
         
         # セグメントごとに描画
-        for txt, font, underline, color, seg_w, seg_h in temp_segments:
+        for (txt, style, underline, color), seg_w in zip(line_segments, seg_widths):
+            font = (family, size, style) if style != "normal" else (family, size)
+            seg_h = self.measurer.line_height((family, size, style))
             tid = self.canvas.create_text(
                 curr_x + seg_w/2, curr_y + seg_h/2,
                 text=txt, font=font, fill=color, tags=tags, anchor="center"
@@ -390,9 +387,8 @@ class GraphicsEngine:
                 line_item_ids.append(uid)
             
             curr_x += seg_w
-            max_line_h = max(max_line_h, seg_h)
             
-        return line_item_ids, max_line_h
+        return line_item_ids
 
     def _calculate_bezier_points(self, p0, p1, p2, p3, steps):
         """ベジェ曲線の点列を計算する"""
@@ -428,6 +424,7 @@ class GraphicsEngine:
             del self.icon_items[node.id]
         
         items = []
+        background = []
         color = self._get_node_color(node)
         
         # 選択状態の強調表示（背面に配置）
@@ -439,6 +436,7 @@ class GraphicsEngine:
                 radius=6, fill=COLOR_HIGHLIGHT_FILL, outline=COLOR_HIGHLIGHT_OUTLINE, width=1, tags=("node", node.id)
             )
             items.append(highlight_id)
+            background.append(highlight_id)
 
         if is_root:
             # ルートノード：太い枠線の角丸長方形
@@ -449,6 +447,7 @@ class GraphicsEngine:
                 radius=10, fill=fill_color, outline=color, width=outline_w, tags=("node", node.id)
             )
             items.append(rect_id)
+            background.append(rect_id)
         else:
             # サブトピック：下線のみ
             line_y = y + h/2
@@ -460,6 +459,9 @@ class GraphicsEngine:
             items.append(underline_id)
 
         self.node_items[node.id] = items
+        # 作り直した塗りつぶしが既存の接続線（子への線の始点）を覆わないよう、最背面へ移す
+        for item in reversed(background):
+            self.canvas.tag_lower(item)
         
         # テキスト（リッチテキスト対応）
         text_item_ids = self._draw_rich_text(
@@ -475,6 +477,130 @@ class GraphicsEngine:
         if node.parent:
             self.draw_connection(node)
 
+        self._node_states[node.id] = (self._node_signature(node, is_selected, color), x, y)
+
+    def _node_signature(self, node: Node, is_selected: bool, color) -> tuple:
+        """ノードの見た目（位置を除く）を決定する値の組を返す"""
+        return (node.text, node.width, node.height, is_selected, color, node.collapsed,
+                len(node.children), node.parent is None, node.direction,
+                node.image_key, node.icon_key)
+
+    # ──────────────────────────────────────────────────────────────
+    # 保持モード描画
+    # ──────────────────────────────────────────────────────────────
+
+    def begin_frame(self):
+        """1フレーム分の描画を開始する。保持モードでない場合はキャンバスを全消去する"""
+        if not self.retained:
+            self.clear()
+        self._frame_node_ids = set()
+        self._frame_ref_ids = set()
+
+    def render_node(self, node: Node, is_selected: bool = False):
+        """ノードを描画する。保持モードでは既存アイテムを移動・再利用し、見た目が変わった場合のみ作り直す"""
+        self._frame_node_ids.add(node.id)
+        if not self.retained:
+            self.draw_node(node, is_selected)
+            return
+
+        font = self.root_font if node.parent is None else self.font
+        node.width, node.height = self.get_text_size(node, font)
+        state = self._node_states.get(node.id)
+        signature = self._node_signature(node, is_selected, self._get_node_color(node))
+        if state is None or state[0] != signature:
+            self.draw_node(node, is_selected)
+            return
+
+        _, old_x, old_y = state
+        dx, dy = node.x - old_x, node.y - old_y
+        if dx or dy:
+            # ノードの全アイテムは node.id タグを共有しているため、1回の move で移動できる
+            self.canvas.move(node.id, dx, dy)
+            self._node_states[node.id] = (signature, node.x, node.y)
+        if node.parent:
+            self.draw_connection(node)
+
+    def render_reference(self, ref: Reference, source_node: Node, target_node: Node, is_selected: bool = False):
+        """参照線を描画する。保持モードでは形状・選択状態に変化がなければ何もしない"""
+        self._frame_ref_ids.add(ref.id)
+        if self.retained and ref.id in self.reference_items:
+            if self._reference_states.get(ref.id) == self._reference_signature(ref, source_node, target_node, is_selected):
+                return
+        self.draw_reference(ref, source_node, target_node, is_selected)
+
+    def _reference_signature(self, ref: Reference, source_node: Node, target_node: Node, is_selected: bool) -> tuple:
+        return (source_node.x, source_node.y, source_node.height,
+                target_node.x, target_node.y, target_node.height,
+                ref.cp1_x, ref.cp1_y, ref.cp2_x, ref.cp2_y, is_selected)
+
+    def end_frame(self):
+        """今回のフレームで描画されなかった（削除・非表示になった）ノードと参照のアイテムを破棄する"""
+        if not self.retained:
+            return
+        for node_id in [nid for nid in self._node_states if nid not in self._frame_node_ids]:
+            self.remove_node_items(node_id)
+        for ref_id in [rid for rid in self.reference_items if rid not in self._frame_ref_ids]:
+            for item in self.reference_items.pop(ref_id):
+                self.canvas.delete(item)
+            self._reference_states.pop(ref_id, None)
+
+    def remove_node_items(self, node_id: str):
+        """指定ノードのキャンバスアイテムと関連キャッシュを破棄する"""
+        for item in self.node_items.pop(node_id, []):
+            self.canvas.delete(item)
+        for item in self.line_items.pop(node_id, []):
+            self.canvas.delete(item)
+        for items in (self.image_items, self.icon_items):
+            item = items.pop(node_id, None)
+            if item is not None:
+                self.canvas.delete(item)
+        self.text_items.pop(node_id, None)
+        self.image_cache.pop(node_id, None)
+        self.icon_cache.pop(node_id, None)
+        self._node_states.pop(node_id, None)
+        self._connection_states.pop(node_id, None)
+
+    def get_node_box(self, node: Node) -> tuple:
+        """ノード本体（枠・下線・テキスト・選択時の強調表示）の矩形を返す"""
+        x, y, hw, hh = node.x, node.y, node.width / 2, node.height / 2
+        if node.parent is None:
+            return (x - hw - 12, y - hh - 10, x + hw + 12, y + hh + 10)
+        return (x - hw - 10, y - hh - 4, x + hw + 10, y + hh + 4)
+
+    def get_collapse_icon_box(self, node: Node) -> Optional[tuple]:
+        """折り畳みアイコンの矩形を返す。アイコンを持たないノードは None"""
+        if not (node.children and node.parent):
+            return None
+        x, y = self._collapse_icon_center(node)
+        r = COLLAPSE_ICON_RADIUS
+        return (x - r, y - r, x + r, y + r)
+
+    def get_image_box(self, node: Node) -> Optional[tuple]:
+        """ノード上部に表示される画像の矩形を返す。画像を持たないノードは None。
+
+        描画済みかどうか（image_cache）には依存せず、レイアウトと同じ画像ヘッダーの大きさから求める。
+        """
+        if node.image_key is None:
+            return None
+        size = self._get_media_size(node.image_payload, node.image_key)
+        if not size:
+            return None
+        img_w, img_h = size
+        top = node.y - node.height / 2 + 10
+        return (node.x - img_w / 2, top, node.x + img_w / 2, top + img_h)
+
+    def get_node_extent(self, node: Node) -> tuple:
+        """ノードの描画範囲（強調表示・折りたたみアイコン・親への接続線を含む）の矩形を返す"""
+        hw, hh = node.width / 2 + 30, node.height / 2 + 12
+        x1, y1, x2, y2 = node.x - hw, node.y - hh, node.x + hw, node.y + hh
+        parent = node.parent
+        if parent is not None and not parent.collapsed:
+            # ベジェ曲線は始点・制御点・終点の凸包に収まる
+            for px, py in self._get_connection_points(node, parent)[:4]:
+                x1, y1 = min(x1, px - 4), min(y1, py - 4)
+                x2, y2 = max(x2, px + 4), max(y2, py + 4)
+        return (x1, y1, x2, y2)
+
     def _get_connection_points(self, node: Node, parent: Node):
         """接続の開始点、制御点、終了点を計算する"""
         if parent.parent is None:
@@ -561,11 +687,23 @@ class GraphicsEngine:
 
     def draw_connection(self, node: Node):
         if not node.parent or node.parent.collapsed: return
-        if node.id in self.line_items:
-            for item in self.line_items[node.id]: self.canvas.delete(item)
         
         color = self._get_node_color(node)
         p1, cp1, cp2, p2, is_tapered = self._get_connection_points(node, node.parent)
+        state = (p1, cp1, cp2, p2, is_tapered, color, self.BEZIER_STEPS, self.TAPERED_BEZIER_STEPS)
+        old_items = self.line_items.get(node.id)
+        if old_items:
+            old_state = self._connection_states.get(node.id)
+            if old_state == state:
+                return
+            if old_state is not None and old_state[4] == is_tapered and old_state[5] == color:
+                # 形状のみ変化した場合はアイテムを作り直さず座標だけ更新する
+                coords = (self._tapered_bezier_coords(p1[0], p1[1], p2[0], p2[1], 8, 2) if is_tapered
+                          else self._bezier_coords(p1, cp1, cp2, p2, self.BEZIER_STEPS))
+                self.canvas.coords(old_items[0], *coords)
+                self._connection_states[node.id] = state
+                return
+            for item in old_items: self.canvas.delete(item)
         
         if is_tapered:
             items = self._draw_tapered_bezier(p1[0], p1[1], p2[0], p2[1], color, 8, 2)
@@ -573,63 +711,96 @@ class GraphicsEngine:
             items = self._draw_bezier(p1[0], p1[1], cp1[0], cp1[1], cp2[0], cp2[1], p2[0], p2[1], color, 2)
         
         self.line_items[node.id] = items
+        self._connection_states[node.id] = state
+
+    def set_curve_resolution(self, steps: int):
+        """接続線の曲線の分割数を設定する（テーパード曲線はその2倍）。既存の接続線は次回描画時に更新される"""
+        if steps < 1:
+            raise ValueError(f"curve resolution must be positive: {steps}")
+        self.BEZIER_STEPS = steps
+        self.TAPERED_BEZIER_STEPS = steps * 2
 
     def draw_move_shadow_connection(self, parent_node: Node, shadow_node: Node):
         """移動先の影用の接続線を描画する"""
         color = "#cccccc"
         p1, cp1, cp2, p2, is_tapered = self._get_connection_points(shadow_node, parent_node)
         
-        steps = 20
-        points = self._calculate_bezier_points(p1, cp1, cp2, p2, steps)
-        
-        for i in range(len(points) - 1):
-            t = i / steps
-            width = (8 + (2 - 8) * t) if is_tapered else 2
-            self.canvas.create_line(
-                points[i][0], points[i][1], points[i+1][0], points[i+1][1],
-                fill=color, width=width, capstyle="round", tags="move_shadow"
-            )
+        if is_tapered:
+            self._draw_tapered_bezier(p1[0], p1[1], p2[0], p2[1], color, 8, 2, tags="move_shadow")
+        else:
+            self._draw_bezier(p1[0], p1[1], cp1[0], cp1[1], cp2[0], cp2[1], p2[0], p2[1], color, 2, tags="move_shadow")
+
+    def _bezier_coords(self, p0, p1, p2, p3, steps) -> list:
+        """ベジェ曲線の点列を create_line / coords に渡せる平坦な座標列で返す"""
+        coords = []
+        for x, y in self._calculate_bezier_points(p0, p1, p2, p3, steps):
+            coords.append(x)
+            coords.append(y)
+        return coords
 
     def _draw_bezier(self, x1, y1, cp1x, cp1y, cp2x, cp2y, x2, y2, color, width, tags=None):
-        steps = self.BEZIER_STEPS
-        points = self._calculate_bezier_points((x1, y1), (cp1x, cp1y), (cp2x, cp2y), (x2, y2), steps)
-        items = []
-        for i in range(len(points) - 1):
-            line_id = self.canvas.create_line(
-                points[i][0], points[i][1], points[i+1][0], points[i+1][1],
-                fill=color, width=width, capstyle="round", tags=tags
-            )
-            items.append(line_id)
-        return items
+        """ベジェ曲線を1本の折れ線アイテムとして描画する"""
+        coords = self._bezier_coords((x1, y1), (cp1x, cp1y), (cp2x, cp2y), (x2, y2), self.BEZIER_STEPS)
+        line_id = self.canvas.create_line(
+            *coords, fill=color, width=width, capstyle="round", joinstyle="round", tags=tags
+        )
+        return [line_id]
 
-    def _draw_tapered_bezier(self, x1, y1, x2, y2, color, start_w, end_w, tags=None):
-        steps = self.TAPERED_BEZIER_STEPS
+    @staticmethod
+    def _tapered_control_points(x1, y1, x2, y2):
+        """テーパードベジェの制御点（水平方向補間）を返す"""
         dx = x2 - x1
         cp1x, cp2x = x1 + dx * 0.4, x1 + dx * 0.6
         cp1y = cp2y = y2 if abs(y2 - y1) > 1 else y1
-        
-        points = self._calculate_bezier_points((x1, y1), (cp1x, cp1y), (cp2x, cp2y), (x2, y2), steps)
-        items = []
-        for i in range(len(points) - 1):
-            t = i / steps
-            w = start_w + (end_w - start_w) * t
-            line_id = self.canvas.create_line(
-                points[i][0], points[i][1], points[i+1][0], points[i+1][1],
-                fill=color, width=w, capstyle="round", tags=tags
-            )
-            items.append(line_id)
-        return items
+        return (cp1x, cp1y), (cp2x, cp2y)
 
-    def _draw_collapse_icon(self, node: Node):
-        """折り畳み/展開用のアイコンを描画する"""
+    def _tapered_bezier_coords(self, x1, y1, x2, y2, start_w, end_w) -> list:
+        """始点から終点に向かって細くなるベジェ曲線の輪郭を、多角形の平坦な座標列で返す"""
+        steps = self.TAPERED_BEZIER_STEPS
+        cp1, cp2 = self._tapered_control_points(x1, y1, x2, y2)
+        points = self._calculate_bezier_points((x1, y1), cp1, cp2, (x2, y2), steps)
+        
+        left_side = []
+        right_side = []
+        last = len(points) - 1
+        for i, (x, y) in enumerate(points):
+            # 前後の点から接線を求め、その法線方向に線幅の半分だけずらす
+            ax, ay = points[max(i - 1, 0)]
+            bx, by = points[min(i + 1, last)]
+            tx, ty = bx - ax, by - ay
+            length = (tx * tx + ty * ty) ** 0.5 or 1.0
+            half_w = (start_w + (end_w - start_w) * i / steps) / 2
+            nx, ny = -ty / length * half_w, tx / length * half_w
+            left_side.append((x + nx, y + ny))
+            right_side.append((x - nx, y - ny))
+        
+        coords = []
+        for x, y in left_side + right_side[::-1]:
+            coords.append(x)
+            coords.append(y)
+        return coords
+
+    def _draw_tapered_bezier(self, x1, y1, x2, y2, color, start_w, end_w, tags=None):
+        """テーパードベジェ曲線を1つの塗りつぶし多角形として描画する"""
+        coords = self._tapered_bezier_coords(x1, y1, x2, y2, start_w, end_w)
+        polygon_id = self.canvas.create_polygon(
+            *coords, fill=color, outline=color, width=1, joinstyle="round", tags=tags
+        )
+        return [polygon_id]
+
+    def _collapse_icon_center(self, node: Node) -> tuple:
+        """折り畳みアイコンの中心座標を返す"""
         # 実際には方向(direction)に基づいた方が正確
         if node.direction == 'left':
             x = node.x - node.width/2 - 10
         else:
             x = node.x + node.width/2 + 10
-            
-        y = node.y + node.height/2
-        radius = 8
+        return x, node.y + node.height/2
+
+    def _draw_collapse_icon(self, node: Node):
+        """折り畳み/展開用のアイコンを描画する"""
+        x, y = self._collapse_icon_center(node)
+        radius = COLLAPSE_ICON_RADIUS
         
         color = self._get_node_color(node)
         
@@ -654,13 +825,8 @@ class GraphicsEngine:
             )
             self.node_items[node.id].append(line_id)
 
-    def draw_reference(self, ref: Reference, source_node: Node, target_node: Node, is_selected: bool = False):
-        if ref.id in self.reference_items:
-            for item in self.reference_items[ref.id]: 
-                self.canvas.delete(item)
-        
-        items = []
-        
+    def get_reference_points(self, ref: Reference, source_node: Node, target_node: Node) -> tuple:
+        """参照線の始点・制御点1・制御点2・終点を (sx, sy, cp1x, cp1y, cp2x, cp2y, tx, ty) で返す"""
         source_y_center = source_node.y
         target_y_center = target_node.y
         
@@ -687,6 +853,16 @@ class GraphicsEngine:
         else:
             cp2x, cp2y = tx, ty - (ty - sy) * 0.3
             
+        return sx, sy, cp1x, cp1y, cp2x, cp2y, tx, ty
+
+    def draw_reference(self, ref: Reference, source_node: Node, target_node: Node, is_selected: bool = False):
+        if ref.id in self.reference_items:
+            for item in self.reference_items[ref.id]: 
+                self.canvas.delete(item)
+        
+        items = []
+        sx, sy, cp1x, cp1y, cp2x, cp2y, tx, ty = self.get_reference_points(ref, source_node, target_node)
+            
         # 参照線の描画
         line_id = self.canvas.create_line(
             sx, sy, cp1x, cp1y, cp2x, cp2y, tx, ty,
@@ -701,7 +877,7 @@ class GraphicsEngine:
             g2 = self.canvas.create_line(tx, ty, cp2x, cp2y, fill="gray", dash=(2,2), tags=("reference_guide", ref.id))
             items.extend([g1, g2])
             
-            r = 4
+            r = REFERENCE_HANDLE_RADIUS
             h1 = self.canvas.create_oval(
                 cp1x - r, cp1y - r, cp1x + r, cp1y + r,
                 fill="white", outline="blue", tags=("reference_handle", f"{ref.id}_cp1")
@@ -713,6 +889,7 @@ class GraphicsEngine:
             items.extend([h1, h2])
             
         self.reference_items[ref.id] = items
+        self._reference_states[ref.id] = self._reference_signature(ref, source_node, target_node, is_selected)
 
     def draw_temporary_reference(self, source_node: Node, target_x: float, target_y: float):
         self.clear_temporary_reference()
@@ -750,7 +927,11 @@ class GraphicsEngine:
         self.reference_items.clear()
         self.image_items.clear()
         self.icon_items.clear()
+        self._node_states.clear()
+        self._connection_states.clear()
+        self._reference_states.clear()
         
+        # ノード単位の参照のみ解放する。photo_cache は内容ハッシュ単位で render をまたいで保持される
         self.image_cache.clear()
         self.icon_cache.clear()
 
@@ -0,0 +1,172 @@
+import time
+from typing import List, Optional
+
+from .events import ChangeEvent, ChangeType
+from .models import MindMapModel, iter_preorder
+from .constants import UNDO_MEMORY_BUDGET, UNDO_MAX_STEPS, UNDO_COALESCE_SECONDS
+
+# 1イベント・1ノードあたりの保持コストの概算（バイト）
+EVENT_OVERHEAD_BYTES = 200
+NODE_OVERHEAD_BYTES = 600
+
+# 連続した同種の変更を1ステップにまとめる、値の変更を表すイベント
+_VALUE_EVENTS = (ChangeType.TEXT_CHANGED, ChangeType.MEDIA_CHANGED)
+
+
+def _payload_size(value) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 0
+
+
+def _event_size(event: ChangeEvent) -> int:
+    """イベントを履歴に保持するためのメモリ量を概算する"""
+    size = EVENT_OVERHEAD_BYTES + _payload_size(event.old_value) + _payload_size(event.new_value)
+    if event.type is ChangeType.NODE_REMOVED:
+        # 削除されたサブツリーは履歴だけが保持する
+        for node in iter_preorder(event.node):
+            size += (NODE_OVERHEAD_BYTES + len(node.text)
+                     + _payload_size(node.image_payload) + _payload_size(node.icon_payload))
+    elif event.type is ChangeType.REFERENCE_CHANGED and event.attribute == "reset":
+        size += EVENT_OVERHEAD_BYTES * (len(event.old_value or ()) + len(event.new_value or ()))
+    return size
+
+
+class UndoStep:
+    """1回の操作（1回の配信でまとめて通知された変更）に対応する取り消し単位"""
+    __slots__ = ("events", "size", "key", "timestamp")
+
+    def __init__(self, events: List[ChangeEvent], key: Optional[tuple], timestamp: float):
+        self.events = events
+        self.size = sum(_event_size(e) for e in events)
+        self.key = key
+        self.timestamp = timestamp
+
+
+class UndoHistory:
+    """モデルの変更イベントを記録し、逆操作によって元に戻す・やり直すクラス。
+
+    スナップショットは取らず、各イベントが持つ変更前後の値とノードへの参照だけを保持するため、
+    大きなマップでも1回の取り消しは変更されたノード数に比例する時間で済む。
+    履歴は memory_budget（概算バイト数）と max_steps を超えると古いものから破棄される。
+    """
+
+    def __init__(self, model: MindMapModel, memory_budget: int = UNDO_MEMORY_BUDGET,
+                 max_steps: int = UNDO_MAX_STEPS, coalesce_seconds: float = UNDO_COALESCE_SECONDS,
+                 clock=time.monotonic):
+        self.model = model
+        self.memory_budget = memory_budget
+        self.max_steps = max_steps
+        self.coalesce_seconds = coalesce_seconds
+        self._clock = clock
+        self._undo: List[UndoStep] = []
+        self._redo: List[UndoStep] = []
+        self._size = 0
+        self._replaying = False
+        self._coalescing = True
+        model.subscribe(self._on_model_changed)
+
+    # ──────────────────────────────────────────────────────────────
+    # 記録
+    # ──────────────────────────────────────────────────────────────
+
+    @property
+    def memory_usage(self) -> int:
+        """取り消し用に保持している変更の概算バイト数"""
+        return self._size
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._size = 0
+
+    def break_coalescing(self):
+        """次の変更を直前のステップにまとめないようにする（ドラッグの終了時など）"""
+        self._coalescing = False
+
+    @staticmethod
+    def _coalesce_key(events: List[ChangeEvent]) -> Optional[tuple]:
+        """まとめてよい変更であれば、その対象を表すキーを返す"""
+        if len(events) != 1:
+            return None
+        event = events[0]
+        if event.type in _VALUE_EVENTS:
+            return (event.type, event.node, event.attribute)
+        if event.type is ChangeType.REFERENCE_CHANGED and event.attribute == "control_points":
+            return (event.type, event.reference, event.attribute)
+        return None
+
+    def _on_model_changed(self, events: List[ChangeEvent]):
+        if self._replaying:
+            return
+        if any(e.type is ChangeType.MODEL_RESET for e in events):
+            # ファイルの読み込み等でモデルが差し替えられた場合、以前の履歴は無効になる
+            self.clear()
+            return
+        self._redo.clear()
+        now = self._clock()
+        key = self._coalesce_key(events)
+        last = self._undo[-1] if self._undo else None
+        if (key is not None and self._coalescing and last is not None and last.key == key
+                and now - last.timestamp <= self.coalesce_seconds):
+            # 直前の変更前の値を残し、変更後の値だけを更新する
+            event = last.events[0]
+            merged = ChangeEvent(event.type, node=event.node, attribute=event.attribute,
+                                 old_value=event.old_value, new_value=events[0].new_value,
+                                 reference=event.reference)
+            self._size -= last.size
+            self._undo[-1] = last = UndoStep([merged], key, now)
+            self._size += last.size
+        else:
+            step = UndoStep(list(events), key, now)
+            self._undo.append(step)
+            self._size += step.size
+        self._coalescing = True
+        self._trim()
+
+    def _trim(self):
+        # 直前の1ステップは予算を超えていても残す
+        while len(self._undo) > 1 and (len(self._undo) > self.max_steps or self._size > self.memory_budget):
+            self._size -= self._undo.pop(0).size
+
+    # ──────────────────────────────────────────────────────────────
+    # 取り消し・やり直し
+    # ──────────────────────────────────────────────────────────────
+
+    def undo(self) -> Optional[List[ChangeEvent]]:
+        """直前の操作を取り消し、そのイベントを返す（取り消す操作がなければ None）"""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._size -= step.size
+        self._replay(self.model.revert_events, step.events)
+        self._redo.append(step)
+        self._coalescing = False
+        return step.events
+
+    def redo(self) -> Optional[List[ChangeEvent]]:
+        """取り消した操作をやり直し、そのイベントを返す（やり直す操作がなければ None）"""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._replay(self.model.apply_events, step.events)
+        self._undo.append(step)
+        self._size += step.size
+        self._coalescing = False
+        return step.events
+
+    def _replay(self, apply, events: List[ChangeEvent]):
+        model = self.model
+        self._replaying = True
+        try:
+            with model.events.batch():
+                apply(events)
+                model.is_modified = True
+        finally:
+            self._replaying = False
@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Tuple
+
+from .models import Node, Reference
+from .spatial_index import SpatialGrid, bboxes_intersect
+from .constants import NODE_CLICK_PADDING, REFERENCE_HANDLE_RADIUS, REFERENCE_HIT_TOLERANCE
+
+# 参照線の当たり判定に使う、平滑化曲線1区間あたりの分割数
+REFERENCE_CURVE_STEPS = 12
+
+
+def _smoothed_reference_polyline(points: tuple, steps: int = REFERENCE_CURVE_STEPS) -> List[Tuple[float, float]]:
+    """Canvas の smooth=True で描かれる4点の線を折れ線で近似する。
+
+    Tk は始点・終点を通り、中間点同士の中点をつなぐ2次ベジェ曲線の連なりとして描画する。
+    """
+    sx, sy, c1x, c1y, c2x, c2y, tx, ty = points
+    mx, my = (c1x + c2x) / 2, (c1y + c2y) / 2
+    result = []
+    for (ax, ay), (bx, by), (ex, ey) in (((sx, sy), (c1x, c1y), (mx, my)), ((mx, my), (c2x, c2y), (tx, ty))):
+        for i in range(steps + 1):
+            t = i / steps
+            u = 1 - t
+            result.append((u * u * ax + 2 * u * t * bx + t * t * ex,
+                           u * u * ay + 2 * u * t * by + t * t * ey))
+    return result
+
+
+def _distance_to_segment(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        t = 0.0
+    else:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    cx, cy = ax + t * dx - px, ay + t * dy - py
+    return (cx * cx + cy * cy) ** 0.5
+
+
+class HitTester:
+    """レイアウト結果の矩形を空間インデックスで管理し、座標からノード等を求めるクラス。
+
+    キャンバスアイテムのタグを走査せずに、ノード本体・折りたたみアイコン・画像・参照線と
+    そのハンドルの当たり判定を行う。矩形の計算は GraphicsEngine の描画と同じ規則に従う。
+    """
+
+    def __init__(self, graphics, cell_size: float = 256):
+        self.graphics = graphics
+        self.grid = SpatialGrid(cell_size)
+        self._node_states: Dict[Node, tuple] = {}       # node -> 矩形計算に用いた値の組
+        self._reference_polylines: Dict[Reference, list] = {}
+
+    # ──────────────────────────────────────────────────────────────
+    # 索引の更新
+    # ──────────────────────────────────────────────────────────────
+
+    def sync_node(self, node: Node):
+        """ノードの当たり判定領域を登録する（位置・大きさ等が変わっていなければ何もしない）"""
+        state = (node.x, node.y, node.width, node.height, node.direction,
+                 bool(node.children), node.parent is None, node.image_key)
+        if self._node_states.get(node) == state:
+            return
+        self._node_states[node] = state
+        grid = self.grid
+        grid.insert(("node", node), self.graphics.get_node_box(node))
+        for kind, box in (("collapse", self.graphics.get_collapse_icon_box(node)),
+                          ("image", self.graphics.get_image_box(node))):
+            if box is None:
+                grid.remove((kind, node))
+            else:
+                grid.insert((kind, node), box)
+
+    def remove_node(self, node: Node):
+        self._node_states.pop(node, None)
+        for kind in ("node", "collapse", "image"):
+            self.grid.remove((kind, node))
+
+    def sync_reference(self, ref: Reference, source_node: Node, target_node: Node):
+        """参照線の当たり判定領域を登録する"""
+        polyline = _smoothed_reference_polyline(self.graphics.get_reference_points(ref, source_node, target_node))
+        self._reference_polylines[ref] = polyline
+        tol = REFERENCE_HIT_TOLERANCE
+        xs = [p[0] for p in polyline]
+        ys = [p[1] for p in polyline]
+        self.grid.insert(("reference", ref), (min(xs) - tol, min(ys) - tol, max(xs) + tol, max(ys) + tol))
+
+    def remove_reference(self, ref: Reference):
+        self._reference_polylines.pop(ref, None)
+        self.grid.remove(("reference", ref))
+
+    def nodes(self) -> List[Node]:
+        return list(self._node_states)
+
+    def references(self) -> List[Reference]:
+        return list(self._reference_polylines)
+
+    def references_in(self, bbox: tuple) -> List[Reference]:
+        """矩形と交差する参照線を返す"""
+        return [key[1] for key in self.grid.query(bbox) if key[0] == "reference"]
+
+    def clear(self):
+        self.grid.clear()
+        self._node_states.clear()
+        self._reference_polylines.clear()
+
+    # ──────────────────────────────────────────────────────────────
+    # 当たり判定
+    # ──────────────────────────────────────────────────────────────
+
+    def _candidates(self, kind: str, x: float, y: float, padding: float):
+        if padding:
+            keys = self.grid.query((x - padding, y - padding, x + padding, y + padding))
+        else:
+            keys = self.grid.query_point(x, y)
+        return [key[1] for key in keys if key[0] == kind]
+
+    @staticmethod
+    def _nearest_node(nodes: List[Node], x: float, y: float) -> Optional[Node]:
+        if not nodes:
+            return None
+        # 重なっている場合は中心が最も近いノードを優先する
+        return min(nodes, key=lambda n: (n.x - x) ** 2 + (n.y - y) ** 2)
+
+    def node_at(self, x: float, y: float, padding: float = NODE_CLICK_PADDING) -> Optional[Node]:
+        """座標にあるノードを返す（クリック範囲は padding だけ広げる）"""
+        return self._nearest_node(self._candidates("node", x, y, padding), x, y)
+
+    def collapse_icon_at(self, x: float, y: float, padding: float = 2) -> Optional[Node]:
+        """座標にある折りたたみアイコンの持ち主のノードを返す"""
+        return self._nearest_node(self._candidates("collapse", x, y, padding), x, y)
+
+    def image_at(self, x: float, y: float, padding: float = 2) -> Optional[Node]:
+        """座標にある画像の持ち主のノードを返す"""
+        return self._nearest_node(self._candidates("image", x, y, padding), x, y)
+
+    def reference_at(self, x: float, y: float, tolerance: float = REFERENCE_HIT_TOLERANCE) -> Optional[Reference]:
+        """座標から tolerance 以内を通る参照線のうち、最も近いものを返す"""
+        best, best_dist = None, None
+        for ref in self._candidates("reference", x, y, tolerance):
+            polyline = self._reference_polylines[ref]
+            dist = min(_distance_to_segment(x, y, ax, ay, bx, by)
+                       for (ax, ay), (bx, by) in zip(polyline, polyline[1:]))
+            if dist <= tolerance and (best_dist is None or dist < best_dist):
+                best, best_dist = ref, dist
+        return best
+
+    def reference_handle_at(self, x: float, y: float, ref: Reference, source_node: Node, target_node: Node,
+                            padding: float = REFERENCE_HANDLE_RADIUS) -> Optional[str]:
+        """選択中の参照線の制御点ハンドルの判定。該当すれば "cp1" または "cp2" を返す"""
+        _, _, cp1x, cp1y, cp2x, cp2y, _, _ = self.graphics.get_reference_points(ref, source_node, target_node)
+        r = REFERENCE_HANDLE_RADIUS
+        area = (x - padding, y - padding, x + padding, y + padding)
+        # 描画順（cp2 が前面）に合わせて cp2 を優先する
+        for cp_type, cx, cy in (("cp2", cp2x, cp2y), ("cp1", cp1x, cp1y)):
+            if bboxes_intersect((cx - r, cy - r, cx + r, cy + r), area):
+                return cp_type
+        return None
@@ -1,19 +1,48 @@
 import base64
 import math
 import os
+import struct
+from typing import Optional, Tuple
 
 from .constants import MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT
 
-def file_to_base64(file_path: str) -> str:
-    """ファイルを読み込み、Base64エンコードされた文字列を返す"""
+# 画像の幅と高さを読み取るのに必要な先頭のバイト数（PNG の IHDR チャンクの高さまで）
+IMAGE_HEADER_BYTES = 24
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def file_to_bytes(file_path: str) -> bytes:
+    """ファイルを読み込み、その内容をバイト列で返す"""
     try:
         with open(file_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            return image_file.read()
     except FileNotFoundError as err:
         raise FileNotFoundError(f"Image file not found: {file_path}") from err
     except OSError as err:
         raise IOError("Failed to read image file") from err
 
+def file_to_base64(file_path: str) -> str:
+    """ファイルを読み込み、Base64エンコードされた文字列を返す"""
+    return encode_image_data(file_to_bytes(file_path))
+
+def encode_image_data(data: bytes) -> str:
+    """画像データをテキスト形式（JSON 等）に書き出すための Base64 文字列に変換する"""
+    return base64.b64encode(data).decode('ascii')
+
+def decode_image_data(text: str) -> bytes:
+    """テキスト形式から読み込んだ Base64 文字列を画像データに戻す"""
+    return base64.b64decode(text)
+
+def image_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """画像データの先頭（IMAGE_HEADER_BYTES バイト）から (幅, 高さ) を読み取る。
+
+    デコードせずに分かる PNG（IHDR チャンク）と GIF（論理画面）に対応し、それ以外の形式は None を返す。
+    """
+    if len(head) >= 24 and head[:8] == _PNG_SIGNATURE and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if len(head) >= 10 and head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    return None
+
 def calculate_subsample(width: int, height: int, max_width: int = MAX_IMAGE_WIDTH, max_height: int = MAX_IMAGE_HEIGHT) -> int:
     """指定されたサイズに収まるように最小の整数サンプリングレートを計算する"""
     if max_width <= 0 or max_height <= 0:
@@ -29,8 +58,8 @@ def calculate_subsample(width: int, height: int, max_width: int = MAX_IMAGE_WIDT
     # 大きい方の比率をサンプリングレートとして採用
     return max(sample_x, sample_y)
 
-def load_image_as_base64(file_path: str) -> str:
-    """画像を読み込み、Base64エンコードされた文字列を返す。
-    ※現在はBase64変換のみを行う（subsampleはメモリ上のPhotoImageに対して行うため）。
+def load_image_bytes(file_path: str) -> bytes:
+    """画像を読み込み、そのバイト列を返す。
+    ※読み込みのみを行う（subsampleはメモリ上のPhotoImageに対して行うため）。
     """
-    return file_to_base64(file_path)
+    return file_to_bytes(file_path)
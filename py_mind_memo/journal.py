@@ -0,0 +1,281 @@
+import binascii
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from .constants import JOURNAL_COMPACT_BYTES, JOURNAL_SYNC_RECORDS
+from .image_utils import decode_image_data
+from .json_loader import LoadError
+from .lazy_payload import encode_payload
+from .models import MindMapModel, Node, Reference, iter_preorder
+from .snapshot import NODE_FIELDS, REFERENCE_FIELDS, ModelSnapshot, diff_trees
+
+# ジャーナルは文書の隣に置く追記専用のファイル（JSON Lines）。先頭行は対象の文書（保存時のファイルの
+# 大きさと更新時刻）を表すヘッダーで、以降の各行が前の行からのノードの行の差分を表す記録。
+# 保存されていない変更がある間だけ存在し、文書全体を保存すると空になる（削除される）。
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def journal_path(file_path: str) -> str:
+    return file_path + JOURNAL_SUFFIX
+
+
+def _file_stamp(file_path: str) -> List[int]:
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def make_record(old: ModelSnapshot, new: ModelSnapshot) -> Optional[dict]:
+    """2つのスナップショットの差分を記録（辞書）にする。差分がなければ None"""
+    record = {}
+    rows, deleted = diff_trees(old.root, new.root)
+    if rows:
+        record["nodes"] = list(rows.values())
+    if deleted:
+        record["deleted"] = deleted
+    if old.references != new.references:
+        record["references"] = new.references
+    assets = {key: encode_payload(data) for key, data in new.assets.items() if key not in old.assets}
+    if assets:
+        record["assets"] = assets
+    return record or None
+
+
+def read_journal(file_path: str) -> Optional[Tuple[List[dict], int]]:
+    """file_path のジャーナルを読み、記録のリストと有効な部分の末尾の位置を返す。
+
+    ジャーナルがない場合や、ヘッダーが現在の文書と一致しない（ジャーナルより後に文書が書き換えられた）
+    場合は None。書き込み途中で終わった最後の行は無視する。
+    """
+    path = journal_path(file_path)
+    try:
+        with open(path, "rb") as f:
+            lines = f.read().split(b"\n")
+    except FileNotFoundError:
+        return None
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("journal") != JOURNAL_VERSION or header.get("base") != _file_stamp(file_path):
+        return None
+    records = []
+    end = len(lines[0]) + 1
+    # 最後の要素は改行で終わっていない（書き込み途中の）行
+    for line in lines[1:-1]:
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            raise LoadError(f"Corrupt journal {path}: {e}")
+        end += len(line) + 1
+    return records, end
+
+
+def apply_records(root: Node, references: List[Reference], records: List[dict]) -> Tuple[Node, List[Reference]]:
+    """読み込んだ文書のツリー（モデルに登録する前のもの）に、ジャーナルの記録を順に適用する。
+
+    記録が壊れている場合は LoadError を送出する（ツリーは途中まで変更されているため使えない）。
+    """
+    index = {}
+    payloads = {}
+    for node in iter_preorder(root):
+        index[node.id] = node
+        if node.image_key is not None:
+            payloads[node.image_key] = node.image_payload
+        if node.icon_key is not None:
+            payloads[node.icon_key] = node.icon_payload
+
+    try:
+        for record in records:
+            for key, text in record.get("assets", {}).items():
+                try:
+                    payloads[key] = decode_image_data(text)
+                except (binascii.Error, ValueError) as e:
+                    raise LoadError(f"Invalid image data in journal: {e}")
+            placed = []
+            for row in record.get("nodes", ()):
+                node_id, parent_id, position = row[0], row[1], row[2]
+                fields = dict(zip(NODE_FIELDS[1:], row[3:]))
+                node = index.get(node_id)
+                if node is None:
+                    node = index[node_id] = Node(fields["text"])
+                    node.id = node_id
+                elif node.parent is not None:
+                    node.parent.children.remove(node)
+                    node.parent = None
+                node.text = fields["text"]
+                node.direction = fields["direction"]
+                node.color = fields["color"]
+                node.collapsed = bool(fields["collapsed"])
+                node.image_data = payloads.get(fields["image_asset"]) if fields["image_asset"] else None
+                node.image_path = fields["image_path"]
+                node.icon_data = payloads.get(fields["icon_asset"]) if fields["icon_asset"] else None
+                node.icon_path = fields["icon_path"]
+                placed.append((position, parent_id, node))
+            for node_id in record.get("deleted", ()):
+                node = index.pop(node_id, None)
+                if node is not None and node.parent is not None and node in node.parent.children:
+                    node.parent.children.remove(node)
+            # 位置の小さい順に挿入すれば、位置の変わらない兄弟と合わせて記録時の並びになる
+            placed.sort(key=lambda item: item[0])
+            for position, parent_id, node in placed:
+                if parent_id is None:
+                    root = node
+                    continue
+                parent = index.get(parent_id)
+                if parent is None:
+                    raise LoadError(f"Journal refers to a missing topic: {parent_id}")
+                node.parent = parent
+                parent.children.insert(position, node)
+            if "references" in record:
+                references = [Reference.from_dict(dict(zip(REFERENCE_FIELDS, r))) for r in record["references"]]
+    except LoadError:
+        raise
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError) as e:
+        # 途中で壊れた記録（項目の欠けた行など）は、ジャーナル全体を適用できないものとして扱う
+        raise LoadError(f"Malformed journal record: {e!r}")
+    return root, references
+
+
+class Journal:
+    """文書の変更を、文書の隣のジャーナルに記録として追記する。
+
+    モデルの変更の配信ごとに（schedule を渡した場合は Tk のスレッドで1回の操作の変更をまとめて）、
+    前回記録した時点のスナップショットとの差分を1行として追記する。ディスクへの同期は
+    JOURNAL_SYNC_RECORDS 件ごとと sync() の呼び出し時にまとめて行う。
+    compact() は別スレッドから呼び出せる。recovered_end を渡した場合は、読み込み時に適用した既存の
+    ジャーナルの続きに追記する。
+    """
+
+    def __init__(self, model: MindMapModel, file_path: str, schedule: Optional[Callable] = None,
+                 recovered_end: Optional[int] = None):
+        self.model = model
+        self.file_path = file_path
+        self.path = journal_path(file_path)
+        self._schedule = schedule
+        self._lock = threading.Lock()
+        self._last = model.snapshot()
+        self._file = None
+        self._size = 0
+        self._unsynced = 0
+        self._flush_pending = False
+        self._closed = False
+        if recovered_end is not None:
+            self._file = open(self.path, "r+b")
+            self._file.truncate(recovered_end)
+            self._file.seek(recovered_end)
+            self._size = recovered_end
+        model.subscribe(self._on_change)
+
+    @property
+    def size(self) -> int:
+        """ジャーナルの大きさ（バイト数）"""
+        return self._size
+
+    def needs_compaction(self) -> bool:
+        """文書全体を書き出すべきか（ジャーナルが大きくなった場合や、記録できなくなった場合）"""
+        return self._closed or self._size >= JOURNAL_COMPACT_BYTES
+
+    def _on_change(self, events):
+        if self._schedule is None:
+            self.flush()
+        elif not self._flush_pending:
+            self._flush_pending = True
+            self._schedule(self.flush)
+
+    def flush(self):
+        """前回の記録以降の変更を1件の記録として追記する"""
+        self._flush_pending = False
+        if self._closed:
+            return
+        snapshot = self.model.snapshot()
+        with self._lock:
+            record = make_record(self._last, snapshot)
+            self._last = snapshot
+            if record is None:
+                return
+            try:
+                if self._file is None:
+                    header = {"journal": JOURNAL_VERSION, "base": _file_stamp(self.file_path)}
+                    self._file = open(self.path, "wb")
+                    self._size = self._write(self._file, header)
+                self._size += self._write(self._file, record)
+                self._unsynced += 1
+                if self._unsynced >= JOURNAL_SYNC_RECORDS:
+                    self._sync()
+            except OSError as e:
+                # 記録が欠けたジャーナルは復元に使えないため削除し、以降は文書全体の保存に任せる
+                logger.warning("Failed to write journal %s: %s", self.path, e)
+                self._closed = True
+                try:
+                    self._close_file()
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _write(f, record: dict) -> int:
+        data = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        f.write(data)
+        # プロセスが終了しても失われないよう OS には都度渡す（ディスクへの同期はまとめて行う）
+        f.flush()
+        return len(data)
+
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def sync(self):
+        """追記した記録をディスクに同期する"""
+        with self._lock:
+            self._sync()
+
+    def compact(self, saved: ModelSnapshot):
+        """文書全体を saved の内容で保存した後に呼び、それ以降の変更だけをジャーナルに残す"""
+        with self._lock:
+            if self._closed:
+                return
+            self._close_file()
+            record = make_record(saved, self._last)
+            if record is None:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                self._size = 0
+                return
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    size = self._write(f, {"journal": JOURNAL_VERSION, "base": _file_stamp(self.file_path)})
+                    size += self._write(f, record)
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self._file = open(self.path, "ab")
+            self._size = size
+
+    def close(self, discard: bool = False):
+        """記録を終了する。discard が True の場合は保存されていない変更を捨て、ジャーナルを削除する"""
+        self.model.unsubscribe(self._on_change)
+        if not discard and self._flush_pending:
+            self.flush()
+        self._closed = True
+        with self._lock:
+            self._close_file()
+            if discard and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
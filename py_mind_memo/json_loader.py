@@ -0,0 +1,425 @@
+import binascii
+import hashlib
+import json
+import re
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from .constants import LOAD_CHUNK_BYTES
+from .image_utils import decode_image_data
+from .lazy_payload import LazyPayload
+from .models import Node, Reference
+
+_WS = re.compile(rb"[ \t\r\n]*")
+# 開始の引用符の直後から終了の引用符までの文字列本体
+_STRING = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# Base64 の画像データ（エスケープは "\/" のみ許可する）
+_PAYLOAD = re.compile(rb'[^"\\]*(?:\\/[^"\\]*)*')
+_SCALAR = re.compile(rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null")
+_LITERALS = {b"true": True, b"false": False, b"null": None}
+# ノードのオブジェクトの children より前の部分（値が文字列・数値等の項目の並び）
+_NODE_HEAD = re.compile(
+    rb'[ \t\r\n]*((?:"[^"\\]*"[ \t\r\n]*:[ \t\r\n]*'
+    rb'(?:"[^"\\]*(?:\\.[^"\\]*)*"|-?[0-9][0-9.eE+-]*|true|false|null)[ \t\r\n]*,[ \t\r\n]*)*)'
+    rb'"children"[ \t\r\n]*:[ \t\r\n]*\[', re.S)
+_WS_CHARS = frozenset(b" \t\r\n")
+_DECODER = json.JSONDecoder()
+
+_QUOTE, _BACKSLASH, _COMMA, _COLON = ord('"'), ord("\\"), ord(","), ord(":")
+_LBRACE, _RBRACE, _LBRACKET, _RBRACKET = ord("{"), ord("}"), ord("["), ord("]")
+
+_MEDIA_FIELDS = ("image_data", "icon_data")
+_ASSET_FIELDS = {"image_asset": "image_data", "icon_asset": "icon_data"}
+
+
+class LoadError(ValueError):
+    """保存ファイルの形式が正しくない"""
+
+
+class LoadCancelled(Exception):
+    """読み込みが中止された"""
+
+
+class _Reader:
+    """ファイルをチャンク単位で読み出し、JSON のトークンを先頭から順に取り出す"""
+
+    def __init__(self, file: BinaryIO, chunk_size: int, on_chunk: Optional[Callable[[int], None]] = None):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._on_chunk = on_chunk
+        self._buf = b""
+        self._pos = 0
+        self._base = 0  # _buf の先頭のファイル内オフセット
+        self._eof = False
+
+    @property
+    def position(self) -> int:
+        """読み取り済みの位置（ファイル内のバイトオフセット）"""
+        return self._base + self._pos
+
+    def error(self, message: str) -> LoadError:
+        return LoadError(f"{message} (offset {self.position})")
+
+    def _fill(self) -> bool:
+        """次のチャンクを読み込む。読み取り済みの部分はバッファから捨てる"""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._base += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if self._on_chunk is not None:
+            self._on_chunk(self._base + len(self._buf))
+        return True
+
+    def peek(self) -> Optional[int]:
+        """空白を読み飛ばし、次の文字を返す（ファイルの終端では None）"""
+        while True:
+            if self._pos < len(self._buf) and self._buf[self._pos] not in _WS_CHARS:
+                return self._buf[self._pos]
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return None
+
+    def expect(self, char: int):
+        if self.peek() != char:
+            raise self.error(f"Expected {chr(char)!r}")
+        self._pos += 1
+
+    def read_string(self) -> str:
+        self.expect(_QUOTE)
+        while True:
+            m = _STRING.match(self._buf, self._pos)
+            if m is not None:
+                break
+            if not self._fill():
+                raise self.error("Unterminated string")
+        raw = self._buf[self._pos:m.end() - 1]
+        self._pos = m.end()
+        if _BACKSLASH in raw:
+            return json.loads(b'"' + raw + b'"')
+        return raw.decode("utf-8")
+
+    def read_node_head(self) -> Optional[dict]:
+        """ノードのオブジェクトの children より前の項目を json モジュールでまとめて変換して返す。
+
+        項目の値が文字列・数値等のみで children の配列が続く場合に限る（children の "[" まで読む）。
+        それ以外の場合（画像データを埋め込んだ古い形式、チャンクの境界で分かれている等）は何も読まずに None。
+        """
+        m = _NODE_HEAD.match(self._buf, self._pos)
+        if m is None:
+            return None
+        members = m.group(1).rstrip()
+        if b'"image_data"' in members or b'"icon_data"' in members:
+            return None
+        try:
+            fields = _DECODER.decode("{" + members[:-1].decode("utf-8") + "}") if members else {}
+        except ValueError:
+            return None
+        self._pos = m.end()
+        return fields
+
+    def read_scalar(self):
+        while True:
+            m = _SCALAR.match(self._buf, self._pos)
+            if m is not None and m.end() < len(self._buf):
+                break
+            # 数値がチャンクの境界で分かれている可能性があるため、続きを読んでから判定する
+            if (m is not None or len(self._buf) - self._pos < 32) and self._fill():
+                continue
+            if m is None:
+                raise self.error("Unexpected character")
+            break
+        token = m.group()
+        self._pos = m.end()
+        if token in _LITERALS:
+            return _LITERALS[token]
+        return json.loads(token)
+
+    def read_value(self):
+        """任意の JSON の値を読む（入れ子になったオブジェクト・配列も再帰せずに読む）"""
+        char = self.peek()
+        if char == _QUOTE:
+            return self.read_string()
+        if char != _LBRACE and char != _LBRACKET:
+            return self.read_scalar()
+        self._pos += 1
+        result = {} if char == _LBRACE else []
+        stack = [[result, True]]  # [コンテナ, 最初の要素か]
+        while stack:
+            frame = stack[-1]
+            container = frame[0]
+            is_dict = isinstance(container, dict)
+            char = self.peek()
+            if char == (_RBRACE if is_dict else _RBRACKET):
+                self._pos += 1
+                stack.pop()
+                continue
+            if not frame[1]:
+                self.expect(_COMMA)
+                char = self.peek()
+            frame[1] = False
+            if is_dict:
+                key = self.read_string()
+                self.expect(_COLON)
+                char = self.peek()
+            if char == _LBRACE or char == _LBRACKET:
+                self._pos += 1
+                value = {} if char == _LBRACE else []
+                stack.append([value, True])
+            elif char == _QUOTE:
+                value = self.read_string()
+            else:
+                value = self.read_scalar()
+            if is_dict:
+                container[key] = value
+            else:
+                container.append(value)
+        return result
+
+    def read_payload(self, path: Optional[str]) -> Union[LazyPayload, bytes, None]:
+        """Base64 の画像データの文字列を、内容を保持せずに読み進める。
+
+        内容ハッシュはチャンクごとにデコードしながら計算し、ファイル内の位置とともに LazyPayload を返す。
+        path が None の場合（読んでいる位置がファイル内の位置と一致しない場合）はデコードしたバイト列を返す。
+        空文字列の場合は None。
+        """
+        self.expect(_QUOTE)
+        offset = self.position
+        hasher = hashlib.blake2b(digest_size=12)
+        decoded: Optional[List[bytes]] = [] if path is None else None
+        pending = b""
+        length = 0
+        while True:
+            buf, pos = self._buf, self._pos
+            end = _PAYLOAD.match(buf, pos).end()
+            if end > pos:
+                # Base64 は4文字単位でデコードし、端数は次のチャンクと合わせる
+                text = pending + buf[pos:end].replace(b"\\", b"")
+                usable = len(text) - len(text) % 4
+                try:
+                    data = decode_image_data(text[:usable])
+                except binascii.Error as e:
+                    raise self.error(f"Invalid image data: {e}")
+                if decoded is not None:
+                    decoded.append(data)
+                else:
+                    hasher.update(data)
+                pending = text[usable:]
+                length += end - pos
+                self._pos = end
+            if end < len(buf):
+                if buf[end] == _QUOTE:
+                    self._pos += 1
+                    break
+                if end + 1 < len(buf):
+                    raise self.error("Unsupported escape in image data")
+            if not self._fill():
+                raise self.error("Unterminated string")
+        if pending:
+            raise self.error("Invalid image data: incorrect padding")
+        if length == 0:
+            return None
+        if decoded is not None:
+            return b"".join(decoded)
+        return LazyPayload(path, offset, length, hasher.hexdigest())
+
+
+class _NodeFrame:
+    """読み込み中のノード（JSON のオブジェクト）の状態"""
+    __slots__ = ("parent", "fields", "node", "has_text", "in_children", "started", "child_started",
+                 "document", "is_root")
+
+    def __init__(self, parent: Optional[Node], document: bool = False, is_root: bool = False):
+        self.parent = parent
+        self.fields: dict = {}
+        self.node: Optional[Node] = None
+        self.has_text = False
+        self.in_children = False
+        self.started = False  # オブジェクトの項目を読んだか（次の項目の前にカンマが必要か）
+        self.child_started = False  # children 配列の要素を読んだか
+        self.document = document
+        self.is_root = is_root
+
+
+class DocumentLoader:
+    """保存ファイルを先頭から順に読み、Node を直接構築するローダー。
+
+    ファイル全体を文字列や辞書として保持せず、チャンク単位で読みながらノードを作成する。
+    画像データはデコードせず、ファイル内の位置を指す LazyPayload として保持し、描画時に読み込む。
+    深いツリーでも再帰しない。
+
+    別スレッドで実行できる（構築したノードはモデルに登録されていない）。progress にはチャンクを
+    読むたびに読み込んだバイト数を渡し、is_cancelled が True を返すと LoadCancelled を送出して中止する。
+
+    path が None の場合は画像データをデコードしてメモリに保持する（圧縮されたメンバーを読む場合等）。
+    assets には "assets" 以外から得た画像データ（コンテナ形式の画像メンバー）を内容ハッシュで渡せる。
+    """
+
+    def __init__(self, file: BinaryIO, path: Optional[str], chunk_size: int = LOAD_CHUNK_BYTES,
+                 progress: Optional[Callable[[int], None]] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None,
+                 assets: Optional[Dict[str, Union[LazyPayload, bytes]]] = None):
+        self._reader = _Reader(file, chunk_size, self._on_chunk)
+        self._path = path
+        self._progress = progress
+        self._is_cancelled = is_cancelled
+        self._root: Optional[Node] = None
+        self._references: list = []
+        self._assets: Dict[str, Union[LazyPayload, bytes]] = dict(assets or {})
+        # 後ろの "assets" を読むまで解決できない、内容ハッシュによる参照 (ノード, 属性, キー)
+        self._pending_assets: List[Tuple[Node, str, str]] = []
+
+    def _on_chunk(self, position: int):
+        if self._is_cancelled is not None and self._is_cancelled():
+            raise LoadCancelled()
+        if self._progress is not None:
+            self._progress(position)
+
+    def load(self) -> Tuple[Node, List[Reference]]:
+        """ルートノードと参照のリストを返す"""
+        reader = self._reader
+        reader.expect(_LBRACE)
+        self._parse(_NodeFrame(None, document=True))
+        if reader.peek() is not None:
+            raise reader.error("Extra data")
+        for node, attribute, key in self._pending_assets:
+            if getattr(node, attribute[:-5] + "_key") is None:
+                setattr(node, attribute, self._assets.get(key))
+        references = [Reference.from_dict(r) for r in self._references]
+        return self._root, references
+
+    def _parse(self, document: _NodeFrame):
+        reader = self._reader
+        stack = [document]
+        while stack:
+            frame = stack[-1]
+            char = reader.peek()
+            if frame.in_children:
+                if char == _RBRACKET:
+                    reader.expect(_RBRACKET)
+                    frame.in_children = False
+                    continue
+                if frame.child_started:
+                    reader.expect(_COMMA)
+                frame.child_started = True
+                reader.expect(_LBRACE)
+                stack.append(self._start_node(frame.node))
+                continue
+            if char == _RBRACE:
+                reader.expect(_RBRACE)
+                stack.pop()
+                self._finish(frame)
+                continue
+            if frame.started:
+                reader.expect(_COMMA)
+            frame.started = True
+            key = reader.read_string()
+            reader.expect(_COLON)
+            if frame.document and key == "root":
+                reader.expect(_LBRACE)
+                stack.append(self._start_node(None, is_root=True))
+            elif frame.document and key == "references":
+                self._references = reader.read_value()
+            elif frame.document and key == "assets":
+                self._read_assets()
+            elif key == "children":
+                self._ensure_node(frame)
+                reader.expect(_LBRACKET)
+                frame.in_children = True
+            elif key in _MEDIA_FIELDS and reader.peek() == _QUOTE:
+                frame.fields[key] = reader.read_payload(self._path)
+            else:
+                if key == "text":
+                    frame.has_text = True
+                frame.fields[key] = reader.read_value()
+
+    def _start_node(self, parent: Optional[Node], is_root: bool = False) -> _NodeFrame:
+        """"{" の直後から新しいノードを読み始める。通常の形式のノードは children の前までを一度に読む"""
+        frame = _NodeFrame(parent, is_root=is_root)
+        fields = self._reader.read_node_head()
+        if fields is not None:
+            frame.fields = fields
+            frame.has_text = "text" in fields
+            frame.started = True
+            self._ensure_node(frame)
+            frame.in_children = True
+        return frame
+
+    def _read_assets(self):
+        reader = self._reader
+        reader.expect(_LBRACE)
+        first = True
+        while reader.peek() != _RBRACE:
+            if not first:
+                reader.expect(_COMMA)
+            first = False
+            key = reader.read_string()
+            reader.expect(_COLON)
+            if reader.peek() == _QUOTE:
+                payload = reader.read_payload(self._path)
+                if payload is not None:
+                    self._assets[key] = payload
+            else:
+                reader.read_value()
+        reader.expect(_RBRACE)
+
+    def _ensure_node(self, frame: _NodeFrame) -> Node:
+        """ノードを作成して親に追加する（children より前に読んだ項目はここで反映する）"""
+        if frame.node is None:
+            node = frame.node = Node(frame.fields.get("text", ""), parent=frame.parent)
+            if frame.parent is not None:
+                frame.parent.children.append(node)
+            self._apply_fields(node, frame.fields)
+            frame.fields = {}
+        return frame.node
+
+    def _finish(self, frame: _NodeFrame):
+        if frame.document:
+            if self._root is None:
+                # 古いバージョンの形式（ルートトピック直書き）
+                if not frame.has_text:
+                    raise self._reader.error("Missing root topic")
+                self._root = self._ensure_node(frame)
+                self._apply_fields(self._root, frame.fields)
+            return
+        if not frame.has_text:
+            raise self._reader.error("Topic has no text")
+        node = self._ensure_node(frame)
+        # children より後ろにあった項目
+        self._apply_fields(node, frame.fields)
+        if frame.is_root:
+            self._root = node
+
+    def _apply_fields(self, node: Node, fields: dict):
+        for key, value in fields.items():
+            if key == "id":
+                node.id = value
+            elif key == "text":
+                node.text = value
+            elif key in ("direction", "color", "image_path", "icon_path"):
+                setattr(node, key, value)
+            elif key == "collapsed":
+                node.collapsed = value
+            elif key in _MEDIA_FIELDS:
+                if value:
+                    setattr(node, key, value)
+            elif key in _ASSET_FIELDS:
+                if value:
+                    self._pending_assets.append((node, _ASSET_FIELDS[key], value))
+
+
+def load_document(file: BinaryIO, path: Optional[str], chunk_size: int = LOAD_CHUNK_BYTES,
+                  progress: Optional[Callable[[int], None]] = None,
+                  is_cancelled: Optional[Callable[[], bool]] = None,
+                  assets: Optional[Dict[str, Union[LazyPayload, bytes]]] = None) -> Tuple[Node, List[Reference]]:
+    """バイナリモードで開いた保存ファイルを読み込み、ルートノードと参照のリストを返す。
+
+    path は画像データを後から読み込むためのファイルのパス。progress・is_cancelled・assets は
+    DocumentLoader を参照。
+    """
+    return DocumentLoader(file, path, chunk_size, progress, is_cancelled, assets).load()
@@ -0,0 +1,142 @@
+import json
+from json.encoder import encode_basestring
+from typing import Callable, List, Optional, Tuple
+
+from .lazy_payload import LazyPayload, encode_payload
+from .snapshot import NODE_FIELDS, REFERENCE_FIELDS, ModelSnapshot
+
+# 書き込み前にまとめる文字数の目安
+CHUNK_CHARS = 64 * 1024
+
+
+def _scalar(value) -> str:
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, str):
+        return encode_basestring(value)
+    return json.dumps(value)
+
+
+class _ChunkWriter:
+    """小さな文字列をまとめて、一定量ごとに UTF-8 で書き込む（書き込んだバイト数を数える）"""
+
+    def __init__(self, write: Callable[[bytes], object], chunk_chars: int):
+        self._write = write
+        self._chunk_chars = chunk_chars
+        self._parts: List[str] = []
+        self._size = 0
+        self.position = 0
+
+    def add(self, text: str):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._chunk_chars:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            data = "".join(self._parts).encode("utf-8")
+            self._write(data)
+            self.position += len(data)
+            self._parts = []
+            self._size = 0
+
+
+def write_snapshot(snapshot: ModelSnapshot, write: Callable[[bytes], object], indent: Optional[int] = None,
+                   chunk_chars: int = CHUNK_CHARS, assets: bool = True) -> List[Tuple[LazyPayload, int, int, bool]]:
+    """スナップショットを保存形式の JSON としてツリーを辿りながら書き出す。
+
+    保存用の辞書全体を構築せず、ノードごとに文字列を生成して chunk_chars 程度ずつ write に渡す。
+    indent を指定した場合は json.dump(..., ensure_ascii=False, indent=indent) と同じ出力になり、
+    None の場合は空白を含まない最小の形式で出力する。深いツリーでも再帰しない。
+    write には UTF-8 のバイト列を渡す。
+
+    assets が False の場合は "assets" の項目を書き出さない（画像データを別に保存する形式用）。
+    遅延読み込みの画像データ（LazyPayload）と、その Base64 文字列を書き出した位置・長さの組のリスト
+    （replace_file() に渡す形式）を返す。
+    """
+    out = _ChunkWriter(write, chunk_chars)
+    if indent is None:
+        key_sep = ":"
+
+        def newline(level: int) -> str:
+            return ""
+    else:
+        key_sep = ": "
+        unit = " " * indent
+
+        def newline(level: int) -> str:
+            return "\n" + unit * level
+
+    keys = [encode_basestring(name) + key_sep for name in NODE_FIELDS]
+    children_key = encode_basestring("children") + key_sep
+
+    out.add("{" + newline(1) + encode_basestring("root") + key_sep)
+    # スタックにはノードのレコード（とその深さ）か、そのまま出力する区切り文字列を積む
+    stack: list = [(snapshot.root, 1)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.add(item)
+            continue
+        record, level = item
+        inner = newline(level + 1)
+        parts = ["{"]
+        for key, value in zip(keys, record):
+            parts.append(inner)
+            parts.append(key)
+            parts.append(_scalar(value))
+            parts.append(",")
+        parts.append(inner)
+        parts.append(children_key)
+        children = record[-1]
+        if not children:
+            parts.append("[]" + newline(level) + "}")
+            out.add("".join(parts))
+            continue
+        parts.append("[")
+        out.add("".join(parts))
+        stack.append(newline(level + 1) + "]" + newline(level) + "}")
+        child_sep = newline(level + 2)
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], level + 2))
+            stack.append(child_sep if i == 0 else "," + child_sep)
+
+    out.add("," + newline(1) + encode_basestring("references") + key_sep)
+    if snapshot.references:
+        out.add("[")
+        for i, ref in enumerate(snapshot.references):
+            out.add(("," if i else "") + newline(2) + "{")
+            out.add(",".join(newline(3) + encode_basestring(name) + key_sep + _scalar(value)
+                             for name, value in zip(REFERENCE_FIELDS, ref)))
+            out.add(newline(2) + "}")
+        out.add(newline(1) + "]")
+    else:
+        out.add("[]")
+
+    moves: List[Tuple[LazyPayload, int, int, bool]] = []
+    if not assets:
+        out.add(newline(0) + "}")
+        out.flush()
+        return moves
+    out.add("," + newline(1) + encode_basestring("assets") + key_sep)
+    if snapshot.assets:
+        out.add("{")
+        for i, (key, data) in enumerate(snapshot.assets.items()):
+            # Base64 への変換は書き出す直前に1件ずつ行う
+            out.add(("," if i else "") + newline(2) + encode_basestring(key) + key_sep + '"')
+            text = encode_payload(data)
+            if isinstance(data, LazyPayload) and data.relocatable:
+                out.flush()
+                moves.append((data, out.position, len(text), True))
+            out.add(text + '"')
+        out.add(newline(1) + "}")
+    else:
+        out.add("{}")
+    out.add(newline(0) + "}")
+    out.flush()
+    return moves
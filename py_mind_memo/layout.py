@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Set, Tuple
 from .models import Node, MindMapModel
 
 
@@ -44,45 +44,95 @@ def compute_root_child_angles(n: int) -> List[float]:
 class LayoutEngine:
     """マインドマップの配置計算を担当するクラス"""
 
-    def __init__(self):
+    def __init__(self, incremental: bool = False):
         self.h_margin = 80   # root topic と子トピック列の水平余白
         self.v_gap = 40      # （互換性のため残す）
         self.spacing_y = 30  # 垂直方向の最小間隔
 
+        # True の場合、dirty フラグの立ったサブツリーのみ再計算する
+        self.incremental = incremental
+        # 直近の apply_layout で位置またはサイズが変化したノード
+        self.moved_nodes: Set[Node] = set()
+        self._full_pass = True
+        # 配置するノードの深さの上限（ルートは 0）。None は上限なし。
+        # 大きなマップを浅い階層から段階的に表示する間だけ設定する
+        self.max_depth: Optional[int] = None
+        self._applied_max_depth: Optional[int] = None
+
     def calculate_subtree_height(self, node: Node, graphics):
         """そのノードを含むサブツリー全体の必要高さを計算・更新する"""
-        font = graphics.root_font if node.parent is None else graphics.font
-        node.width, node.height = graphics.get_text_size(node, font)
-
-        if not node.children or node.collapsed:
-            node.subtree_height = node.height
-            return node.height
-
-        total_height = sum(self.calculate_subtree_height(c, graphics) for c in node.children)
-        total_height += self.spacing_y * (len(node.children) - 1)
-
-        node.subtree_height = max(node.height, total_height)
+        # 深いツリーでも再帰しないよう、明示的なスタックで帰りがけ順に処理する
+        max_depth = self.max_depth
+        stack = [(node, False, self._depth_of(node) if max_depth is not None else 0)]
+        while stack:
+            n, children_done, depth = stack.pop()
+            if children_done:
+                total_height = sum(c.subtree_height for c in n.children)
+                total_height += self.spacing_y * (len(n.children) - 1)
+                n.subtree_height = max(n.height, total_height)
+                continue
+
+            if not self._full_pass and not n._layout_dirty:
+                # 変更のないサブツリーは前回の計算結果を再利用する
+                continue
+
+            old_size = (n.width, n.height)
+            font = graphics.root_font if n.parent is None else graphics.font
+            n.width, n.height = graphics.get_text_size(n, font)
+            if (n.width, n.height) != old_size:
+                self.moved_nodes.add(n)
+
+            if not n.children or n.collapsed or (max_depth is not None and depth >= max_depth):
+                n.subtree_height = n.height
+                continue
+
+            stack.append((n, True, depth))
+            stack.extend((c, False, depth + 1) for c in reversed(n.children))
         return node.subtree_height
 
-    def apply_layout(self, model: MindMapModel, graphics, center_x, center_y):
-        """全体のレイアウトを計算し、各ノードの座標を決定する"""
+    @staticmethod
+    def _depth_of(node: Node) -> int:
+        depth = 0
+        while node.parent is not None:
+            node = node.parent
+            depth += 1
+        return depth
+
+    def within_max_depth(self, node: Node) -> bool:
+        """深さの上限により配置の対象外になっているノードでなければ True"""
+        return self.max_depth is None or self._depth_of(node) <= self.max_depth
+
+    def apply_layout(self, model: MindMapModel, graphics, center_x, center_y, incremental=None) -> Set[Node]:
+        """全体のレイアウトを計算し、各ノードの座標を決定する。
+
+        incremental モードでは dirty なサブツリーのみ再計算し、影響を受けない兄弟サブツリーは
+        平行移動のみ行う。位置またはサイズが変化したノードの集合を返す。
+        """
+        if incremental is None:
+            incremental = self.incremental
+        # 深さの上限が変わった場合は、配置の対象になるノードが変わるため全体を再計算する
+        self._full_pass = not incremental or self.max_depth != self._applied_max_depth
+        self._applied_max_depth = self.max_depth
+        self.moved_nodes = set()
+
         root = model.root
         self.calculate_subtree_height(root, graphics)
 
+        if (root.x, root.y) != (center_x, center_y):
+            self.moved_nodes.add(root)
         root.x = center_x
         root.y = center_y
 
         children = root.children
         n = len(children)
         if n == 0:
-            return
+            root._layout_dirty = False
+            return self.moved_nodes
 
         # 角度リストを取得（追加順に対応）
         angles = compute_root_child_angles(n)
 
-        # 各子トピックのサイズを事前計算
-        for child in children:
-            child.width, child.height = graphics.get_text_size(child, graphics.font)
+        # 各子トピックのサイズを事前計算（calculate_subtree_height で更新済み）
 
         # ── 角度で左右グループに振り分ける ──
         # 角度 0°〜180°  → 右側（direction='right'）
@@ -97,11 +147,12 @@ class LayoutEngine:
         for child, angle in zip(children, angles):
             if angle <= 180.0:
                 right_pairs.append((angle, child))
-                child.direction = 'right'
+                direction = 'right'
             else:
                 left_pairs.append((angle, child))
-                child.direction = 'left'
-            child.update_direction_recursive(child.direction)
+                direction = 'left'
+            if self._full_pass or child.direction != direction:
+                child.update_direction_recursive(direction)
 
         # 縦並び順（上→下）に並べ直す
         right_pairs.sort(key=lambda t: t[0])          # 昇順
@@ -123,6 +174,9 @@ class LayoutEngine:
             left_x = center_x - root_half_w - self.h_margin - max_hw
             self._layout_root_children(left_nodes, left_x, center_y, 'left')
 
+        root._layout_dirty = False
+        return self.moved_nodes
+
     def get_simulated_root_drop_position(self, root: Node, new_node: Node) -> Tuple[float, float, str]:
         """root直下へのドロップ時のシミュレーション座標を移動前の状態で計算する"""
         old_children = [c for c in root.children if c != new_node]
@@ -161,15 +215,15 @@ class LayoutEngine:
                 node_below = n
                 break
 
-        new_h = getattr(new_node, 'subtree_height', new_node.height)
+        new_h = new_node.subtree_height
         
         if node_above:
             ref_y = node_above.y
-            ref_h = getattr(node_above, 'subtree_height', node_above.height)
+            ref_h = node_above.subtree_height
             target_y = ref_y + ref_h / 2 + self.spacing_y + new_h / 2
         elif node_below:
             ref_y = node_below.y
-            ref_h = getattr(node_below, 'subtree_height', node_below.height)
+            ref_h = node_below.subtree_height
             target_y = ref_y - ref_h / 2 - self.spacing_y - new_h / 2
         else:
             target_y = root.y
@@ -194,8 +248,8 @@ class LayoutEngine:
 
         if target_node.children and not target_node.collapsed:
             last_child = max(target_node.children, key=lambda c: c.y)
-            child_sh = getattr(last_child, 'subtree_height', last_child.height)
-            dragged_sh = getattr(new_node, 'subtree_height', new_node.height)
+            child_sh = last_child.subtree_height
+            dragged_sh = new_node.subtree_height
             target_y = last_child.y + child_sh/2 + self.spacing_y + dragged_sh/2
         else:
             target_y = target_node.y
@@ -214,14 +268,44 @@ class LayoutEngine:
         current_y = center_y - total_height / 2
 
         for node in nodes:
-            node.x = child_x
-            node.y = current_y + node.subtree_height / 2
-
-            if node.children and not node.collapsed:
-                self._layout_branch(node.children, node.x, node.y, direction)
-
+            self._place_node(node, child_x, current_y + node.subtree_height / 2, direction)
             current_y += node.subtree_height + self.spacing_y
 
+    def _place_node(self, node: Node, x: float, y: float, direction: str):
+        """ノードとその子孫を配置する。変更のないサブツリーは再計算せず平行移動する。"""
+        # 深いツリーでも再帰しないよう、配置待ちのノードを明示的なスタックで管理する
+        max_depth = self.max_depth
+        stack = [(node, x, y, 1)]
+        while stack:
+            n, x, y, depth = stack.pop()
+            if not self._full_pass and not n._layout_dirty:
+                dx, dy = x - n.x, y - n.y
+                if dx or dy:
+                    self._translate_subtree(n, dx, dy, depth)
+                continue
+
+            if (n.x, n.y) != (x, y):
+                self.moved_nodes.add(n)
+            n.x = x
+            n.y = y
+            n._layout_dirty = False
+
+            if n.children and not n.collapsed and (max_depth is None or depth < max_depth):
+                stack.extend((c, cx, cy, depth + 1)
+                             for c, cx, cy in reversed(self._branch_positions(n.children, n.y, direction)))
+
+    def _translate_subtree(self, node: Node, dx: float, dy: float, depth: int = 1):
+        """表示中のサブツリー全体を (dx, dy) だけ平行移動する（depth は node の深さ）"""
+        max_depth = self.max_depth
+        stack = [(node, depth)]
+        while stack:
+            n, d = stack.pop()
+            n.x += dx
+            n.y += dy
+            self.moved_nodes.add(n)
+            if not n.collapsed and (max_depth is None or d < max_depth):
+                stack.extend((c, d + 1) for c in n.children)
+
     # ──────────────────────────────────────────────────────────────
     # 孫以降のサブツリー配置（従来ロジック）
     # ──────────────────────────────────────────────────────────────
@@ -231,25 +315,21 @@ class LayoutEngine:
             return 0
         return sum(n.subtree_height for n in nodes) + self.spacing_y * (len(nodes) - 1)
 
-    def _layout_branch(self, nodes: List[Node], parent_x: float,
-                        start_y: float, direction: str):
-        if not nodes:
-            return
-
+    def _branch_positions(self, nodes: List[Node], start_y: float,
+                          direction: str) -> List[Tuple[Node, float, float]]:
+        """親ノードの横に子ノードを縦に並べた際の各ノードの座標を返す"""
         total_height = (sum(n.subtree_height for n in nodes)
                         + self.spacing_y * (len(nodes) - 1))
         current_y = start_y - total_height / 2
 
+        positions = []
         for node in nodes:
             p = node.parent
             if direction == 'right':
-                node.x = p.x + p.width / 2 + self.h_margin + node.width / 2
+                x = p.x + p.width / 2 + self.h_margin + node.width / 2
             else:
-                node.x = p.x - p.width / 2 - self.h_margin - node.width / 2
-
-            node.y = current_y + node.subtree_height / 2
-
-            if node.children and not node.collapsed:
-                self._layout_branch(node.children, node.x, node.y, direction)
+                x = p.x - p.width / 2 - self.h_margin - node.width / 2
 
+            positions.append((node, x, current_y + node.subtree_height / 2))
             current_y += node.subtree_height + self.spacing_y
+        return positions
@@ -0,0 +1,153 @@
+import os
+import threading
+import weakref
+from typing import Dict, Iterable, Optional, Tuple
+
+from .image_utils import decode_image_data, encode_image_data
+
+# ファイルの読み出しと、保存によるファイルの置き換え・参照先の付け替えを排他する
+_lock = threading.RLock()
+# ファイル（正規化したパス）ごとの、そのファイルを参照している遅延データ
+_by_path: Dict[str, "weakref.WeakSet[LazyPayload]"] = {}
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class LazyPayload:
+    """保存ファイル内の画像データへの参照。データは必要になった時点でファイルから読み込む。
+
+    ファイル内の offset から length バイトが Base64 文字列（encoded=True）または PNG のバイト列。
+    key は内容ハッシュ（media_key() と同じ値）で、データを読み込まずにノードの識別やキャッシュに使える。
+    読み込んだデータは保持しない（描画結果は PhotoImageCache が保持する）。
+    """
+    __slots__ = ("key", "length", "encoded", "_path", "_offset", "_data", "__weakref__")
+    # 保存時に書き出し先のファイル内の位置へ付け替えられるか（replace_file() の moves に渡せるか）
+    relocatable = True
+
+    def __init__(self, path: str, offset: int, length: int, key: str, encoded: bool = True):
+        self.key = key
+        self.length = length
+        self.encoded = encoded
+        self._path: Optional[str] = None
+        self._offset = offset
+        self._data: Optional[bytes] = None
+        self._attach(_norm(path), offset)
+
+    def _attach(self, path: str, offset: int, length: Optional[int] = None, encoded: Optional[bool] = None):
+        with _lock:
+            if self._path is not None:
+                handles = _by_path.get(self._path)
+                if handles is not None:
+                    handles.discard(self)
+                    if not handles:
+                        del _by_path[self._path]
+            self._path, self._offset = path, offset
+            if length is not None:
+                self.length = length
+            if encoded is not None:
+                self.encoded = encoded
+            _by_path.setdefault(path, weakref.WeakSet()).add(self)
+
+    def _read(self) -> bytes:
+        with _lock:
+            if self._data is not None:
+                return self._data
+            return self._read_source()
+
+    def _read_source(self, length: Optional[int] = None) -> bytes:
+        """参照先からデータ（length を渡した場合は先頭の length バイト）を読み込む（_lock を保持した状態で呼ばれる）"""
+        if length is None:
+            length = self.length
+        with open(self._path, "rb") as f:
+            f.seek(self._offset)
+            raw = f.read(length)
+        if len(raw) != length:
+            raise OSError(f"Image data is truncated in {self._path} (offset {self._offset})")
+        return raw
+
+    def load(self) -> bytes:
+        """画像データ（PNG のバイト列）を読み込んで返す"""
+        raw = self._read()
+        if self._data is not None or not self.encoded:
+            return raw
+        return decode_image_data(raw)
+
+    def head(self, size: int) -> bytes:
+        """画像データの先頭 size バイトだけを読み込んで返す（画像ヘッダーの参照用）"""
+        with _lock:
+            if self._data is not None:
+                return self._data[:size]
+            if not self.encoded:
+                return self._read_source(min(size, self.length))
+            # Base64 は 4 文字で 3 バイト。エスケープの "\" を除いても足りるよう2倍の長さを読む
+            chars = -(-size // 3) * 4
+            raw = self._read_source(min(chars * 2, self.length)).replace(b"\\", b"")
+        return decode_image_data(raw[:chars])[:size]
+
+    def encoded_text(self) -> str:
+        """保存形式の Base64 文字列を返す（ファイル内が Base64 ならデコードせずにそのまま返す）"""
+        raw = self._read()
+        if self._data is None and self.encoded:
+            # 他のツールが書き出した "\/" のエスケープは取り除く
+            return raw.replace(b"\\", b"").decode("ascii")
+        return encode_image_data(raw)
+
+    def _materialize(self):
+        """参照先のファイルが置き換えられる前にデータをメモリに読み込み、以降はファイルを参照しない"""
+        with _lock:
+            if self._data is None:
+                self._data = self.load()
+                self.encoded = False
+                self.length = len(self._data)
+                handles = _by_path.get(self._path)
+                if handles is not None:
+                    handles.discard(self)
+
+    def __repr__(self) -> str:
+        return f"LazyPayload(key={self.key!r}, length={self.length})"
+
+
+def resolve_payload(data) -> Optional[bytes]:
+    """ノードが保持する画像データ（バイト列または LazyPayload）をバイト列として返す"""
+    if isinstance(data, LazyPayload):
+        return data.load()
+    return data
+
+
+def encode_payload(data) -> str:
+    """画像データを保存形式の Base64 文字列に変換する"""
+    if isinstance(data, LazyPayload):
+        return data.encoded_text()
+    return encode_image_data(data)
+
+
+def release_payloads(file_path: str, keys: Iterable[str]):
+    """file_path 内のデータを削除する前に、keys のデータを参照している遅延データをメモリに読み込む"""
+    keys = set(keys)
+    with _lock:
+        for payload in list(_by_path.get(_norm(file_path), ())):
+            if payload.key in keys:
+                payload._materialize()
+
+
+def replace_file(temp_path: str, file_path: str, moves: Iterable[Tuple[LazyPayload, int, int, bool]] = ()):
+    """一時ファイルで file_path をアトミックに置き換える。
+
+    moves は新しいファイルに同じ内容を書き出した遅延データと、その書き出し位置・長さ・Base64 で
+    書き出したかの組。これらは置き換え後に
+    新しいファイルを参照するよう付け替え、それ以外で file_path を参照している遅延データ（取り消し履歴
+    だけが持つもの等）は置き換え前にメモリへ読み込む。
+    """
+    target = _norm(file_path)
+    moves = list(moves)
+    moved = {id(payload) for payload, _, _, _ in moves}
+    with _lock:
+        for payload in list(_by_path.get(target, ())):
+            if id(payload) not in moved:
+                payload._materialize()
+        os.replace(temp_path, file_path)
+        for payload, offset, length, encoded in moves:
+            if payload._data is None:
+                payload._attach(target, offset, length, encoded)
@@ -1,8 +1,35 @@
+import hashlib
 import uuid
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+from .events import ChangeBus, ChangeEvent, ChangeListener, ChangeType
+from .snapshot import ModelSnapshot
+from .asset_store import AssetStore
+from .image_utils import decode_image_data
+from .lazy_payload import LazyPayload, encode_payload, resolve_payload
+
+# サブツリーの指紋（Merkle ハッシュ）のバイト数
+FINGERPRINT_SIZE = 16
+
+
+def media_key(data: Optional[bytes]) -> Optional[str]:
+    """画像データの内容ハッシュ（PhotoImageCache のキーと同じ値）"""
+    if not data:
+        return None
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def payload_key(data) -> Optional[str]:
+    """ノードが保持する画像データ（バイト列または LazyPayload）の内容ハッシュ"""
+    if isinstance(data, LazyPayload):
+        return data.key
+    return media_key(data)
+
 
 class Reference:
     """トピック間の参照関係を表すクラス"""
+    __slots__ = ("id", "source_id", "target_id", "cp1_x", "cp1_y", "cp2_x", "cp2_y")
+
     def __init__(self, source_id: str, target_id: str):
         self.id = str(uuid.uuid4())
         self.source_id = source_id
@@ -36,24 +63,279 @@ class Reference:
 
 class Node:
     """マインドマップの単一のトピックを表すクラス"""
+    # 大量のトピックを扱うため、インスタンス辞書を持たない固定レイアウトにする。
+    # レイアウト・描画で使うキャッシュもここで宣言する
+    __slots__ = (
+        "id", "_text", "parent", "children", "_direction",
+        "x", "y", "width", "height", "_color", "_collapsed",
+        "_image_data", "_image_path", "_icon_data", "_icon_path",
+        "_model", "_layout_dirty",
+        "subtree_height", "_size_cache", "_size_cache_key",
+        "_image_key", "_icon_key", "_content_hash", "_subtree_hash", "_record",
+    )
+
     def __init__(self, text: str, parent: Optional['Node'] = None):
         self.id = str(uuid.uuid4())
-        self.text = text
+        self._text = text
         self.parent = parent
         self.children: List['Node'] = []
-        self.direction = None  # 'left' or 'right' (主にルートの子ノードで使用)
+        self._direction: Optional[str] = None  # 'left' or 'right' (主にルートの子ノードで使用)
         
         # UI表示用のプロパティ
         self.x = 0.0
         self.y = 0.0
         self.width = 100
         self.height = 40
-        self.color = None
-        self.collapsed = False
-        self.image_data: Optional[str] = None  # Base64 encoded PNG data
-        self.image_path: Optional[str] = None  # Original image file path
-        self.icon_data: Optional[str] = None   # Base64 encoded PNG data for icon
-        self.icon_path: Optional[str] = None   # Original image file path for icon
+        self._color: Optional[str] = None
+        self._collapsed = False
+        self._image_data: Optional[bytes] = None  # PNG data（遅延読み込みの場合は LazyPayload）
+        self._image_path: Optional[str] = None  # Original image file path
+        self._icon_data: Optional[bytes] = None   # PNG data for icon（同上）
+        self._icon_path: Optional[str] = None   # Original image file path for icon
+
+        # 所属するモデル（ID索引の維持に使用）。モデルに未登録の場合は None
+        self._model: Optional['MindMapModel'] = None
+        # レイアウト再計算が必要か（新規ノードは常に再計算対象）
+        self._layout_dirty = True
+
+        # レイアウト結果（子孫を含めた高さ）と、描画サイズのキャッシュ
+        self.subtree_height = self.height
+        self._size_cache: Optional[tuple] = None
+        self._size_cache_key: Optional[tuple] = None
+
+        # 内容の指紋。画像の内容ハッシュは設定時に1回だけ計算し、ノード自身・サブツリーの指紋は
+        # 必要になった時点で計算する（None は未計算または無効）
+        self._image_key: Optional[str] = None
+        self._icon_key: Optional[str] = None
+        self._content_hash: Optional[bytes] = None
+        self._subtree_hash: Optional[bytes] = None
+        # スナップショット用のサブツリーの不変レコード（None は未作成または無効）
+        self._record: Optional[tuple] = None
+
+    # ──────────────────────────────────────────────────────────────
+    # レイアウトに影響する属性（変更時に dirty フラグを立てる）
+    # ──────────────────────────────────────────────────────────────
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, value: str):
+        if value != self._text:
+            old = self._text
+            self._text = value
+            self._content_changed()
+            self.mark_layout_dirty()
+            self._notify(ChangeType.TEXT_CHANGED, old_value=old, new_value=value)
+
+    @property
+    def direction(self) -> Optional[str]:
+        return self._direction
+
+    @direction.setter
+    def direction(self, value: Optional[str]):
+        if value != self._direction:
+            self._direction = value
+            self._invalidate_record()
+
+    @property
+    def color(self) -> Optional[str]:
+        return self._color
+
+    @color.setter
+    def color(self, value: Optional[str]):
+        if value != self._color:
+            self._color = value
+            self._invalidate_record()
+
+    @property
+    def collapsed(self) -> bool:
+        return self._collapsed
+
+    @collapsed.setter
+    def collapsed(self, value: bool):
+        if value != self._collapsed:
+            old = self._collapsed
+            self._collapsed = value
+            self._content_changed()
+            self.mark_layout_dirty()
+            self._notify(ChangeType.COLLAPSED_TOGGLED, old_value=old, new_value=value)
+
+    @property
+    def image_data(self) -> Optional[bytes]:
+        return resolve_payload(self._image_data)
+
+    @image_data.setter
+    def image_data(self, value: Optional[bytes]):
+        if value != self._image_data:
+            old = self._image_data
+            key = payload_key(value)
+            if self._model is not None:
+                value = self._model._replace_asset(self._image_key, key, value)
+            self._image_data = value
+            self._image_key = key
+            self._content_changed()
+            self.mark_layout_dirty()
+            self._notify(ChangeType.MEDIA_CHANGED, attribute="image_data", old_value=old, new_value=value)
+
+    @property
+    def icon_data(self) -> Optional[bytes]:
+        return resolve_payload(self._icon_data)
+
+    @icon_data.setter
+    def icon_data(self, value: Optional[bytes]):
+        if value != self._icon_data:
+            old = self._icon_data
+            key = payload_key(value)
+            if self._model is not None:
+                value = self._model._replace_asset(self._icon_key, key, value)
+            self._icon_data = value
+            self._icon_key = key
+            self._content_changed()
+            self.mark_layout_dirty()
+            self._notify(ChangeType.MEDIA_CHANGED, attribute="icon_data", old_value=old, new_value=value)
+
+    @property
+    def image_path(self) -> Optional[str]:
+        return self._image_path
+
+    @image_path.setter
+    def image_path(self, value: Optional[str]):
+        if value != self._image_path:
+            old = self._image_path
+            self._image_path = value
+            self._content_changed()
+            self._notify(ChangeType.MEDIA_CHANGED, attribute="image_path", old_value=old, new_value=value)
+
+    @property
+    def icon_path(self) -> Optional[str]:
+        return self._icon_path
+
+    @icon_path.setter
+    def icon_path(self, value: Optional[str]):
+        if value != self._icon_path:
+            old = self._icon_path
+            self._icon_path = value
+            self._content_changed()
+            self._notify(ChangeType.MEDIA_CHANGED, attribute="icon_path", old_value=old, new_value=value)
+
+    def _notify(self, change_type: ChangeType, **fields):
+        """所属するモデルに変更イベントを通知する（モデル未登録・リスナー不在の場合は何もしない）"""
+        model = self._model
+        if model is not None and model.events.active:
+            model.events.emit(ChangeEvent(change_type, node=self, **fields))
+
+    def mark_layout_dirty(self):
+        """このノードと祖先をレイアウト再計算の対象としてマークする"""
+        node = self
+        while node is not None and not node._layout_dirty:
+            node._layout_dirty = True
+            node = node.parent
+        # 子の増減・並べ替えもここを通るため、サブツリーの指紋も併せて無効にする
+        self._invalidate_subtree_fingerprint()
+
+    # ──────────────────────────────────────────────────────────────
+    # 内容の指紋（変更検出用の Merkle ハッシュ）
+    # ──────────────────────────────────────────────────────────────
+
+    @property
+    def image_key(self) -> Optional[str]:
+        """画像データの内容ハッシュ（画像がなければ None）"""
+        return self._image_key
+
+    @property
+    def icon_key(self) -> Optional[str]:
+        """アイコンデータの内容ハッシュ（アイコンがなければ None）"""
+        return self._icon_key
+
+    @property
+    def image_payload(self):
+        """保持している画像データ。遅延読み込みの場合はファイルから読まずに LazyPayload を返す"""
+        return self._image_data
+
+    @property
+    def icon_payload(self):
+        """保持しているアイコンデータ（image_payload と同様）"""
+        return self._icon_data
+
+    @property
+    def content_fingerprint(self) -> bytes:
+        """子を除いたこのノード自身の内容の指紋。
+
+        方向と色は木構造とレイアウトから決まる値のため含めない。
+        """
+        if self._content_hash is None:
+            content = (self.id, self._text, self._collapsed, self._image_key, self._image_path,
+                       self._icon_key, self._icon_path)
+            self._content_hash = hashlib.blake2b(repr(content).encode("utf-8"),
+                                                 digest_size=FINGERPRINT_SIZE).digest()
+        return self._content_hash
+
+    @property
+    def fingerprint(self) -> bytes:
+        """このノードと子孫全体の内容の指紋（Merkle ハッシュ）。
+
+        変更のないサブツリーの指紋は保持され、変更時は変更箇所から祖先に向かって無効化されるため、
+        再計算は変更されたノードの祖先とその子の数に比例する。
+        """
+        if self._subtree_hash is None:
+            self._compute_fingerprints()
+        return self._subtree_hash
+
+    def _compute_fingerprints(self):
+        # 指紋が無効なノードだけを帰りがけ順に計算する（深いツリーでも再帰しない）
+        stack = [(self, False)]
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                h = hashlib.blake2b(node.content_fingerprint, digest_size=FINGERPRINT_SIZE)
+                for child in node.children:
+                    h.update(child._subtree_hash)
+                node._subtree_hash = h.digest()
+            elif node._subtree_hash is None:
+                stack.append((node, True))
+                stack.extend((c, False) for c in node.children if c._subtree_hash is None)
+
+    def _content_changed(self):
+        self._content_hash = None
+        self._invalidate_subtree_fingerprint()
+
+    def _invalidate_subtree_fingerprint(self):
+        """このノードと祖先のサブツリーの指紋とスナップショット用レコードを無効にする。
+
+        無効なノードの祖先は常に無効なので、どちらも無効なノードに達した時点で打ち切る。
+        """
+        node = self
+        while node is not None and (node._subtree_hash is not None or node._record is not None):
+            node._subtree_hash = None
+            node._record = None
+            node = node.parent
+
+    def _invalidate_record(self):
+        """指紋に含まれない保存対象の値（方向・色）の変更時に、レコードのみを無効にする"""
+        node = self
+        while node is not None and node._record is not None:
+            node._record = None
+            node = node.parent
+
+    def snapshot_record(self) -> tuple:
+        """サブツリーの内容を表す不変のレコード（snapshot.NODE_FIELDS の順の値と子のレコードのタプル）。
+
+        変更のないサブツリーのレコードは再利用されるため、再作成は無効化された経路上のノードのみで済む。
+        """
+        if self._record is None:
+            stack = [(self, False)]
+            while stack:
+                node, ready = stack.pop()
+                if ready:
+                    node._record = (node.id, node._text, node._direction, node._color, node._collapsed,
+                                    node._image_key, node._image_path, node._icon_key, node._icon_path,
+                                    tuple([c._record for c in node.children]))
+                elif node._record is None:
+                    stack.append((node, True))
+                    stack.extend((c, False) for c in node.children if c._record is None)
+        return self._record
 
     def add_child(self, text: str, direction: Optional[str] = None) -> 'Node':
         child = Node(text, parent=self)
@@ -64,18 +346,71 @@ class Node:
             child.direction = self.direction
         child.color = self.color # 親の色を継承
         self.children.append(child)
+        self.mark_layout_dirty()
+        if self._model is not None:
+            self._model._register_subtree(child)
+            self._model._root_children_changed(self)
+            child._notify(ChangeType.NODE_ADDED, parent=self, index=len(self.children) - 1)
         return child
 
+    def insert_child(self, node: 'Node', index: Optional[int] = None):
+        """どこにも属していないノード（サブツリー）を index 番目の子として挿入する"""
+        if index is None:
+            index = len(self.children)
+        node.parent = self
+        self.children.insert(index, node)
+        node._layout_dirty = True
+        self.mark_layout_dirty()
+        if self._model is not None:
+            self._model._register_subtree(node)
+            self._model._root_children_changed(self)
+            node._notify(ChangeType.NODE_ADDED, parent=self, index=index)
+
     def remove_child(self, node: 'Node'):
         if node in self.children:
-            self.children.remove(node)
+            index = self.children.index(node)
+            del self.children[index]
+            self.mark_layout_dirty()
+            model = self._model
+            if model is not None:
+                model._root_children_changed(self)
+                # 接続していた参照の削除イベントが先に、ノードの削除と1回の配信にまとめて通知される
+                with model.events.batch():
+                    model._unregister_subtree(node)
+                    if model.events.active:
+                        model.events.emit(ChangeEvent(ChangeType.NODE_REMOVED, node=node, parent=self, index=index))
 
     def move_to(self, new_parent: 'Node'):
         """このノードを新しい親ノードの下に移動する"""
-        if self.parent:
-            self.parent.remove_child(self)
+        old_parent = self.parent
+        old_index = None
+        old_color, old_direction = self.color, self.direction
+        if old_parent and self in old_parent.children:
+            # 同一モデル内の移動では索引の登録解除・再登録を省くため、直接リストから外す
+            old_index = old_parent.children.index(self)
+            del old_parent.children[old_index]
+            old_parent.mark_layout_dirty()
         self.parent = new_parent
         new_parent.children.append(self)
+        self._layout_dirty = True
+        new_parent.mark_layout_dirty()
+        new_index = len(new_parent.children) - 1
+        old_model = self._model
+        for model in (old_model, new_parent._model):
+            if model is not None:
+                model._root_children_changed(old_parent)
+                model._root_children_changed(new_parent)
+        if new_parent._model is not old_model:
+            if old_model is not None:
+                old_model._unregister_subtree(self)
+                if old_model.events.active and old_index is not None:
+                    old_model.events.emit(ChangeEvent(ChangeType.NODE_REMOVED, node=self, parent=old_parent, index=old_index))
+            if new_parent._model is not None:
+                new_parent._model._register_subtree(self)
+                self._notify(ChangeType.NODE_ADDED, parent=new_parent, index=new_index)
+        else:
+            self._notify(ChangeType.NODE_MOVED, parent=new_parent, old_parent=old_parent, index=new_index,
+                         old_value=(old_index, old_color, old_direction))
         self.color = new_parent.color # 移動した先の親の色を継承
         # 方向は新しい親の方向を引き継ぐか、ルート直下なら再計算が必要だが
         if new_parent.parent is None: # ルート直下への移動
@@ -88,10 +423,11 @@ class Node:
             new_parent.collapsed = False
 
     def update_direction_recursive(self, direction):
-        """ノードとその子孫の方向を再帰的に更新"""
-        self.direction = direction
-        for child in self.children:
-            child.update_direction_recursive(direction)
+        """ノードとその子孫の方向を更新（深いツリーでも再帰しない）"""
+        for node in iter_preorder(self):
+            if node.direction != direction:
+                node.direction = direction
+                node.mark_layout_dirty()
 
     def is_descendant_of(self, potential_ancestor):
         """このノードが指定したノードの子孫かどうかをチェック"""
@@ -102,113 +438,692 @@ class Node:
             curr = curr.parent
         return False
 
-    def to_dict(self) -> dict:
-        """シリアライズ用の辞書変換"""
+    def _fields_dict(self, assets: Optional[dict] = None) -> dict:
+        """子ノードを除いたシリアライズ用の辞書（画像データは Base64 文字列に変換する）"""
+        if assets is None:
+            # データをノードごとに埋め込む形式
+            return {
+                "id": self.id,
+                "text": self.text,
+                "direction": self.direction,
+                "color": self.color,
+                "collapsed": self.collapsed,
+                "image_data": encode_payload(self._image_data) if self._image_data else None,
+                "image_path": self.image_path,
+                "icon_data": encode_payload(self._icon_data) if self._icon_data else None,
+                "icon_path": self.icon_path,
+                "children": []
+            }
+        image_key, icon_key = self._image_key, self._icon_key
+        if image_key is not None and image_key not in assets:
+            assets[image_key] = encode_payload(self._image_data)
+        if icon_key is not None and icon_key not in assets:
+            assets[icon_key] = encode_payload(self._icon_data)
         return {
             "id": self.id,
             "text": self.text,
             "direction": self.direction,
             "color": self.color,
             "collapsed": self.collapsed,
-            "image_data": self.image_data,
+            "image_asset": image_key,
             "image_path": self.image_path,
-            "icon_data": self.icon_data,
+            "icon_asset": icon_key,
             "icon_path": self.icon_path,
-            "children": [child.to_dict() for child in self.children]
+            "children": []
         }
 
+    def to_dict(self, assets: Optional[dict] = None) -> dict:
+        """シリアライズ用の辞書変換（深いツリーでも再帰しない）。
+
+        assets に辞書を渡した場合、画像・アイコンは内容ハッシュで参照し、データは assets に1回だけ集める。
+        """
+        result = self._fields_dict(assets)
+        stack = [(self, result)]
+        while stack:
+            node, data = stack.pop()
+            for child in node.children:
+                child_data = child._fields_dict(assets)
+                data["children"].append(child_data)
+                if child.children:
+                    stack.append((child, child_data))
+        return result
+
     @classmethod
-    def from_dict(cls, data: dict, parent: Optional['Node'] = None) -> 'Node':
-        """辞書からの復元"""
+    def _from_fields(cls, data: dict, parent: Optional['Node'], assets: Optional[dict] = None,
+                     decode=None) -> 'Node':
+        if decode is None:
+            decode = _image_decoder()
         node = cls(data["text"], parent=parent)
         node.id = data.get("id", str(uuid.uuid4()))
         node.direction = data.get("direction")
         node.color = data.get("color")
         node.collapsed = data.get("collapsed", False)
-        node.image_data = data.get("image_data")
+        image_data, icon_data = data.get("image_data"), data.get("icon_data")
+        if assets:
+            # 内容ハッシュで参照する形式（データを埋め込んだ古い形式のファイルはそのまま読む）
+            if image_data is None and data.get("image_asset"):
+                image_data = assets.get(data["image_asset"])
+            if icon_data is None and data.get("icon_asset"):
+                icon_data = assets.get(data["icon_asset"])
+        node.image_data = decode(image_data)
         node.image_path = data.get("image_path")
-        node.icon_data = data.get("icon_data")
+        node.icon_data = decode(icon_data)
         node.icon_path = data.get("icon_path")
-        for child_data in data.get("children", []):
-            child = cls.from_dict(child_data, parent=node)
-            node.children.append(child)
         return node
 
+    @classmethod
+    def from_dict(cls, data: dict, parent: Optional['Node'] = None, assets: Optional[dict] = None) -> 'Node':
+        """辞書からの復元（深いツリーでも再帰しない）。assets は保存データの "assets" の表"""
+        decode = _image_decoder()
+        root = cls._from_fields(data, parent, assets, decode)
+        stack = [(data, root)]
+        while stack:
+            node_data, node = stack.pop()
+            for child_data in node_data.get("children", []):
+                child = cls._from_fields(child_data, node, assets, decode)
+                node.children.append(child)
+                if child_data.get("children"):
+                    stack.append((child_data, child))
+        return root
+
+
+def _image_decoder():
+    """保存データの Base64 文字列を画像データに変換する関数を返す（同じ文字列は1回だけ変換する）"""
+    memo: Dict[str, bytes] = {}
+
+    def decode(text: Optional[str]) -> Optional[bytes]:
+        if not text:
+            return None
+        data = memo.get(text)
+        if data is None:
+            data = memo[text] = decode_image_data(text)
+        return data
+    return decode
+
+
+def iter_preorder(node: Node, visible_only: bool = False, max_depth: Optional[int] = None) -> Iterator[Node]:
+    """サブツリーを行きがけ順（子の並び順）に列挙する。
+
+    visible_only が True の場合、折りたたまれたノードの子孫は列挙しない。
+    max_depth を指定した場合、node からの深さがそれを超えるノードは列挙しない。
+    """
+    if max_depth is not None:
+        depth_stack = [(node, 0)]
+        while depth_stack:
+            n, depth = depth_stack.pop()
+            yield n
+            if n.children and depth < max_depth and not (visible_only and n.collapsed):
+                depth_stack.extend((c, depth + 1) for c in reversed(n.children))
+        return
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        yield n
+        if n.children and not (visible_only and n.collapsed):
+            stack.extend(reversed(n.children))
+
+
+def iter_postorder(node: Node, visible_only: bool = False) -> Iterator[Node]:
+    """サブツリーを帰りがけ順（子がすべて親より先）に列挙する"""
+    stack = [(node, False)]
+    while stack:
+        n, children_done = stack.pop()
+        if children_done or not n.children or (visible_only and n.collapsed):
+            yield n
+            continue
+        stack.append((n, True))
+        stack.extend((c, False) for c in reversed(n.children))
+
+class ReferenceList(list):
+    """MindMapModel.references の実体。
+
+    通常のリストとして扱えるが、要素の追加・削除はモデルの参照索引にも反映される。
+    """
+
+    def __init__(self, model: 'MindMapModel', refs: Iterable[Reference] = ()):
+        super().__init__(refs)
+        self._model = model
+
+    def append(self, ref: Reference):
+        super().append(ref)
+        self._model._index_reference(ref)
+        self._model._notify_reference(ref, "added", index=len(self) - 1)
+
+    def insert(self, index, ref: Reference):
+        super().insert(index, ref)
+        self._model._index_reference(ref)
+        self._model._notify_reference(ref, "added", index=self.index(ref))
+
+    def extend(self, refs: Iterable[Reference]):
+        for ref in refs:
+            self.append(ref)
+
+    def __iadd__(self, refs: Iterable[Reference]):
+        self.extend(refs)
+        return self
+
+    def remove(self, ref: Reference):
+        self.pop(self.index(ref))
+
+    def pop(self, index=-1) -> Reference:
+        if index < 0:
+            index += len(self)
+        ref = super().pop(index)
+        self._model._unindex_reference(ref)
+        self._model._notify_reference(ref, "removed", index=index)
+        return ref
+
+    def clear(self):
+        old = list(self)
+        super().clear()
+        self._model._rebuild_reference_index()
+        self._model._notify_reference(None, "reset", old_value=old, new_value=list(self))
+
+    def __setitem__(self, index, value):
+        old = list(self)
+        super().__setitem__(index, value)
+        self._model._rebuild_reference_index()
+        self._model._notify_reference(None, "reset", old_value=old, new_value=list(self))
+
+    def __delitem__(self, index):
+        old = list(self)
+        super().__delitem__(index)
+        self._model._rebuild_reference_index()
+        self._model._notify_reference(None, "reset", old_value=old, new_value=list(self))
+
+
 class MindMapModel:
     """マインドマップ全体を管理するモデル"""
     def __init__(self, root_text: str = "Root Topic"):
+        self._root: Optional[Node] = None
+        self._node_index: Dict[str, Node] = {}  # node.id -> Node
+        # 参照関係の索引: ref.id -> Reference、node.id -> {ref.id: Reference}（出る参照・入る参照）
+        self._references = ReferenceList(self)
+        self._reference_index: Dict[str, Reference] = {}
+        self._outgoing: Dict[str, Dict[str, Reference]] = {}
+        self._incoming: Dict[str, Dict[str, Reference]] = {}
+        # 画像・アイコンのデータの表（内容ハッシュ -> データ）。同じ内容のデータはノード間で共有する
+        self.assets = AssetStore()
+        # 変更イベントの配信
+        self.events = ChangeBus()
+        # トランザクションの状態（入れ子の深さ、内部で変更があったか、ルート直下の左右の子の数のキャッシュ）
+        self._tx_depth = 0
+        self._tx_modified = False
+        self._balance_counts: Optional[tuple] = None
         self.root = Node(root_text)
-        self.references: List[Reference] = []
         self._is_modified = False
         self.modification_count = 0
 
+    @property
+    def root(self) -> Node:
+        return self._root
+
+    @root.setter
+    def root(self, node: Node):
+        """ルートを差し替え、ID索引を再構築する"""
+        with self.events.batch():
+            old_root = self._root
+            if old_root is not None and old_root is not node:
+                self._unregister_subtree(old_root)
+            self._root = node
+            self._balance_counts = None
+            self._node_index.clear()
+            self.assets.clear()
+            self._register_subtree(node)
+            # 新しいツリーに存在しないノードを指す参照を破棄する
+            dangling = [r for r in self._references
+                        if r.source_id not in self._node_index or r.target_id not in self._node_index]
+            self._drop_references(dangling)
+            self.events.emit(ChangeEvent(ChangeType.MODEL_RESET, node=node, old_value=old_root))
+
+    def _register_subtree(self, node: Node):
+        """サブツリー内の全ノードをID索引に登録する"""
+        assets = self.assets
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            n._model = self
+            self._node_index[n.id] = n
+            # 画像データは表に登録し、同じ内容のデータを持つ他のノードとオブジェクトを共有する
+            if n._image_key is not None:
+                n._image_data = assets.intern(n._image_key, n._image_data)
+            if n._icon_key is not None:
+                n._icon_data = assets.intern(n._icon_key, n._icon_data)
+            stack.extend(n.children)
+
+    def _unregister_subtree(self, node: Node) -> List[Reference]:
+        """サブツリー内の全ノードをID索引から削除し、それらに接続していた参照も削除して返す"""
+        dangling: Dict[str, Reference] = {}
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if self._node_index.get(n.id) is n:
+                del self._node_index[n.id]
+                if n._image_key is not None:
+                    self.assets.release(n._image_key)
+                if n._icon_key is not None:
+                    self.assets.release(n._icon_key)
+                dangling.update(self._outgoing.get(n.id, {}))
+                dangling.update(self._incoming.get(n.id, {}))
+            n._model = None
+            stack.extend(n.children)
+        removed = list(dangling.values())
+        self._drop_references(removed)
+        return removed
+
+    # ──────────────────────────────────────────────────────────────
+    # 参照関係の索引
+    # ──────────────────────────────────────────────────────────────
+
+    @property
+    def references(self) -> ReferenceList:
+        return self._references
+
+    @references.setter
+    def references(self, refs: Iterable[Reference]):
+        old = list(self._references)
+        self._references = ReferenceList(self, refs)
+        self._rebuild_reference_index()
+        self._notify_reference(None, "reset", old_value=old, new_value=list(self._references))
+
+    def _notify_reference(self, ref: Optional[Reference], attribute: str, old_value=None, new_value=None,
+                          index: Optional[int] = None):
+        if self.events.active:
+            self.events.emit(ChangeEvent(ChangeType.REFERENCE_CHANGED, reference=ref, attribute=attribute,
+                                         old_value=old_value, new_value=new_value, index=index))
+
+    def _index_reference(self, ref: Reference):
+        self._reference_index[ref.id] = ref
+        self._outgoing.setdefault(ref.source_id, {})[ref.id] = ref
+        self._incoming.setdefault(ref.target_id, {})[ref.id] = ref
+
+    def _unindex_reference(self, ref: Reference):
+        if self._reference_index.get(ref.id) is ref:
+            del self._reference_index[ref.id]
+        for table, node_id in ((self._outgoing, ref.source_id), (self._incoming, ref.target_id)):
+            refs = table.get(node_id)
+            if refs is not None and refs.get(ref.id) is ref:
+                del refs[ref.id]
+                if not refs:
+                    del table[node_id]
+
+    def _rebuild_reference_index(self):
+        self._reference_index.clear()
+        self._outgoing.clear()
+        self._incoming.clear()
+        for ref in self._references:
+            self._index_reference(ref)
+
+    def _drop_references(self, refs: List[Reference]):
+        """複数の参照をまとめて削除する（リストの再構築は1回のみ）"""
+        if not refs:
+            return
+        drop = set(map(id, refs))
+        # 削除イベントは元の位置の昇順に、削除後の位置がずれないよう「その時点の位置」で通知する
+        removed = [(i, r) for i, r in enumerate(self._references) if id(r) in drop]
+        kept = [r for r in self._references if id(r) not in drop]
+        list.clear(self._references)
+        list.extend(self._references, kept)
+        for offset, (i, ref) in enumerate(removed):
+            self._unindex_reference(ref)
+            self._notify_reference(ref, "removed", index=i - offset)
+
+    def add_reference(self, ref: Reference) -> Reference:
+        self._references.append(ref)
+        return ref
+
+    def remove_reference(self, ref: Reference) -> bool:
+        if self._reference_index.get(ref.id) is not ref:
+            return False
+        self._references.remove(ref)
+        return True
+
+    def set_reference_control_point(self, ref: Reference, cp_type: str, x: Optional[float], y: Optional[float]):
+        """参照線の制御点 ("cp1" または "cp2") を設定する"""
+        old = (ref.cp1_x, ref.cp1_y, ref.cp2_x, ref.cp2_y)
+        if cp_type == "cp1":
+            ref.cp1_x, ref.cp1_y = x, y
+        elif cp_type == "cp2":
+            ref.cp2_x, ref.cp2_y = x, y
+        else:
+            raise ValueError(f"Unknown control point: {cp_type}")
+        new = (ref.cp1_x, ref.cp1_y, ref.cp2_x, ref.cp2_y)
+        if new != old:
+            self._notify_reference(ref, "control_points", old_value=old, new_value=new)
+
+    def find_reference(self, source_id: str, target_id: str) -> Optional[Reference]:
+        """接続元・接続先が一致する参照を返す"""
+        for ref in self._outgoing.get(source_id, {}).values():
+            if ref.target_id == target_id:
+                return ref
+        return None
+
+    def outgoing_references(self, node_id: str) -> List[Reference]:
+        return list(self._outgoing.get(node_id, {}).values())
+
+    def incoming_references(self, node_id: str) -> List[Reference]:
+        return list(self._incoming.get(node_id, {}).values())
+
+    def references_of(self, node_id: str) -> List[Reference]:
+        """ノードから出る参照と、ノードに入る参照をすべて返す"""
+        refs = dict(self._outgoing.get(node_id, {}))
+        refs.update(self._incoming.get(node_id, {}))
+        return list(refs.values())
+
+    def verify_node_index(self) -> List[str]:
+        """ID索引とツリー構造の整合性を検証し、検出した不整合の説明を返す（空なら整合）"""
+        problems = []
+        seen = set()
+        stack = [self.root]
+        while stack:
+            n = stack.pop()
+            if n.id in seen:
+                problems.append(f"duplicate node id in tree: {n.id}")
+            seen.add(n.id)
+            if self._node_index.get(n.id) is not n:
+                problems.append(f"node {n.id} is missing from index or mapped to another node")
+            if n._model is not self:
+                problems.append(f"node {n.id} is not attached to this model")
+            for child in n.children:
+                if child.parent is not n:
+                    problems.append(f"node {child.id} has inconsistent parent link")
+                stack.append(child)
+        for node_id in self._node_index:
+            if node_id not in seen:
+                problems.append(f"index contains node {node_id} that is not in the tree")
+        return problems
+
     @property
     def is_modified(self) -> bool:
         return self._is_modified
 
     @is_modified.setter
     def is_modified(self, value: bool):
+        if value and self._tx_depth:
+            # トランザクション中の変更はコミット時に1回だけ記録する
+            self._tx_modified = True
+            return
         self._is_modified = value
         if value:
             self.modification_count += 1
 
+    @contextmanager
+    def transaction(self):
+        """複数の変更を1つのまとまりとして適用する。
+
+        内部の変更はコミット時に1回の変更（modification_count の増加）として記録され、
+        変更イベントもまとめて1回だけ配信される。例外が発生した場合は内部の変更をすべて取り消す。
+        入れ子にした場合は最も外側のトランザクションがコミットを行う。
+        """
+        tx_modified = self._tx_modified
+        self._tx_depth += 1
+        modified = False
+        try:
+            with self.events.recording() as start:
+                try:
+                    yield self
+                except BaseException:
+                    events = self.events.take_pending(start)
+                    with self.events.muted():
+                        self.revert_events(events)
+                    self._tx_modified = tx_modified
+                    raise
+                finally:
+                    self._tx_depth -= 1
+                    if self._tx_depth == 0:
+                        self._balance_counts = None
+                        modified, self._tx_modified = self._tx_modified, False
+                # リスナーへの配信（recording を抜ける時点）より先に変更を記録する
+                if modified:
+                    self.is_modified = True
+        finally:
+            if self._tx_depth == 0:
+                self._tx_modified = False
+
+    def revert_events(self, events: List[ChangeEvent]):
+        """イベントの列が表す変更を、新しいものから順に取り消す"""
+        for event in reversed(events):
+            self._revert_event(event)
+
+    def _revert_event(self, event: ChangeEvent):
+        t = event.type
+        node = event.node
+        if t is ChangeType.NODE_ADDED:
+            event.parent.remove_child(node)
+        elif t is ChangeType.NODE_REMOVED:
+            event.parent.insert_child(node, event.index)
+        elif t is ChangeType.NODE_MOVED:
+            old_index, color, direction = event.old_value
+            self._relocate(node, event.old_parent, old_index)
+            node.color = color
+            if direction is None:
+                node.direction = None
+            else:
+                node.update_direction_recursive(direction)
+        elif t is ChangeType.TEXT_CHANGED:
+            node.text = event.old_value
+        elif t is ChangeType.MEDIA_CHANGED:
+            setattr(node, event.attribute, event.old_value)
+        elif t is ChangeType.COLLAPSED_TOGGLED:
+            node.collapsed = event.old_value
+        elif t is ChangeType.REORDERED:
+            siblings = event.parent.children
+            i, j = event.old_value, event.new_value
+            siblings[i], siblings[j] = siblings[j], siblings[i]
+            event.parent.mark_layout_dirty()
+        elif t is ChangeType.REFERENCE_CHANGED:
+            ref = event.reference
+            if event.attribute == "added":
+                self.remove_reference(ref)
+            elif event.attribute == "removed":
+                self._references.insert(event.index, ref)
+            elif event.attribute == "control_points":
+                ref.cp1_x, ref.cp1_y, ref.cp2_x, ref.cp2_y = event.old_value
+            elif event.attribute == "reset":
+                self.references = event.old_value
+        elif t is ChangeType.MODEL_RESET:
+            self.root = event.old_value
+
+    def apply_events(self, events: List[ChangeEvent]):
+        """取り消した変更をイベントの列に従って再適用する（やり直し）"""
+        for event in events:
+            self._apply_event(event)
+
+    def _apply_event(self, event: ChangeEvent):
+        t = event.type
+        node = event.node
+        if t is ChangeType.NODE_ADDED:
+            event.parent.insert_child(node, event.index)
+        elif t is ChangeType.NODE_REMOVED:
+            event.parent.remove_child(node)
+        elif t is ChangeType.NODE_MOVED:
+            parent = event.parent
+            self._relocate(node, parent, event.index)
+            node.color = parent.color
+            if parent.parent is None:
+                # ルート直下の方向はレイアウト時に決まる
+                node.direction = None
+            else:
+                node.update_direction_recursive(parent.direction)
+        elif t is ChangeType.TEXT_CHANGED:
+            node.text = event.new_value
+        elif t is ChangeType.MEDIA_CHANGED:
+            setattr(node, event.attribute, event.new_value)
+        elif t is ChangeType.COLLAPSED_TOGGLED:
+            node.collapsed = event.new_value
+        elif t is ChangeType.REORDERED:
+            siblings = event.parent.children
+            i, j = event.old_value, event.new_value
+            siblings[i], siblings[j] = siblings[j], siblings[i]
+            event.parent.mark_layout_dirty()
+        elif t is ChangeType.REFERENCE_CHANGED:
+            ref = event.reference
+            if event.attribute == "added":
+                self._references.insert(event.index, ref)
+            elif event.attribute == "removed":
+                self.remove_reference(ref)
+            elif event.attribute == "control_points":
+                ref.cp1_x, ref.cp1_y, ref.cp2_x, ref.cp2_y = event.new_value
+            elif event.attribute == "reset":
+                self.references = event.new_value
+        elif t is ChangeType.MODEL_RESET:
+            self.root = node
+
+    def _relocate(self, node: Node, parent: Node, index: int):
+        """同一モデル内でノードを parent の index 番目に付け替える（索引は変更しない）"""
+        current = node.parent
+        if current is not None:
+            current.children.remove(node)
+            current.mark_layout_dirty()
+            self._root_children_changed(current)
+        node.parent = parent
+        parent.children.insert(index, node)
+        node._layout_dirty = True
+        parent.mark_layout_dirty()
+        self._root_children_changed(parent)
+
+    def _root_children_changed(self, parent: Optional[Node]):
+        """ルート直下の子が増減した場合に、左右の数のキャッシュを破棄する"""
+        if parent is not None and parent is self._root:
+            self._balance_counts = None
+
     def add_node(self, parent_node: Node, text: str = "New Topic") -> Node:
         """指定したノードに子ノードを追加する。ルート直下の場合は方向を自動調整する。"""
         direction = None
+        counts = None
         if parent_node == self.root:
             direction = self.get_balanced_direction()
+            counts = self._balance_counts
         
         node = parent_node.add_child(text, direction)
+        if counts is not None:
+            # トランザクション中は左右の数をキャッシュし、ルート直下の子を毎回数え直さない
+            right, left = counts
+            self._balance_counts = (right, left + 1) if direction == 'left' else (right + 1, left)
         self.is_modified = True
         return node
 
     def get_balanced_direction(self, exclude_node: Optional[Node] = None) -> str:
         """ルートの子ノードの左右バランスを考慮した方向を返す"""
-        right_nodes = [c for c in self.root.children if c.direction != 'left' and c != exclude_node]
-        left_nodes = [c for c in self.root.children if c.direction == 'left' and c != exclude_node]
+        if self._tx_depth and exclude_node is None:
+            if self._balance_counts is None:
+                self._balance_counts = self._count_root_directions()
+            right, left = self._balance_counts
+        else:
+            right, left = self._count_root_directions(exclude_node)
         
-        if len(right_nodes) <= len(left_nodes):
+        if right <= left:
             return 'right'
         else:
             return 'left'
 
+    def _count_root_directions(self, exclude_node: Optional[Node] = None) -> tuple:
+        """ルート直下の子の (右側の数, 左側の数) を返す"""
+        right = left = 0
+        for c in self.root.children:
+            if c is exclude_node:
+                continue
+            if c.direction == 'left':
+                left += 1
+            else:
+                right += 1
+        return right, left
+
     def find_node_by_id(self, node_id: str, current: Optional[Node] = None) -> Optional[Node]:
         if current is None:
-            current = self.root
-        
-        if current.id == node_id:
-            return current
+            # ID索引による O(1) 検索
+            return self._node_index.get(node_id)
         
-        for child in current.children:
-            found = self.find_node_by_id(node_id, child)
-            if found:
-                return found
+        # 指定されたサブツリー内を探索
+        for node in iter_preorder(current):
+            if node.id == node_id:
+                return node
         return None
 
+    def walk(self, order: str = "pre", visible_only: bool = False, start: Optional[Node] = None,
+             max_depth: Optional[int] = None) -> Iterator[Node]:
+        """ツリーのノードを列挙するジェネレータ。
+
+        order は "pre"（行きがけ順）または "post"（帰りがけ順）。visible_only が True の場合、
+        折りたたまれたノードの子孫を除く。start を省略するとルートから列挙する。
+        max_depth は行きがけ順のみ指定でき、start からの深さがそれを超えるノードを除く。
+        """
+        node = self.root if start is None else start
+        if order == "pre":
+            return iter_preorder(node, visible_only, max_depth)
+        if order == "post":
+            return iter_postorder(node, visible_only)
+        raise ValueError(f"Unknown traversal order: {order}")
+
     def find_reference_by_id(self, ref_id: str) -> Optional[Reference]:
-        for ref in self.references:
-            if ref.id == ref_id:
-                return ref
-        return None
+        return self._reference_index.get(ref_id)
+
+    def _replace_asset(self, old_key: Optional[str], new_key: Optional[str], data):
+        """ノードの画像データの差し替えを表に反映し、ノードが保持すべきデータを返す"""
+        if old_key is not None:
+            self.assets.release(old_key)
+        if new_key is None:
+            return data
+        return self.assets.intern(new_key, data)
+
+    def get_asset(self, key: str):
+        """内容ハッシュに対応する画像データを返す（なければ None）"""
+        return self.assets.get(key)
+
+    def fingerprint(self, node: Optional[Node] = None) -> bytes:
+        """ノード（省略時はルート）以下のサブツリーの内容の指紋を返す。
+
+        前回取得した値と等しければ、そのサブツリーのノードの内容に変更はない（参照関係は含まない）。
+        """
+        return (self.root if node is None else node).fingerprint
 
     def save(self) -> dict:
+        """保存用の辞書を返す。画像データは "assets" に内容ハッシュごとに1回だけ格納する"""
+        assets = {}
         return {
-            "root": self.root.to_dict(),
-            "references": [ref.to_dict() for ref in self.references]
+            "root": self.root.to_dict(assets),
+            "references": [ref.to_dict() for ref in self.references],
+            "assets": assets
         }
 
     def save_with_revision(self) -> tuple:
         """データとその時点のリビジョン番号を返す"""
         return self.save(), self.modification_count
 
+    def snapshot(self) -> ModelSnapshot:
+        """現時点の内容の不変のスナップショットを返す。
+
+        前回から変更されたノードの経路のみ再作成するため、メインスレッドで安価に取得でき、
+        保存用データの構築（ModelSnapshot.to_dict()）は別スレッドで行える。
+        """
+        references = tuple([(r.id, r.source_id, r.target_id, r.cp1_x, r.cp1_y, r.cp2_x, r.cp2_y)
+                            for r in self._references])
+        return ModelSnapshot(self.root.snapshot_record(), references, self.assets.copy(), self.modification_count)
+
+    def subscribe(self, listener: ChangeListener):
+        """変更イベントのリスナーを登録する。リスナーはイベントのリストを受け取る"""
+        self.events.subscribe(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        self.events.unsubscribe(listener)
+
     def load(self, data: dict):
+        with self.events.batch():
+            self._load(data)
+
+    def _load(self, data: dict):
         if "root" in data:
-            self.root = Node.from_dict(data["root"])
-            self.references = [Reference.from_dict(r) for r in data.get("references", [])]
+            self.load_tree(Node.from_dict(data["root"], assets=data.get("assets")),
+                           [Reference.from_dict(r) for r in data.get("references", [])])
         else:
             # 古いバージョンの形式（ルートトピック直書き）との互換性用
-            self.root = Node.from_dict(data)
-            self.references = []
+            self.load_tree(Node.from_dict(data), [])
+
+    def load_tree(self, root: Node, references: Iterable[Reference]):
+        """構築済みのツリーと参照で内容を置き換える（json_loader 等で直接構築した場合に使う）"""
+        with self.events.batch():
+            self.root = root
+            self.references = references
 
     def _move_node(self, node: Node, offset: int) -> bool:
         """指定されたノードを、親のchildrenリスト内で指定オフセット分移動する"""
@@ -224,6 +1139,8 @@ class MindMapModel:
         new_idx = idx + offset
         if 0 <= new_idx < len(siblings):
             siblings[idx], siblings[new_idx] = siblings[new_idx], siblings[idx]
+            node.parent.mark_layout_dirty()
+            node._notify(ChangeType.REORDERED, parent=node.parent, old_value=idx, new_value=new_idx)
             self.is_modified = True
             return True
         return False
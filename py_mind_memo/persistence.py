@@ -1,13 +1,74 @@
 import json
+import logging
+import os
 import re
+import tempfile
+import threading
 from tkinter import filedialog, messagebox
+from .container import is_container_path, load_container, write_container
+from .journal import Journal, apply_records, journal_path, read_journal
+from .json_loader import LoadCancelled, LoadError, load_document
+from .json_stream import write_snapshot
+from .lazy_payload import replace_file
+from .snapshot import ModelSnapshot
+from .sqlite_store import SqliteStore, is_database_path, load_database
+
+SAVE_FILETYPES = [("JSON files", "*.json"), ("Mind map container", "*.pmm"),
+                  ("SQLite database", "*.sqlite"), ("All files", "*.*")]
+OPEN_FILETYPES = [("Mind map files", "*.json *.pmm *.sqlite"), ("JSON files", "*.json"),
+                  ("Mind map container", "*.pmm"), ("SQLite database", "*.sqlite"), ("All files", "*.*")]
+
+logger = logging.getLogger(__name__)
+
+
+def load_file(file_path, progress=None, is_cancelled=None):
+    """保存ファイルを拡張子に応じた形式で読み込み、ルートノードと参照のリストを返す"""
+    if is_container_path(file_path):
+        return load_container(file_path, progress=progress, is_cancelled=is_cancelled)
+    if is_database_path(file_path):
+        return load_database(file_path, progress=progress, is_cancelled=is_cancelled)
+    # ファイル全体を辞書にせず、チャンク単位で読みながらノードを構築する
+    # （画像データは描画時にファイルから読み込む）
+    with open(file_path, "rb") as f:
+        return load_document(f, file_path, progress=progress, is_cancelled=is_cancelled)
+
+class OpenJob:
+    """別スレッドで実行中のファイルの読み込み"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.percent = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
 
 class PersistenceHandler:
-    """ファイルの保存・読み込みを管理するクラス"""
-    def __init__(self, model, render_callback):
+    """ファイルの保存・読み込みを管理するクラス。
+
+    schedule（関数と引数を受け取り、Tk のスレッドで実行する）を渡した場合、ファイルの読み込みと
+    ツリーの構築は別スレッドで行い、完成したツリーを Tk のスレッドでモデルに反映する。
+    status_callback には読み込みの進捗を表す文字列（終了時は空文字列）を渡す。一時的に表示すればよい
+    メッセージは transient=True を付けて渡す。
+
+    保存先のファイルがある間は、変更を文書の隣のジャーナルに追記する（journal）。文書全体を保存すると
+    ジャーナルは空になり、開く際に残っていたジャーナルは文書に適用する。
+    """
+    def __init__(self, model, render_callback, schedule=None, status_callback=None):
         self.model = model
         self.render_callback = render_callback
         self.current_file_path = None
+        self.schedule = schedule
+        self.status_callback = status_callback
+        self.open_job = None
+        # SQLite 形式のファイルに保存している場合の、前回保存した内容を保持するストア
+        self.sqlite_store = None
+        self.journal = None
 
     def on_save(self, event=None):
         if self.current_file_path:
@@ -30,7 +91,7 @@ class PersistenceHandler:
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
             initialfile=default_name,
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=SAVE_FILETYPES
         )
         
         if file_path:
@@ -40,8 +101,12 @@ class PersistenceHandler:
     def _write_to_file(self, file_path):
         """共通のファイル書き込み処理"""
         try:
-            data = self.model.save()
-            self._perform_write_to_file(file_path, data)
+            # スナップショット経由で書き出し、以降の自動保存で変更のないサブツリーのレコードを再利用できるようにする
+            self._perform_write_to_file(file_path, self.model.snapshot())
+            if self.journal is None or not self._is_journal_of(file_path):
+                # 別のファイルに保存した場合、元の文書のジャーナルの変更は保存済みのため捨てる
+                self.discard_journal()
+                self._start_journal(file_path)
             self.current_file_path = file_path
             self.model.is_modified = False
             return True
@@ -49,21 +114,48 @@ class PersistenceHandler:
             messagebox.showerror("Error", f"Failed to save to {file_path}: {e}")
             return False
 
-    def _perform_write_to_file(self, file_path, data):
-        """アトミックな書き込みを行う。一時ファイルを作成し、成功時のみ置換する。"""
-        import tempfile
-        import os
+    def _perform_write_to_file(self, file_path, data, indent=4):
+        """アトミックな書き込みを行う。一時ファイルを作成し、成功時のみ置換する。
+
+        data が ModelSnapshot の場合は辞書を構築せずにツリーを辿りながら一時ファイルへ書き出し、
+        遅延読み込みの画像データは置換後のファイルを参照するよう付け替える。
+        indent が None の場合は空白を含まない形式で書き出す。
+        file_path の拡張子が .pmm の場合はコンテナ形式で書き出す（data は ModelSnapshot に限る）。
+        .sqlite の場合は一時ファイルを使わず、前回の保存から変更された行だけをトランザクションで書き込む。
+        file_path のジャーナルを記録中の場合は、保存した内容より後の変更だけをジャーナルに残す。
+        """
+        if is_database_path(file_path):
+            if not isinstance(data, ModelSnapshot):
+                raise TypeError("Database files are written from a model snapshot")
+            self._sqlite_store_for(file_path).save(data)
+            return
 
         dir_name = os.path.dirname(os.path.abspath(file_path))
         # ターゲットと同じディレクトリに一時ファイルを作成
         fd, temp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
         try:
-            with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-                f.flush()
-                os.fsync(f.fileno())
+            moves = []
+            if is_container_path(file_path):
+                if not isinstance(data, ModelSnapshot):
+                    raise TypeError("Container files are written from a model snapshot")
+                with os.fdopen(fd, 'wb') as f:
+                    moves = write_container(data, f, indent=indent)
+                    f.flush()
+                    os.fsync(f.fileno())
+            elif isinstance(data, ModelSnapshot):
+                with os.fdopen(fd, 'wb') as f:
+                    moves = write_snapshot(data, f.write, indent=indent)
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=indent)
+                    f.flush()
+                    os.fsync(f.fileno())
             # アトミックに置換
-            os.replace(temp_path, file_path)
+            replace_file(temp_path, file_path, moves)
+            if isinstance(data, ModelSnapshot) and self._is_journal_of(file_path):
+                self.journal.compact(data)
         except Exception:
             if os.path.exists(temp_path):
                 try:
@@ -74,15 +166,140 @@ class PersistenceHandler:
 
     def on_open(self, event=None):
         file_path = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=OPEN_FILETYPES
         )
-        if file_path:
+        if not file_path:
+            return
+        if self.schedule is None:
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                self.model.load(data)
-                self.model.is_modified = False
-                self.current_file_path = file_path
-                self.render_callback(root_node=self.model.root)
+                self._apply_loaded(file_path, *self._read_document(file_path))
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load from {file_path}: {e}")
+        else:
+            self._start_open_job(file_path)
+
+    def _sqlite_store_for(self, file_path):
+        store = self.sqlite_store
+        if store is None or os.path.abspath(store.file_path) != os.path.abspath(file_path):
+            store = self.sqlite_store = SqliteStore(file_path)
+        return store
+
+    def _read_document(self, file_path, progress=None, is_cancelled=None):
+        """文書を読み込み、残っているジャーナル（保存されていない変更）があれば適用する。
+
+        ルートノード、参照のリスト、適用したジャーナルの有効な部分の末尾の位置（適用しなかった場合は None）
+        を返す。別スレッドで実行できる。
+        """
+        root, references = load_file(file_path, progress=progress, is_cancelled=is_cancelled)
+        if is_database_path(file_path):
+            return root, references, None
+        try:
+            recovered = read_journal(file_path)
+            if not recovered or not recovered[0]:
+                return root, references, None
+            records, end = recovered
+            root, references = apply_records(root, references, records)
+            return root, references, end
+        except LoadError as e:
+            # 読めない・適用できないジャーナルは別名で残し、文書だけを開き直す
+            logger.warning("Failed to apply journal of %s: %s", file_path, e)
+            os.replace(journal_path(file_path), journal_path(file_path) + ".bad")
+            root, references = load_file(file_path, progress=progress, is_cancelled=is_cancelled)
+            return root, references, None
+
+    def _apply_loaded(self, file_path, root, references, recovered=None):
+        self._close_journal()
+        self.model.load_tree(root, references)
+        if is_database_path(file_path):
+            # 読み込んだ内容を基準に、次回の保存では変更された行だけを書き込む
+            self._sqlite_store_for(file_path).mark_saved(self.model.snapshot())
+        # ジャーナルを適用した場合、文書自体にはまだ保存されていない
+        self.model.is_modified = recovered is not None
+        self.current_file_path = file_path
+        self._start_journal(file_path, recovered)
+        if recovered is not None:
+            self._set_status(f"Recovered unsaved changes to {os.path.basename(file_path)}", transient=True)
+        self.render_callback(root_node=self.model.root)
+
+    def _is_journal_of(self, file_path):
+        journal = self.journal
+        return journal is not None and os.path.abspath(journal.file_path) == os.path.abspath(file_path)
+
+    def _start_journal(self, file_path, recovered_end=None):
+        # SQLite 形式は保存自体が変更された行だけの書き込みのため、ジャーナルを使わない
+        if is_database_path(file_path):
+            return
+        try:
+            self.journal = Journal(self.model, file_path, self.schedule, recovered_end)
+        except OSError as e:
+            logger.warning("Failed to open journal of %s: %s", file_path, e)
+
+    def _close_journal(self, discard=False):
+        if self.journal is not None:
+            self.journal.close(discard=discard)
+            self.journal = None
+
+    def discard_journal(self):
+        """保存されていない変更を記録したジャーナルを削除する（変更を保存せずに終了する場合等）"""
+        self._close_journal(discard=True)
+
+    def _set_status(self, text, transient=False):
+        if self.status_callback is not None:
+            self.status_callback(text, transient=transient)
+
+    def _start_open_job(self, file_path):
+        """別スレッドでファイルを読み込む。実行中の読み込みがあれば中止する"""
+        self.cancel_open()
+        job = self.open_job = OpenJob(file_path)
+        name = os.path.basename(file_path)
+        total = max(1, os.path.getsize(file_path))
+        self._set_status(f"Opening {name}... (Esc to cancel)")
+
+        def progress(position):
+            # 進捗の通知は1%ごとにまとめる
+            percent = min(100, position * 100 // total)
+            if percent != job.percent:
+                job.percent = percent
+                self.schedule(self._on_open_progress, job, name)
+
+        def run():
+            try:
+                root, references, recovered = self._read_document(file_path, progress=progress,
+                                                                   is_cancelled=lambda: job.cancelled)
+            except LoadCancelled:
+                return
+            except Exception as e:
+                self.schedule(self._on_open_failed, job, e)
+                return
+            self.schedule(self._on_open_complete, job, root, references, recovered)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def cancel_open(self):
+        """実行中の読み込みを中止する。中止した場合は True"""
+        job = self.open_job
+        if job is None:
+            return False
+        job.cancel()
+        self.open_job = None
+        self._set_status(f"Cancelled opening {os.path.basename(job.file_path)}", transient=True)
+        return True
+
+    def _on_open_progress(self, job, name):
+        if job is self.open_job:
+            self._set_status(f"Opening {name}... {job.percent}% (Esc to cancel)")
+
+    def _on_open_failed(self, job, error):
+        if job is not self.open_job:
+            return
+        self.open_job = None
+        self._set_status("")
+        messagebox.showerror("Error", f"Failed to load from {job.file_path}: {error}")
+
+    def _on_open_complete(self, job, root, references, recovered=None):
+        # 中止された（または新しい読み込みに置き換えられた）読み込みの結果は捨てる
+        if job is not self.open_job:
+            return
+        self.open_job = None
+        self._set_status("")
+        self._apply_loaded(job.file_path, root, references, recovered)
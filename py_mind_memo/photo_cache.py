@@ -0,0 +1,99 @@
+import logging
+import tkinter as tk
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from .constants import PHOTO_CACHE_MAX_BYTES
+from .lazy_payload import LazyPayload, resolve_payload
+from .models import media_key
+
+logger = logging.getLogger(__name__)
+
+
+def _default_factory(raw: bytes) -> tk.PhotoImage:
+    return tk.PhotoImage(data=raw)
+
+
+class PhotoImageCache:
+    """画像データの内容ハッシュをキーとして PhotoImage を共有する LRU キャッシュ。
+
+    同じ PNG を使う複数のノードは1つの PhotoImage を共有する。キャッシュの上限は
+    デコード後のピクセルバイト数（幅 x 高さ x 4）で管理し、超過時は最も古いものから破棄する。
+    描画中のアイテムが参照している PhotoImage は、キャッシュから外れても参照元が保持する限り有効。
+    """
+
+    BYTES_PER_PIXEL = 4
+    KEY_MEMO_LIMIT = 4096
+
+    def __init__(self, max_bytes: int = PHOTO_CACHE_MAX_BYTES,
+                 factory: Callable[[bytes], tk.PhotoImage] = _default_factory):
+        self.max_bytes = max_bytes
+        self._factory = factory
+        self._entries: "OrderedDict[str, Tuple[tk.PhotoImage, int]]" = OrderedDict()
+        self.total_bytes = 0
+        # 同一の文字列オブジェクトを毎回ハッシュしないための memo (id(data) -> (data, key))
+        self._key_memo: Dict[int, Tuple[bytes, str]] = {}
+
+    def key_for(self, data: bytes) -> str:
+        """画像データの内容ハッシュを返す（同一オブジェクトに対しては再計算しない）"""
+        if isinstance(data, LazyPayload):
+            return data.key
+        memo = self._key_memo.get(id(data))
+        if memo is not None and memo[0] is data:
+            return memo[1]
+        key = media_key(data)
+        if len(self._key_memo) >= self.KEY_MEMO_LIMIT:
+            # memo が削除済みノードのデータを保持し続けないよう、一定数で破棄する
+            self._key_memo.clear()
+        self._key_memo[id(data)] = (data, key)
+        return key
+
+    def get(self, data: bytes, key: Optional[str] = None) -> Optional[tk.PhotoImage]:
+        """画像データ（PNG のバイト列）に対応する PhotoImage を返す。デコードに失敗した場合は None。
+
+        key には計算済みの内容ハッシュ（Node.image_key 等）を渡せる。data には LazyPayload も渡せ、
+        キャッシュにない場合にだけファイルから読み込む。
+        """
+        if key is None:
+            key = self.key_for(data)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        try:
+            photo = self._factory(resolve_payload(data))
+        except (ValueError, OSError, tk.TclError) as e:
+            logger.warning("Failed to decode image (content hash %s): %s", key, e)
+            return None
+
+        size = photo.width() * photo.height() * self.BYTES_PER_PIXEL
+        self._entries[key] = (photo, size)
+        self.total_bytes += size
+        self._evict(keep=key)
+        return photo
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, keep: str):
+        """上限を超えている間、最も長く使われていないエントリを破棄する"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, (_, size) = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self.total_bytes -= size
+            self._forget_key(key)
+
+    def _forget_key(self, key: str):
+        for obj_id in [i for i, (_, k) in self._key_memo.items() if k == key]:
+            del self._key_memo[obj_id]
+
+    def clear(self):
+        self._entries.clear()
+        self._key_memo.clear()
+        self.total_bytes = 0
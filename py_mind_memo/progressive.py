@@ -0,0 +1,58 @@
+import time
+from typing import Callable, List
+
+from .constants import REVEAL_INITIAL_NODES
+from .models import Node
+
+
+def _next_level(level: List[Node]) -> List[Node]:
+    return [c for n in level if not n.collapsed for c in n.children]
+
+
+class ProgressiveReveal:
+    """読み込んだマップを浅い階層から段階的に表示するための状態。
+
+    最初はノード数が initial_nodes 程度に収まる深さ（depth、ルートは 0）までを表示対象とし、
+    アイドル時に step() で次の階層のノードの大きさを少しずつ計算する。階層の計算が終わるたびに
+    depth を1段深くし、表示されていない階層がなくなると done になる。
+    """
+
+    def __init__(self, root: Node, measure: Callable[[Node], object],
+                 initial_nodes: int = REVEAL_INITIAL_NODES, clock: Callable[[], float] = time.perf_counter):
+        self._measure = measure
+        self._clock = clock
+        # ルートとその子は必ず表示し、それより深い階層はノード数の目安に収まる限り表示する
+        self.depth = 0
+        level = [root]
+        count = 1
+        while True:
+            below = _next_level(level)
+            if not below or (self.depth >= 1 and count + len(below) > initial_nodes):
+                break
+            count += len(below)
+            level = below
+            self.depth += 1
+        self._level = below  # 次に表示する階層のノード
+        self._index = 0
+
+    @property
+    def done(self) -> bool:
+        return not self._level
+
+    def step(self, budget: float) -> bool:
+        """次の階層のノードの大きさを budget 秒程度計算する。計算が終わり depth が深くなった場合は True"""
+        deadline = self._clock() + budget
+        level = self._level
+        i = self._index
+        while i < len(level):
+            self._measure(level[i])
+            i += 1
+            if i % 32 == 0 and self._clock() >= deadline:
+                break
+        self._index = i
+        if i < len(level):
+            return False
+        self.depth += 1
+        self._level = _next_level(level)
+        self._index = 0
+        return True
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+
+from .lazy_payload import encode_payload
+
+# スナップショットのノード・参照のレコードに格納する項目（保存形式のキーと同じ順序）。
+# ノードのレコードは末尾に子のレコードのタプルを持つ
+NODE_FIELDS = ("id", "text", "direction", "color", "collapsed",
+               "image_asset", "image_path", "icon_asset", "icon_path")
+REFERENCE_FIELDS = ("id", "source_id", "target_id", "cp1_x", "cp1_y", "cp2_x", "cp2_y")
+
+
+class ModelSnapshot:
+    """ある時点のモデルの保存対象の内容を表す不変のスナップショット。
+
+    ノードはタプルのレコードで表され、変更のないサブツリーのレコードは以前のスナップショットと
+    共有される（コピーオンライト）。取得はメインスレッドで安価に行い、to_dict() による
+    保存用データの構築は別スレッドで行える。
+    """
+    __slots__ = ("root", "references", "assets", "revision")
+
+    def __init__(self, root: tuple, references: Tuple[tuple, ...], assets: Dict[str, object], revision: int):
+        self.root = root
+        self.references = references
+        self.assets = assets  # 内容ハッシュ -> 画像データまたは LazyPayload（モデルと共有する）
+        self.revision = revision
+
+    @staticmethod
+    def _node_dict(record: tuple) -> dict:
+        data = dict(zip(NODE_FIELDS, record))
+        data["children"] = []
+        return data
+
+    def to_dict(self) -> dict:
+        """MindMapModel.save() と同じ形式の辞書を構築する（深いツリーでも再帰しない）"""
+        root = self._node_dict(self.root)
+        stack = [(self.root, root)]
+        while stack:
+            record, data = stack.pop()
+            children = data["children"]
+            for child in record[-1]:
+                child_data = self._node_dict(child)
+                children.append(child_data)
+                if child[-1]:
+                    stack.append((child, child_data))
+        return {
+            "root": root,
+            "references": [dict(zip(REFERENCE_FIELDS, r)) for r in self.references],
+            "assets": {key: encode_payload(data) for key, data in self.assets.items()}
+        }
+
+
+def node_row(record: tuple, parent_id: Optional[str], position: int) -> tuple:
+    """ノードのレコードを、親の ID と兄弟内の位置を付けた1行（子のレコードを除く）に変換する"""
+    return (record[0], parent_id, position) + record[1:-1]
+
+
+def diff_trees(old_root: Optional[tuple], new_root: tuple) -> Tuple[Dict[str, tuple], List[str]]:
+    """2つのスナップショットのノードのレコードを比較し、書き込む行（ID -> 行）と削除する ID を返す。
+
+    変更のないサブツリーは同じレコードを共有しているため辿らない。1つのノードの変更であれば、
+    比較するのはルートからそのノードまでの経路と、経路上のノードの子の並びだけになる。
+    old_root が None の場合はすべてのノードを書き込む。
+    """
+    rows: Dict[str, tuple] = {}
+    added: Dict[str, Tuple[tuple, Optional[str], int]] = {}  # 以前の親の下になかった子
+    removed: Dict[str, tuple] = {}  # 以前の親の下からなくなった子
+    stack: List[Tuple[tuple, tuple, Optional[str], int]] = []
+    if old_root is not None and old_root[0] == new_root[0]:
+        stack.append((old_root, new_root, None, 0))
+    else:
+        added[new_root[0]] = (new_root, None, 0)
+        if old_root is not None:
+            removed[old_root[0]] = old_root
+    while True:
+        while stack:
+            old, new, parent_id, position = stack.pop()
+            if old is new:
+                continue
+            node_id = new[0]
+            if old[1:-1] != new[1:-1]:
+                rows[node_id] = node_row(new, parent_id, position)
+            old_index = {child[0]: (i, child) for i, child in enumerate(old[-1])}
+            for i, child in enumerate(new[-1]):
+                entry = old_index.pop(child[0], None)
+                if entry is None:
+                    added[child[0]] = (child, node_id, i)
+                    continue
+                old_position, old_child = entry
+                if old_position != i:
+                    rows[child[0]] = node_row(child, node_id, i)
+                if old_child is not child:
+                    stack.append((old_child, child, node_id, i))
+            for _, old_child in old_index.values():
+                removed[old_child[0]] = old_child
+        # 別の親の下へ移動したノードは、移動前後のレコードを比較する
+        moved = added.keys() & removed.keys()
+        if not moved:
+            break
+        for node_id in moved:
+            new, parent_id, position = added.pop(node_id)
+            rows[node_id] = node_row(new, parent_id, position)
+            stack.append((removed.pop(node_id), new, parent_id, position))
+
+    # 新しいサブツリーはすべて書き込む
+    pending = list(added.values())
+    while pending:
+        record, parent_id, position = pending.pop()
+        rows[record[0]] = node_row(record, parent_id, position)
+        pending.extend((child, record[0], i) for i, child in enumerate(record[-1]))
+    # 削除されたサブツリーのうち、他の場所へ移動していないノードを削除する
+    deleted: List[str] = []
+    pending_old = list(removed.values())
+    while pending_old:
+        record = pending_old.pop()
+        if record[0] not in rows:
+            deleted.append(record[0])
+        pending_old.extend(record[-1])
+    return rows, deleted
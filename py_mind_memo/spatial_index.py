@@ -0,0 +1,114 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+BBox = Tuple[float, float, float, float]  # (x1, y1, x2, y2)
+
+
+def bboxes_intersect(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class SpatialGrid:
+    """矩形を一様グリッドで管理する空間インデックス。
+
+    キー（ノードなど任意のハッシュ可能オブジェクト）ごとに1つの矩形を保持し、
+    矩形や点と交差するキーの検索を、対象範囲のセル数に比例するコストで行う。
+    """
+
+    def __init__(self, cell_size: float = 256):
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive: {cell_size}")
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._boxes: Dict[Hashable, BBox] = {}
+        self._bounds: Optional[BBox] = None
+        self._bounds_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._boxes
+
+    def keys(self) -> Iterable[Hashable]:
+        return self._boxes.keys()
+
+    def bbox_of(self, key: Hashable) -> Optional[BBox]:
+        return self._boxes.get(key)
+
+    def _cell_range(self, bbox: BBox):
+        size = self.cell_size
+        return (int(bbox[0] // size), int(bbox[1] // size),
+                int(bbox[2] // size), int(bbox[3] // size))
+
+    def insert(self, key: Hashable, bbox: BBox):
+        """キーの矩形を登録する（登録済みの場合は置き換える）"""
+        old = self._boxes.get(key)
+        if old is not None:
+            if old == bbox:
+                return
+            self.remove(key)
+        self._boxes[key] = bbox
+        cx1, cy1, cx2, cy2 = self._cell_range(bbox)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell is None:
+                    cell = self._cells[(cx, cy)] = set()
+                cell.add(key)
+        if not self._bounds_dirty:
+            b = self._bounds
+            self._bounds = bbox if b is None else (
+                min(b[0], bbox[0]), min(b[1], bbox[1]), max(b[2], bbox[2]), max(b[3], bbox[3]))
+
+    def remove(self, key: Hashable):
+        bbox = self._boxes.pop(key, None)
+        if bbox is None:
+            return
+        cx1, cy1, cx2, cy2 = self._cell_range(bbox)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell is not None:
+                    cell.discard(key)
+                    if not cell:
+                        del self._cells[(cx, cy)]
+        self._bounds_dirty = True
+
+    def clear(self):
+        self._cells.clear()
+        self._boxes.clear()
+        self._bounds = None
+        self._bounds_dirty = False
+
+    def query(self, bbox: BBox) -> Set[Hashable]:
+        """矩形と交差するキーの集合を返す"""
+        result = set()
+        boxes = self._boxes
+        cx1, cy1, cx2, cy2 = self._cell_range(bbox)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell:
+                    for key in cell:
+                        if key not in result and bboxes_intersect(boxes[key], bbox):
+                            result.add(key)
+        return result
+
+    def query_point(self, x: float, y: float) -> List[Hashable]:
+        """点を含むキーのリストを返す"""
+        cell = self._cells.get((int(x // self.cell_size), int(y // self.cell_size)))
+        if not cell:
+            return []
+        return [key for key in cell if bboxes_intersect(self._boxes[key], (x, y, x, y))]
+
+    def bounds(self) -> Optional[BBox]:
+        """登録されている全矩形を包含する矩形。空の場合は None"""
+        if self._bounds_dirty:
+            boxes = self._boxes.values()
+            if boxes:
+                self._bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                                max(b[2] for b in boxes), max(b[3] for b in boxes))
+            else:
+                self._bounds = None
+            self._bounds_dirty = False
+        return self._bounds
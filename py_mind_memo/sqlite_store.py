@@ -0,0 +1,211 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .json_loader import LoadCancelled, LoadError
+from .lazy_payload import LazyPayload, release_payloads
+from .models import Node, Reference, iter_preorder
+from .snapshot import NODE_FIELDS, REFERENCE_FIELDS, ModelSnapshot, diff_trees
+
+# SQLite 形式（.sqlite）はノード・参照・画像データをそれぞれ1行ずつ格納するデータベース。
+# 保存時は前回保存したスナップショットとの差分の行だけを1つのトランザクションで書き込む。
+DATABASE_SUFFIX = ".sqlite"
+SCHEMA_VERSION = 1
+# 読み込み時に1回で取得する行数
+FETCH_ROWS = 4096
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS nodes (id TEXT PRIMARY KEY, parent_id TEXT, position INTEGER NOT NULL, "
+    "text TEXT NOT NULL, direction TEXT, color TEXT, collapsed INTEGER NOT NULL, "
+    "image_asset TEXT, image_path TEXT, icon_asset TEXT, icon_path TEXT) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS node_references (id TEXT PRIMARY KEY, source_id TEXT NOT NULL, "
+    "target_id TEXT NOT NULL, cp1_x REAL, cp1_y REAL, cp2_x REAL, cp2_y REAL, position INTEGER NOT NULL) "
+    "WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS assets (key TEXT PRIMARY KEY, data BLOB NOT NULL)",
+)
+_NODE_COLUMNS = ("id", "parent_id", "position") + NODE_FIELDS[1:]
+_UPSERT_NODE = (f"INSERT OR REPLACE INTO nodes ({', '.join(_NODE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_NODE_COLUMNS))})")
+_UPSERT_REFERENCE = (f"INSERT OR REPLACE INTO node_references ({', '.join(REFERENCE_FIELDS)}, position) "
+                     f"VALUES ({', '.join('?' * (len(REFERENCE_FIELDS) + 1))})")
+
+
+def is_database_path(file_path: str) -> bool:
+    """ファイル名から SQLite 形式で保存・読み込みするかを判定する"""
+    return file_path.lower().endswith(DATABASE_SUFFIX)
+
+
+def _connect(file_path: str) -> sqlite3.Connection:
+    # トランザクションは BEGIN / COMMIT で明示的に管理する
+    conn = sqlite3.connect(file_path, isolation_level=None)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise LoadError(f"Unsupported database version {version}")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+class SqlitePayload(LazyPayload):
+    """データベースの assets テーブル内の画像データへの参照（ファイル内の位置は持たない）"""
+    __slots__ = ()
+    relocatable = False
+
+    def __init__(self, path: str, length: int, key: str):
+        super().__init__(path, 0, length, key, encoded=False)
+
+    def _read_source(self, length: Optional[int] = None) -> bytes:
+        with closing(sqlite3.connect(self._path)) as conn:
+            if length is None:
+                row = conn.execute("SELECT data FROM assets WHERE key = ?", (self.key,)).fetchone()
+            else:
+                row = conn.execute("SELECT substr(data, 1, ?) FROM assets WHERE key = ?",
+                                   (length, self.key)).fetchone()
+        if row is None:
+            raise OSError(f"Image data {self.key} is missing in {self._path}")
+        return bytes(row[0])
+
+
+class SqliteStore:
+    """SQLite 形式のファイルへの保存を管理する。
+
+    最後に保存した（または読み込んだ）内容のスナップショットを保持し、次回の保存ではそれとの差分の
+    行だけを書き込む。保存は別スレッドから呼び出せる（同時に呼び出された場合は順に実行する）。
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._saved: Optional[ModelSnapshot] = None
+        self._lock = threading.Lock()
+
+    def mark_saved(self, snapshot: Optional[ModelSnapshot]):
+        """データベースの内容が snapshot と一致していることを記録する（None の場合、次回はすべて書き込む）"""
+        with self._lock:
+            self._saved = snapshot
+
+    def save(self, snapshot: ModelSnapshot) -> int:
+        """スナップショットを保存し、書き込んだノードの行数を返す"""
+        with self._lock:
+            with closing(_connect(self.file_path)) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                written = self._write(conn, self._saved, snapshot)
+            self._saved = snapshot
+            return written
+
+    def _write(self, conn: sqlite3.Connection, saved: Optional[ModelSnapshot], snapshot: ModelSnapshot) -> int:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if saved is None:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.execute("DELETE FROM nodes")
+                conn.execute("DELETE FROM node_references")
+                old_root, old_references = None, ()
+                old_assets = {key for key, in conn.execute("SELECT key FROM assets")}
+            else:
+                old_root, old_references, old_assets = saved.root, saved.references, saved.assets.keys()
+
+            rows, deleted = diff_trees(old_root, snapshot.root)
+            conn.executemany("DELETE FROM nodes WHERE id = ?", ((node_id,) for node_id in deleted))
+            conn.executemany(_UPSERT_NODE, rows.values())
+
+            if old_references != snapshot.references:
+                old = {r[0]: (i, r) for i, r in enumerate(old_references)}
+                new_ids = {r[0] for r in snapshot.references}
+                conn.executemany("DELETE FROM node_references WHERE id = ?",
+                                 ((ref_id,) for ref_id in old if ref_id not in new_ids))
+                conn.executemany(_UPSERT_REFERENCE,
+                                 (r + (i,) for i, r in enumerate(snapshot.references) if old.get(r[0]) != (i, r)))
+
+            removed_assets = [key for key in old_assets if key not in snapshot.assets]
+            if removed_assets:
+                # 取り消し履歴等が参照している画像データは、行を削除する前にメモリへ読み込む
+                release_payloads(self.file_path, removed_assets)
+                conn.executemany("DELETE FROM assets WHERE key = ?", ((key,) for key in removed_assets))
+            conn.executemany("INSERT OR IGNORE INTO assets (key, data) VALUES (?, ?)",
+                             ((key, data.load() if isinstance(data, LazyPayload) else data)
+                              for key, data in snapshot.assets.items() if key not in old_assets))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+
+def load_database(file_path: str, progress: Optional[Callable[[int], None]] = None,
+                  is_cancelled: Optional[Callable[[], bool]] = None) -> Tuple[Node, List[Reference]]:
+    """SQLite 形式のファイルを読み込み、ルートノードと参照のリストを返す。
+
+    画像データは描画時にデータベースから読み込む。progress・is_cancelled は DocumentLoader と同様
+    （読み込んだ行数をファイルの大きさに換算して渡す）。
+    """
+    if not os.path.exists(file_path):
+        raise LoadError(f"No such file: {file_path}")
+    try:
+        with closing(_connect(file_path)) as conn:
+            return _load(conn, file_path, progress, is_cancelled)
+    except sqlite3.DatabaseError as e:
+        raise LoadError(f"Not a mind map database: {e}")
+
+
+def _load(conn: sqlite3.Connection, file_path: str, progress, is_cancelled) -> Tuple[Node, List[Reference]]:
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        raise LoadError("Not a mind map database")
+    assets = {key: SqlitePayload(file_path, length, key)
+              for key, length in conn.execute("SELECT key, length(data) FROM assets")}
+    total_rows = max(1, conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0])
+    file_size = os.path.getsize(file_path)
+
+    nodes: Dict[str, Node] = {}
+    placed: List[Tuple[Node, Optional[str]]] = []
+    cursor = conn.execute(f"SELECT {', '.join(_NODE_COLUMNS)} FROM nodes ORDER BY position")
+    while True:
+        if is_cancelled is not None and is_cancelled():
+            raise LoadCancelled()
+        batch = cursor.fetchmany(FETCH_ROWS)
+        if not batch:
+            break
+        for (node_id, parent_id, _, text, direction, color, collapsed,
+             image_asset, image_path, icon_asset, icon_path) in batch:
+            node = Node(text)
+            node.id = node_id
+            node.direction = direction
+            node.color = color
+            node.collapsed = bool(collapsed)
+            node.image_path = image_path
+            node.icon_path = icon_path
+            if image_asset:
+                node.image_data = assets.get(image_asset)
+            if icon_asset:
+                node.icon_data = assets.get(icon_asset)
+            nodes[node_id] = node
+            placed.append((node, parent_id))
+        if progress is not None:
+            progress(len(placed) * file_size // total_rows)
+
+    root: Optional[Node] = None
+    for node, parent_id in placed:
+        if parent_id is None:
+            if root is not None:
+                raise LoadError("Multiple root topics")
+            root = node
+            continue
+        parent = nodes.get(parent_id)
+        if parent is None:
+            raise LoadError(f"Topic {node.id} has no parent")
+        node.parent = parent
+        parent.children.append(node)
+    if root is None:
+        raise LoadError("Missing root topic")
+    if sum(1 for _ in iter_preorder(root)) != len(placed):
+        raise LoadError("Topics are not connected to the root topic")
+
+    references = []
+    for row in conn.execute(f"SELECT {', '.join(REFERENCE_FIELDS)} FROM node_references ORDER BY position"):
+        references.append(Reference.from_dict(dict(zip(REFERENCE_FIELDS, row))))
+    return root, references
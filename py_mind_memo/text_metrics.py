@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .constants import TEXT_LAYOUT_CACHE_SIZE
+
+FontKey = Tuple[str, int, str]  # (family, size, style)
+
+
+class TextLayout:
+    """折り返し済みリッチテキストの行構成と寸法。
+
+    lines は行のリストで、各行はセグメント (text, font_style, underline, color) のリスト。
+    seg_widths は各行のセグメント幅のリスト。行高さは必要になった時点で一度だけ求める。
+    サイズ計算と描画はこの結果を共有し、同じテキストを二度測定しない。
+    """
+
+    def __init__(self, lines: List[list], seg_widths: List[List[int]],
+                 measurer: 'TextMeasurer', family: str, size: int):
+        self.lines = lines
+        self.seg_widths = seg_widths
+        self.line_widths = [sum(widths) for widths in seg_widths]
+        self.block_width = max(self.line_widths, default=0)
+        self.first_line_width = next((w for line, w in zip(lines, self.line_widths) if line), 0)
+        self.empty_line_height = size + 10
+        self._measurer = measurer
+        self._family = family
+        self._size = size
+        self._line_heights: Optional[List[int]] = None
+
+    @property
+    def line_heights(self) -> List[int]:
+        """各行の高さ（空行や高さ0の行は empty_line_height）"""
+        if self._line_heights is None:
+            heights = []
+            for line in self.lines:
+                line_h = max((self._measurer.line_height((self._family, self._size, seg[1])) for seg in line),
+                             default=0)
+                heights.append(line_h if line_h > 0 else self.empty_line_height)
+            self._line_heights = heights
+        return self._line_heights
+
+    @property
+    def height(self) -> int:
+        return sum(self.line_heights)
+
+
+class TextMeasurer:
+    """フォントごとのグリフ幅表と、折り返し結果のメモを管理するクラス。
+
+    tkinter.font.Font.measure は呼び出しごとに Tcl との往復が発生するため、
+    文字幅は (family, size, style) ごとに一度だけ測定して再利用する。
+    """
+
+    def __init__(self, font_getter: Callable[[str, int, str], object],
+                 max_layouts: int = TEXT_LAYOUT_CACHE_SIZE):
+        self._get_font = font_getter
+        self.max_layouts = max_layouts
+        self._glyph_widths: Dict[FontKey, Dict[str, int]] = {}
+        self._line_heights: Dict[FontKey, int] = {}
+        self._layouts: "OrderedDict[tuple, TextLayout]" = OrderedDict()
+
+    def char_width(self, font_key: FontKey, char: str) -> int:
+        table = self._glyph_widths.get(font_key)
+        if table is None:
+            table = self._glyph_widths[font_key] = {}
+        width = table.get(char)
+        if width is None:
+            width = table[char] = self._get_font(*font_key).measure(char)
+        return width
+
+    def text_width(self, font_key: FontKey, text: str) -> int:
+        return sum(self.char_width(font_key, char) for char in text)
+
+    def line_height(self, font_key: FontKey) -> int:
+        height = self._line_heights.get(font_key)
+        if height is None:
+            height = self._line_heights[font_key] = self._get_font(*font_key).metrics("linespace")
+        return height
+
+    def get_layout(self, key: tuple) -> Optional[TextLayout]:
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+        return layout
+
+    def put_layout(self, key: tuple, layout: TextLayout):
+        self._layouts[key] = layout
+        self._layouts.move_to_end(key)
+        while len(self._layouts) > self.max_layouts:
+            self._layouts.popitem(last=False)
+
+    def clear(self):
+        self._glyph_widths.clear()
+        self._line_heights.clear()
+        self._layouts.clear()
@@ -1,6 +1,10 @@
 import tkinter as tk
+import logging
 import os
 import threading
+import time
+from typing import Dict, Optional
+from .events import ChangeType
 from .models import MindMapModel, Node, Reference
 from .graphics import GraphicsEngine
 from .layout import LayoutEngine
@@ -9,12 +13,19 @@ from .drag_drop import DragDropHandler
 from .navigation import KeyboardNavigator
 from .persistence import PersistenceHandler
 from .dialogs import IconPickerDialog
+from .spatial_index import SpatialGrid
+from .hit_testing import HitTester
+from .history import UndoHistory
+from .progressive import ProgressiveReveal
 from tkinter import messagebox
 from .constants import (
     DEFAULT_LOGICAL_CENTER_X, DEFAULT_LOGICAL_CENTER_Y,
-    CANVAS_MARGIN, COLOR_CANVAS_BG, MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT
+    CANVAS_MARGIN, COLOR_CANVAS_BG, MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT,
+    VIEWPORT_MARGIN, REVEAL_STEP_SECONDS
 )
 
+logger = logging.getLogger(__name__)
+
 class MindMapView:
     LOGICAL_CENTER_X = DEFAULT_LOGICAL_CENTER_X
     LOGICAL_CENTER_Y = DEFAULT_LOGICAL_CENTER_Y
@@ -46,20 +57,49 @@ class MindMapView:
                                 xscrollcommand=self.h_scroll.set, yscrollcommand=self.v_scroll.set)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        self.v_scroll.config(command=self.canvas.yview)
-        self.h_scroll.config(command=self.canvas.xview)
+        self.v_scroll.config(command=self._on_yview)
+        self.h_scroll.config(command=self._on_xview)
+        
+        # 表示中（折りたたまれていない）ノードの描画範囲の空間インデックス。
+        # 表示領域付近のノードのみキャンバスアイテムを生成する（ビューポートカリング）
+        self.node_grid = SpatialGrid()
+        self.viewport_culling = True
+        self._in_render = False
+        # 変更イベントから集めた、表示・非表示や当たり判定の形が変わった可能性のあるノード
+        # （node -> 子孫も対象か）。_grid_full_sync が True の場合（初回・ツリーの差し替え時）は
+        # 次の描画で全体を反映し直す
+        self._grid_dirty: Dict[Node, bool] = {}
+        self._grid_full_sync = True
+        self._grid_max_depth: Optional[int] = None
+        
+        # 描画要求をアイドル時にまとめて1回だけ処理するための状態
+        self._render_job = None
+        self._render_force_center = False
+        self._render_reveal_node: Optional[Node] = None
+        # 読み込んだ大きなマップの深い階層をアイドル時に段階的に表示するための状態
+        self._progressive_reveal: Optional[ProgressiveReveal] = None
+        self._reveal_job = None
         
         self.model = MindMapModel()
         self.graphics = GraphicsEngine(self.canvas)
-        self.layout_engine = LayoutEngine()
+        # クリック・ドラッグ時の当たり判定（キャンバスのタグ走査を行わない）
+        self.hit_tester = HitTester(self.graphics)
+        self.layout_engine = LayoutEngine(incremental=True)
         self.selected_node: Node = self.model.root
-        self.editor = NodeEditor(self.canvas, self.root, self.graphics, self.render, self.model)
+        self.editor = NodeEditor(self.canvas, self.root, self.graphics, self.request_render, self.model)
         self.drag_handler = DragDropHandler(
-            self.canvas, self.model, self.graphics, self.layout_engine, self.render, self.find_node_at,
-            self.LOGICAL_CENTER_X, self.LOGICAL_CENTER_Y
+            self.canvas, self.model, self.graphics, self.layout_engine, self.request_render, self.find_node_at,
+            self.LOGICAL_CENTER_X, self.LOGICAL_CENTER_Y, scroll_callback=self._on_viewport_changed
         )
-        self.navigator = KeyboardNavigator(self.model, self.render)
-        self.persistence = PersistenceHandler(self.model, self._on_load_complete)
+        self.navigator = KeyboardNavigator(self.model, self.request_render)
+        # モデルの変更（トランザクション単位でまとめて通知される）を再描画の予約につなぐ
+        self.model.subscribe(self._on_model_changed)
+        # 元に戻す・やり直しの履歴（変更イベントの逆操作で取り消す）
+        self.history = UndoHistory(self.model)
+        # ファイルの読み込みは別スレッドで行い、完成したツリーを Tk のスレッドで反映する
+        self.persistence = PersistenceHandler(self.model, self._on_load_complete,
+                                              schedule=self._run_on_ui_thread,
+                                              status_callback=self._show_open_status)
         
         # メニューバーの作成
         self._create_menu()
@@ -78,6 +118,9 @@ class MindMapView:
         bind_key("<Control-s>", self.persistence.on_save)
         bind_key("<Control-S>", self.persistence.on_save_as) # Ctrl+Shift+S
         bind_key("<Control-o>", self.persistence.on_open)
+        bind_key("<Escape>", self.on_cancel_open)
+        bind_key("<Control-z>", self.on_undo)
+        bind_key("<Control-y>", self.on_redo)
         bind_key("<Up>", lambda e: self._navigate("up"))
         bind_key("<Down>", lambda e: self._navigate("down"))
         bind_key("<Left>", lambda e: self._navigate("left"))
@@ -93,6 +136,8 @@ class MindMapView:
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
         self._is_saving = False
+        # 直近の自動保存でメインスレッドを占有した時間（秒）
+        self.last_auto_save_stall: Optional[float] = None
         
         self.first_render = True
         self.render()
@@ -106,12 +151,31 @@ class MindMapView:
         self.canvas.bind("<B1-Motion>", self._on_motion)
         self.canvas.bind("<ButtonRelease-1>", self._on_release)
         self.canvas.bind("<Motion>", self._on_hover_motion)
+        self.canvas.bind("<Configure>", lambda e: self._on_viewport_changed())
 
     def on_mouse_wheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self._on_viewport_changed()
 
     def on_mouse_wheel_x(self, event):
         self.canvas.xview_scroll(int(-1*(event.delta/120)), "units")
+        self._on_viewport_changed()
+
+    def _on_yview(self, *args):
+        """垂直スクロールバーの操作"""
+        self.canvas.yview(*args)
+        self._on_viewport_changed()
+
+    def _on_xview(self, *args):
+        """水平スクロールバーの操作"""
+        self.canvas.xview(*args)
+        self._on_viewport_changed()
+
+    def _on_viewport_changed(self):
+        """スクロール等で表示領域が変わった際に、新たに見えた範囲のアイテムを生成する"""
+        if self._in_render or not self.viewport_culling:
+            return
+        self._materialize_viewport()
 
     def _on_canvas_click(self, event):
         self.canvas.focus_set()
@@ -158,15 +222,13 @@ class MindMapView:
             self.root.title("py_mind_memo - Mindmap like Tool [Reference Mode - Select Target]")
         else:
             if self.reference_source_node != clicked_node:
-                exists = any(r.source_id == self.reference_source_node.id and r.target_id == clicked_node.id 
-                           for r in self.model.references)
-                if not exists:
+                if self.model.find_reference(self.reference_source_node.id, clicked_node.id) is None:
                     ref = Reference(self.reference_source_node.id, clicked_node.id)
-                    self.model.references.append(ref)
+                    self.model.add_reference(ref)
                     self.model.is_modified = True
             
             self._exit_reference_mode()
-        self.render()
+        self.request_render()
         return True
 
     def _exit_reference_mode(self):
@@ -180,45 +242,26 @@ class MindMapView:
 
     def _handle_image_click(self, cx, cy) -> bool:
         """ノード画像のクリック判定と拡大表示処理を行う"""
-        items = self.canvas.find_overlapping(cx-2, cy-2, cx+2, cy+2)
-        for item_id in reversed(items):
-            tags = self.canvas.gettags(item_id)
-            if "node_image" in tags:
-                for t in tags:
-                    if t not in ("node_image", "text", "current", "node"):
-                        node = self.model.find_node_by_id(t)
-                        if node and node.image_path:
-                            return self._show_enlarged_image(node)
+        node = self.hit_tester.image_at(cx, cy)
+        if node and node.image_path:
+            return self._show_enlarged_image(node)
         return False
 
     def _handle_reference_click(self, cx, cy) -> bool:
         """参照線またはそのハンドルのクリック判定と選択処理を行う"""
-        items = self.canvas.find_overlapping(cx-4, cy-4, cx+4, cy+4)
-        clicked_ref = None
-        clicked_handle = None
-        
-        for item_id in reversed(items):
-            tags = self.canvas.gettags(item_id)
-            if "reference_handle" in tags:
-                for t in tags:
-                    if t != "reference_handle" and t != "current" and "_" in t and "cp" in t:
-                        clicked_handle = t
-                if clicked_handle:
-                    break
-            elif "reference" in tags and not clicked_handle:
-                for t in tags:
-                    if t != "reference" and t != "current":
-                        ref = self.model.find_reference_by_id(t)
-                        if ref:
-                            clicked_ref = ref
-
-        if clicked_handle:
-            self.selected_handle = clicked_handle
-            if clicked_ref:
-                self.selected_reference = clicked_ref
-            self.selected_node = None
-            return True
-            
+        # ハンドルは選択中の参照線にのみ表示される
+        ref = self.selected_reference
+        if ref:
+            source_node = self.model.find_node_by_id(ref.source_id)
+            target_node = self.model.find_node_by_id(ref.target_id)
+            if source_node and target_node:
+                cp_type = self.hit_tester.reference_handle_at(cx, cy, ref, source_node, target_node)
+                if cp_type:
+                    self.selected_handle = f"{ref.id}_{cp_type}"
+                    self.selected_node = None
+                    return True
+
+        clicked_ref = self.hit_tester.reference_at(cx, cy)
         if clicked_ref:
             self._select_reference(clicked_ref)
             return True
@@ -227,19 +270,13 @@ class MindMapView:
 
     def _handle_node_collapse_click(self, cx, cy) -> bool:
         """折りたたみアイコンのクリック判定と開閉処理を行う"""
-        items = self.canvas.find_overlapping(cx-2, cy-2, cx+2, cy+2)
-        for item_id in reversed(items):
-            tags = self.canvas.gettags(item_id)
-            if "collapse_icon" in tags:
-                for t in tags:
-                    if t != "collapse_icon" and t != "current":
-                        node = self.model.find_node_by_id(t)
-                        if node:
-                            node.collapsed = not node.collapsed
-                            self.model.is_modified = True
-                            self.selected_node = node
-                            self.render()
-                            return True
+        node = self.hit_tester.collapse_icon_at(cx, cy)
+        if node:
+            node.collapsed = not node.collapsed
+            self.model.is_modified = True
+            self.selected_node = node
+            self.request_render()
+            return True
         return False
 
     def _select_node(self, node):
@@ -300,10 +337,7 @@ class MindMapView:
                 ref_id, cp_type = self.selected_handle.rsplit("_", 1)
                 ref = self.model.find_reference_by_id(ref_id)
                 if ref:
-                    if cp_type == "cp1":
-                        ref.cp1_x, ref.cp1_y = cx, cy
-                    elif cp_type == "cp2":
-                        ref.cp2_x, ref.cp2_y = cx, cy
+                    self.model.set_reference_control_point(ref, cp_type, cx, cy)
                     self.model.is_modified = True
                     
                     # 全体を再描画すると点滅するため、対象の参照線のみを部分再描画する
@@ -311,6 +345,7 @@ class MindMapView:
                     target_node = self.model.find_node_by_id(ref.target_id)
                     if source_node and target_node:
                         self.graphics.draw_reference(ref, source_node, target_node, is_selected=True)
+                        self.hit_tester.sync_reference(ref, source_node, target_node)
             except ValueError:
                 pass
         else:
@@ -319,6 +354,8 @@ class MindMapView:
     def _on_release(self, event):
         if self.selected_handle:
             self.selected_handle = None
+            # 次のドラッグは別の操作として取り消せるようにする
+            self.history.break_coalescing()
         else:
             self.drag_handler.handle_drop(event)
 
@@ -348,20 +385,7 @@ class MindMapView:
 
     def find_node_at(self, x, y):
         """指定座標にあるノードを返す"""
-        # 矩形の当たり判定 (クリック範囲を少し広げる)
-        # find_overlapping は (x1, y1, x2, y2) で指定
-        padding = 10
-        items = self.canvas.find_overlapping(x-padding, y-padding, x+padding, y+padding)
-        # 描画順（スタッキング順）の逆順でチェックすることで、前面にある（新しい）ノードを優先する
-        for item_id in reversed(items):
-            tags = self.canvas.gettags(item_id)
-            if "node" in tags or "text" in tags:
-                # タグからnode_idを取得 (e.g., "node <uuid>")
-                for tag in tags:
-                    if tag not in ("node", "text", "current", "ghost"):
-                        node_id = tag
-                        return self.model.find_node_by_id(node_id)
-        return None
+        return self.hit_tester.node_at(x, y)
 
     def _navigate(self, direction):
         old_node = self.selected_node
@@ -374,7 +398,7 @@ class MindMapView:
             self.graphics.draw_node(self.selected_node, is_selected=True)
             self.ensure_node_visible(self.selected_node, force_center=True)
         else:
-            self.render(force_center=True)
+            self.request_render(force_center=True)
 
     def _close_enlarged_image_windows(self):
         for win in list(self.enlarged_image_windows.values()):
@@ -385,7 +409,61 @@ class MindMapView:
     def _on_load_complete(self, root_node):
         self._close_enlarged_image_windows()
         self.selected_node = root_node
-        self.render()
+        self._start_progressive_reveal()
+        self.request_render()
+
+    def _run_on_ui_thread(self, func, *args):
+        """別スレッドから Tk のスレッドでの実行を予約する"""
+        self.root.after(0, func, *args)
+
+    def _show_open_status(self, text, transient=False):
+        if transient:
+            self.show_status_message(text, 2000)
+        else:
+            self.status_bar.config(text=text)
+
+    def on_cancel_open(self, event=None):
+        self.persistence.cancel_open()
+
+    # ──────────────────────────────────────────────────────────────
+    # 読み込んだマップの段階的な表示
+    # ──────────────────────────────────────────────────────────────
+
+    def _start_progressive_reveal(self):
+        """ルートと浅い階層を先に表示し、深い階層はアイドル時にノードの大きさを少しずつ計算してから表示する"""
+        self._stop_progressive_reveal()
+        reveal = ProgressiveReveal(self.model.root, self._measure_node)
+        if reveal.done:
+            return
+        self._progressive_reveal = reveal
+        self.layout_engine.max_depth = reveal.depth
+        self._reveal_job = self.root.after_idle(self._continue_progressive_reveal)
+
+    def _stop_progressive_reveal(self):
+        """段階的な表示をやめ、以降の描画ですべての階層を表示する"""
+        if self._reveal_job is not None:
+            self.root.after_cancel(self._reveal_job)
+            self._reveal_job = None
+        self._progressive_reveal = None
+        self.layout_engine.max_depth = None
+
+    def _continue_progressive_reveal(self):
+        self._reveal_job = None
+        reveal = self._progressive_reveal
+        if reveal is None:
+            return
+        if reveal.step(REVEAL_STEP_SECONDS):
+            if reveal.done:
+                self._stop_progressive_reveal()
+            else:
+                self.layout_engine.max_depth = reveal.depth
+            self.request_render()
+        if self._progressive_reveal is not None:
+            self._reveal_job = self.root.after_idle(self._continue_progressive_reveal)
+
+    def _measure_node(self, node: Node):
+        font = self.graphics.root_font if node.parent is None else self.graphics.font
+        self.graphics.get_text_size(node, font)
 
     def _wrap_handler(self, func):
         """編集中は入力を無視し、かつイベントが他へ伝播しないようにする"""
@@ -404,27 +482,214 @@ class MindMapView:
             curr = curr.parent
         return True
 
+    def _on_model_changed(self, events):
+        self._note_grid_changes(events)
+        # 編集中はウィジェットの位置がずれないよう、編集終了時の再描画に任せる
+        if not self.editor.is_editing():
+            self.request_render()
+
+    def request_render(self, force_center=False, reveal_node: Optional[Node] = None):
+        """再描画を予約する。アイドル時に1回だけ描画し、複数の要求の force_center はまとめて扱う"""
+        self._render_force_center = self._render_force_center or force_center
+        if reveal_node is not None:
+            self._render_reveal_node = reveal_node
+        if self._render_job is None:
+            self._render_job = self.root.after_idle(self.flush_render)
+
+    def flush_render(self):
+        """予約中の再描画があれば直ちに実行する"""
+        if self._render_job is None:
+            return
+        self.root.after_cancel(self._render_job)
+        self._render_job = None
+        force_center, reveal_node = self._render_force_center, self._render_reveal_node
+        self._render_force_center = False
+        self._render_reveal_node = None
+        
+        if self._progressive_reveal is not None:
+            # 段階的な表示の途中で、まだ表示していない階層のノードを選択・表示しようとした場合は全体を表示する
+            targets = [n for n in (self.selected_node, reveal_node) if n is not None]
+            if not all(self.layout_engine.within_max_depth(n) for n in targets):
+                self._stop_progressive_reveal()
+        
+        self.render(force_center=force_center)
+        if reveal_node is not None and self.model.find_node_by_id(reveal_node.id) is reveal_node:
+            self.ensure_node_visible(reveal_node)
+
     def render(self, force_center=False):
-        self.graphics.clear()
-        w, h = self._get_canvas_size()
+        self._in_render = True
+        try:
+            w, h = self._get_canvas_size()
+            
+            # レイアウト計算: ウィンドウサイズに依存しない固定の基準点を使用
+            moved = self.layout_engine.apply_layout(self.model, self.graphics, self.LOGICAL_CENTER_X, self.LOGICAL_CENTER_Y)
+            changed = self._sync_node_grid(moved or set())
+            self._sync_reference_hits(changed)
+            
+            # スクロールと自動センタリング
+            self._update_scroll_and_focus(w, h, force_center)
+        finally:
+            self._in_render = False
         
-        # レイアウト計算: ウィンドウサイズに依存しない固定の基準点を使用
-        self.layout_engine.apply_layout(self.model, self.graphics, self.LOGICAL_CENTER_X, self.LOGICAL_CENTER_Y)
+        # 表示領域付近のノードと参照関係を描画
+        self._materialize_viewport()
+
+    def _note_grid_changes(self, events):
+        """変更イベントから、次の描画で空間インデックスと当たり判定を反映し直すノードを記録する"""
+        dirty = self._grid_dirty
+        for event in events:
+            t = event.type
+            if t is ChangeType.MODEL_RESET:
+                self._grid_full_sync = True
+            elif t in (ChangeType.NODE_ADDED, ChangeType.NODE_REMOVED, ChangeType.NODE_MOVED,
+                       ChangeType.COLLAPSED_TOGGLED):
+                # サブツリー全体の表示・非表示が変わる
+                dirty[event.node] = True
+                # 親は子の有無で折りたたみアイコンの当たり判定が変わる
+                for parent in (event.parent, event.old_parent):
+                    if parent is not None:
+                        dirty.setdefault(parent, False)
+            elif t is ChangeType.MEDIA_CHANGED:
+                dirty.setdefault(event.node, False)
+
+    def _sync_node_grid(self, moved):
+        """ノードの描画範囲と当たり判定を空間インデックスに反映する。
+
+        対象は位置・大きさが変わったノードと、変更イベントで表示・非表示などが変わった可能性のあるノードのみ
+        （初回・ツリーの差し替え時・深さの上限の変更時は全体）。移動・表示・非表示のいずれかが起きたノードの集合を返す。
+        """
+        if self._grid_full_sync or self.layout_engine.max_depth != self._grid_max_depth:
+            return self._resync_node_grid(moved)
+        grid = self.node_grid
+        hit_tester = self.hit_tester
+        changed = set()
+        dirty, self._grid_dirty = self._grid_dirty, {}
+        for start, subtree in dirty.items():
+            for node, visible in self._walk_grid_candidates(start, subtree):
+                if visible:
+                    if node not in moved:
+                        grid.insert(node, self.graphics.get_node_extent(node))
+                        hit_tester.sync_node(node)
+                        changed.add(node)
+                elif node in grid:
+                    grid.remove(node)
+                    hit_tester.remove_node(node)
+                    changed.add(node)
+        for node in moved:
+            grid.insert(node, self.graphics.get_node_extent(node))
+            hit_tester.sync_node(node)
+            changed.add(node)
+            if not node.collapsed:
+                # 子への接続線は親の位置・大きさで形が変わるため、子の描画範囲も更新する
+                for child in node.children:
+                    if child in grid and child not in moved:
+                        grid.insert(child, self.graphics.get_node_extent(child))
+        return changed
+
+    def _walk_grid_candidates(self, start: Node, subtree: bool = True):
+        """start（subtree が True の場合はその子孫も）のうち、表示するものと空間インデックスに残っているものを
+        (node, 表示するか) で列挙する"""
+        max_depth = self.layout_engine.max_depth
+        visible = self.model.find_node_by_id(start.id) is start
+        depth = 0
+        curr = start
+        while visible and curr.parent is not None:
+            curr = curr.parent
+            depth += 1
+            visible = not curr.collapsed
+        if max_depth is not None and depth > max_depth:
+            visible = False
+        stack = [(start, visible, depth)]
+        while stack:
+            node, visible, depth = stack.pop()
+            if not visible and node not in self.node_grid:
+                # 表示していないノードの子孫は空間インデックスにない
+                continue
+            yield node, visible
+            if not subtree:
+                break
+            child_visible = visible and not node.collapsed and (max_depth is None or depth < max_depth)
+            stack.extend((child, child_visible, depth + 1) for child in node.children)
+
+    def _resync_node_grid(self, moved):
+        """表示中のすべてのノードを走査して、空間インデックスと当たり判定を作り直す"""
+        self._grid_full_sync = False
+        self._grid_dirty.clear()
+        self._grid_max_depth = self.layout_engine.max_depth
+        grid = self.node_grid
+        hit_tester = self.hit_tester
+        changed = set()
+        seen = set()
+        for node in self.model.walk(visible_only=True, max_depth=self.layout_engine.max_depth):
+            seen.add(node)
+            if node in moved or node not in grid:
+                grid.insert(node, self.graphics.get_node_extent(node))
+                changed.add(node)
+            hit_tester.sync_node(node)
+        for node in [n for n in grid.keys() if n not in seen]:
+            grid.remove(node)
+            changed.add(node)
+        for node in hit_tester.nodes():
+            if node not in seen:
+                hit_tester.remove_node(node)
+        return changed
+
+    def _sync_reference_hits(self, changed_nodes):
+        """参照線の当たり判定を更新する。対象は変化したノードに接続する参照と、追加・削除された参照のみ"""
+        hit_tester = self.hit_tester
+        known = set(hit_tester.references())
+        current = set(self.model.references)
+        for ref in known - current:
+            hit_tester.remove_reference(ref)
+
+        dirty = current - known
+        for node in changed_nodes:
+            dirty.update(self.model.references_of(node.id))
+        for ref in dirty:
+            source_node = self.model.find_node_by_id(ref.source_id)
+            target_node = self.model.find_node_by_id(ref.target_id)
+            if source_node in self.node_grid and target_node in self.node_grid:
+                hit_tester.sync_reference(ref, source_node, target_node)
+            else:
+                hit_tester.remove_reference(ref)
+
+    def _viewport_region(self):
+        """表示領域（周囲の余白を含む）のキャンバス座標。カリング無効時は None"""
+        if not self.viewport_culling:
+            return None
+        m = VIEWPORT_MARGIN
+        x1, y1 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        x2 = self.canvas.canvasx(self.canvas.winfo_width())
+        y2 = self.canvas.canvasy(self.canvas.winfo_height())
+        return (x1 - m, y1 - m, x2 + m, y2 + m)
+
+    def _materialize_viewport(self):
+        """表示領域と交差するノード・参照関係のみキャンバスアイテムを持つようにする"""
+        region = self._viewport_region()
+        nodes = self.node_grid.query(region) if region else set(self.node_grid.keys())
         
-        # 全ノード描画
-        self._draw_subtree(self.model.root)
+        # 保持モードでは既存のキャンバスアイテムを再利用し、変化したノードのみ更新する
+        # ノードの塗りつぶしは描画時に最背面へ移すため、描画順は問わない
+        self.graphics.begin_frame()
+        for node in nodes:
+            self.graphics.render_node(node, is_selected=(node == self.selected_node))
         
-        # 参照関係の描画
-        for ref in self.model.references:
+        # 参照関係の描画（両端が表示されている参照は当たり判定の索引に登録済み）
+        refs = self.hit_tester.references_in(region) if region else self.hit_tester.references()
+        for ref in refs:
             source_node = self.model.find_node_by_id(ref.source_id)
             target_node = self.model.find_node_by_id(ref.target_id)
-            if source_node and target_node:
-                if self._is_node_visible(source_node) and self._is_node_visible(target_node):
-                    is_selected = (ref == self.selected_reference)
-                    self.graphics.draw_reference(ref, source_node, target_node, is_selected=is_selected)
+            is_selected = (ref == self.selected_reference)
+            self.graphics.render_reference(ref, source_node, target_node, is_selected=is_selected)
         
-        # スクロールと自動センタリング
-        self._update_scroll_and_focus(w, h, force_center)
+        # 削除・非表示・表示領域外になったノードのアイテムを破棄
+        self.graphics.end_frame()
+
+    def _content_bbox(self):
+        """マップ全体の描画範囲。カリング中はキャンバス上に全アイテムがないため空間インデックスから求める"""
+        if self.viewport_culling:
+            return self.node_grid.bounds()
+        return self.canvas.bbox("all")
 
     def _get_canvas_size(self):
         # ウィンドウサイズが確定していない初期のみ update_idletasks を呼ぶ
@@ -436,7 +701,7 @@ class MindMapView:
 
 
     def _update_scroll_and_focus(self, w, h, force_center=False):
-        bbox = self.canvas.bbox("all")
+        bbox = self._content_bbox()
         if not bbox: return
         
         # コンテンツ周囲に余白
@@ -446,7 +711,7 @@ class MindMapView:
         
         if self.first_render:
             self.canvas.update_idletasks() # 表示状態を確定
-            bbox = self.canvas.bbox("all") # 再計算後のbboxを取得
+            bbox = self._content_bbox() # 再計算後のbboxを取得
             if bbox:
                 new_sr = (bbox[0] - margin, bbox[1] - margin, bbox[2] + margin, bbox[3] + margin)
                 self.canvas.config(scrollregion=new_sr)
@@ -501,23 +766,21 @@ class MindMapView:
             
         if force_center or node_rel_y < vy1 + margin or node_rel_y > vy2 - margin:
             self.canvas.yview_moveto(max(0, node_rel_y - view_h_ratio / 2))
-
-    def _draw_subtree(self, node: Node):
-        self.graphics.draw_node(node, is_selected=(node == self.selected_node))
-        if not node.collapsed:
-            for child in node.children:
-                self._draw_subtree(child)
+        
+        self._on_viewport_changed()
 
     def on_add_child(self, event):
         if self.editor.is_editing(): return
         
-        # 折りたたまれている場合は展開する
-        if self.selected_node.collapsed:
-            self.selected_node.collapsed = False
-            
-        new_node = self.model.add_node(self.selected_node)
+        with self.model.transaction():
+            # 折りたたまれている場合は展開する
+            if self.selected_node.collapsed:
+                self.selected_node.collapsed = False
+            new_node = self.model.add_node(self.selected_node)
         self.selected_node = new_node
-        self.render()
+        # 編集ウィジェットの配置に新しいノードの座標が必要なため、ここで描画を確定する
+        self.request_render()
+        self.flush_render()
         self.on_edit_node(None)
 
     def on_add_sibling(self, event):
@@ -525,7 +788,8 @@ class MindMapView:
         if self.selected_node.parent:
             new_node = self.model.add_node(self.selected_node.parent)
             self.selected_node = new_node
-            self.render()
+            self.request_render()
+            self.flush_render()
             self.on_edit_node(None)
 
     def on_edit_node(self, event):
@@ -537,28 +801,25 @@ class MindMapView:
         
         # 参照の削除が優先
         if self.selected_reference:
-            if self.selected_reference in self.model.references:
-                self.model.references.remove(self.selected_reference)
+            if self.model.remove_reference(self.selected_reference):
                 self.model.is_modified = True
             self.selected_reference = None
-            self.render()
+            self.request_render()
             return "break"
             
         if self.selected_node and self.selected_node.parent:
             parent = self.selected_node.parent
-            parent.remove_child(self.selected_node)
-            # 関連する参照関係も削除
-            self.model.references = [ref for ref in self.model.references 
-                                     if ref.source_id != self.selected_node.id and ref.target_id != self.selected_node.id]
-            self.model.is_modified = True
+            # サブツリー内のノードに接続する参照関係はモデルが併せて削除する
+            with self.model.transaction():
+                parent.remove_child(self.selected_node)
+                self.model.is_modified = True
             self.selected_node = parent
-            self.render()
+            self.request_render()
 
     def _on_move_node(self, move_func):
         if self.selected_node:
             if move_func(self.selected_node):
-                self.render()
-                self.ensure_node_visible(self.selected_node)
+                self.request_render(reveal_node=self.selected_node)
         return "break"
 
     def on_move_node_up(self, event):
@@ -577,7 +838,7 @@ class MindMapView:
             self.selected_reference = None
             self.root.title("py_mind_memo - Mindmap like Tool [Reference Mode]")
             self.canvas.config(cursor="crosshair")
-        self.render()
+        self.request_render()
         return "break"
 
     def on_insert_icon(self, event):
@@ -590,31 +851,62 @@ class MindMapView:
         path, photo = dialog.show()
         
         if path == "CLEAR":
-            self.selected_node.icon_data = None
-            self.selected_node.icon_path = None
-            self.model.is_modified = True
-            self.render()
+            with self.model.transaction():
+                self.selected_node.icon_data = None
+                self.selected_node.icon_path = None
+                self.model.is_modified = True
+            self.request_render()
         elif path and photo:
             try:
-                base64_data = self.editor.image_handler.base64_from_photo(photo)
-                self.selected_node.icon_data = base64_data
-                self.selected_node.icon_path = path
-                self.model.is_modified = True
-                self.render()
+                png_data = self.editor.image_handler.png_from_photo(photo)
+                with self.model.transaction():
+                    self.selected_node.icon_data = png_data
+                    self.selected_node.icon_path = path
+                    self.model.is_modified = True
+                self.request_render()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to insert icon: {e}")
                 
         return "break"
 
+    def on_undo(self, event=None):
+        return self._replay_history(self.history.undo)
+
+    def on_redo(self, event=None):
+        return self._replay_history(self.history.redo)
+
+    def _replay_history(self, replay):
+        if self.editor.is_editing():
+            return
+        events = replay()
+        if events is None:
+            return "break"
+        # 取り消し・やり直しで選択中の要素がツリーから外れた場合は選択を移す
+        if self.selected_reference is not None and \
+                self.model.find_reference_by_id(self.selected_reference.id) is not self.selected_reference:
+            self.selected_reference = None
+        node = self.selected_node
+        if node is not None and self.model.find_node_by_id(node.id) is not node:
+            self.selected_node = self.model.root
+        target = next((e.node for e in reversed(events)
+                       if e.node is not None and self.model.find_node_by_id(e.node.id) is e.node), None)
+        self.request_render(reveal_node=target)
+        return "break"
+
     def _create_menu(self):
         menubar = tk.Menu(self.root)
         filemenu = tk.Menu(menubar, tearoff=0)
         filemenu.add_command(label="Open (Ctrl+O)", command=self.persistence.on_open)
         filemenu.add_command(label="Save (Ctrl+S)", command=self.persistence.on_save)
         filemenu.add_command(label="Save As (Ctrl+Shift+S)", command=self.persistence.on_save_as)
+        filemenu.add_command(label="Cancel Open (Esc)", command=self.on_cancel_open)
         filemenu.add_separator()
         filemenu.add_command(label="Exit", command=self.on_exit)
         menubar.add_cascade(label="File", menu=filemenu)
+        editmenu = tk.Menu(menubar, tearoff=0)
+        editmenu.add_command(label="Undo (Ctrl+Z)", command=self.on_undo)
+        editmenu.add_command(label="Redo (Ctrl+Y)", command=self.on_redo)
+        menubar.add_cascade(label="Edit", menu=editmenu)
         self.root.config(menu=menubar)
         
         # ウィンドウの閉じるボタン(×)のハンドラ
@@ -632,6 +924,8 @@ class MindMapView:
                 if not self.model.is_modified: # 保存に成功した場合
                     self.root.quit()
             elif response is False: # Discard
+                # 保存しない変更を次回開く際に復元しないよう、ジャーナルも削除する
+                self.persistence.discard_journal()
                 self.root.quit()
             else: # Cancel
                 pass
@@ -740,16 +1034,28 @@ class MindMapView:
             if (self.persistence.current_file_path and 
                 self.model.is_modified and 
                 not self.editor.is_editing() and
-                not self._is_saving):
+                not self._is_saving and
+                self.persistence.open_job is None):
+
+                journal = self.persistence.journal
+                if journal is not None and not journal.needs_compaction():
+                    # 変更はジャーナルに追記済みのため、文書全体は書き出さずに記録をディスクへ同期する
+                    journal.sync()
+                    return
                 
                 self._is_saving = True
-                # メインスレッドでデータをキャプチャ。その時点のリビジョンを取得。
-                data, revision = self.model.save_with_revision()
+                # メインスレッドでは不変のスナップショットの取得のみ行う（変更のないサブツリーは前回分を共有）
+                started = time.perf_counter()
+                snapshot = self.model.snapshot()
+                revision = snapshot.revision
+                self.last_auto_save_stall = time.perf_counter() - started
                 file_path = self.persistence.current_file_path
                 
                 def run_save():
                     try:
-                        self.persistence._perform_write_to_file(file_path, data)
+                        # 保存形式への変換と書き込みはワーカースレッドで行う（自動保存は空白なしの形式）。
+                        # ジャーナルはこの保存で空になる
+                        self.persistence._perform_write_to_file(file_path, snapshot, indent=None)
                         self.root.after(0, self._on_auto_save_complete, True, revision)
                     except Exception:
                         self.root.after(0, self._on_auto_save_complete, False, revision)
@@ -769,3 +1075,6 @@ class MindMapView:
             if self.model.modification_count == revision:
                 self.model.is_modified = False
             self.show_status_message("Saved automatically", 1000)
+            if self.last_auto_save_stall is not None:
+                logger.info("Auto-saved revision %d (main thread stall: %.1f ms)",
+                            revision, self.last_auto_save_stall * 1000)
@@ -0,0 +1,88 @@
+import base64
+import json
+import unittest
+from py_mind_memo.history import UndoHistory
+from py_mind_memo.models import MindMapModel, Node
+
+ICON = b"\x89PNG\r\n\x1a\n-icon-" * 20
+IMAGE = b"\x89PNG\r\n\x1a\n-image-" * 50
+ICON_B64 = base64.b64encode(ICON).decode("ascii")
+
+class TestAssetStore(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.parent = self.model.add_node(self.model.root, "Parent")
+
+    def add_icon_nodes(self, count):
+        nodes = []
+        for i in range(count):
+            node = self.model.add_node(self.parent, f"N{i}")
+            # ノードごとに別の文字列オブジェクトを設定する
+            node.icon_data = bytes(bytearray(ICON))
+            nodes.append(node)
+        return nodes
+
+    def test_same_content_is_stored_once(self):
+        nodes = self.add_icon_nodes(2000)
+        self.assertEqual(len(self.model.assets), 1)
+        shared = self.model.get_asset(nodes[0].icon_key)
+        self.assertTrue(all(n.icon_data is shared for n in nodes))
+
+        data = self.model.save()
+        self.assertEqual(data["assets"], {nodes[0].icon_key: ICON_B64})
+        self.assertEqual(json.dumps(data).count(ICON_B64), 1)
+        self.assertEqual(data["root"]["children"][0]["children"][0]["icon_asset"], nodes[0].icon_key)
+
+    def test_round_trip(self):
+        nodes = self.add_icon_nodes(3)
+        nodes[1].image_data = IMAGE
+        data = json.loads(json.dumps(self.model.save()))
+        other = MindMapModel()
+        other.load(data)
+        restored = other.find_node_by_id(nodes[1].id)
+        self.assertEqual(restored.image_data, IMAGE)
+        self.assertEqual(restored.icon_data, ICON)
+        self.assertEqual(len(other.assets), 2)
+        self.assertEqual(other.save(), self.model.save())
+        self.assertEqual(other.snapshot().to_dict(), other.save())
+
+    def test_legacy_inline_data_loads_and_is_deduplicated(self):
+        legacy = {
+            "root": {
+                "id": "r", "text": "Root", "children": [
+                    {"id": f"c{i}", "text": f"C{i}", "icon_data": "".join(list(ICON_B64)),
+                     "image_data": None, "children": []}
+                    for i in range(10)
+                ]
+            },
+            "references": []
+        }
+        self.model.load(legacy)
+        children = self.model.root.children
+        self.assertTrue(all(c.icon_data == ICON for c in children))
+        self.assertTrue(all(c.icon_data is children[0].icon_data for c in children))
+        self.assertEqual(len(self.model.assets), 1)
+
+    def test_unused_assets_are_released(self):
+        nodes = self.add_icon_nodes(2)
+        nodes[0].icon_data = None
+        self.assertEqual(self.model.assets.ref_count(nodes[1].icon_key), 1)
+        self.model.root.remove_child(self.parent)
+        self.assertEqual(len(self.model.assets), 0)
+        self.assertEqual(self.model.save()["assets"], {})
+
+    def test_undo_delete_restores_asset(self):
+        history = UndoHistory(self.model)
+        self.add_icon_nodes(1)
+        self.model.root.remove_child(self.parent)
+        self.assertEqual(len(self.model.assets), 0)
+        history.undo()
+        self.assertEqual(len(self.model.assets), 1)
+
+    def test_detached_node_keeps_inline_format(self):
+        node = Node("Detached")
+        node.image_data = IMAGE
+        self.assertEqual(node.to_dict()["image_data"], base64.b64encode(IMAGE).decode("ascii"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,9 @@ class TestAutoSave(unittest.TestCase):
              patch('tkinter.Label'):
             
             self.view = MindMapView(self.root)
+            # 読み込み中でない状態（PersistenceHandler のモックに実際の初期値を設定する）
+            self.view.persistence.open_job = None
+            self.view.persistence.journal = None
             # 自動保存ループを止めるために after を固定する
             self.root.after.reset_mock()
 
@@ -130,6 +133,25 @@ class TestAutoSave(unittest.TestCase):
         
         self.view.persistence._perform_write_to_file.assert_not_called()
 
+    def test_auto_save_only_syncs_journal(self):
+        """ジャーナルに記録中の場合は文書全体を書き出さず、大きくなった場合のみ書き出すこと"""
+        self.view.persistence.current_file_path = "test.json"
+        self.view.model.is_modified = True
+        self.view.editor.is_editing.return_value = False
+        journal = self.view.persistence.journal = MagicMock()
+        journal.needs_compaction.return_value = False
+
+        self.view._auto_save_check()
+        journal.sync.assert_called_once()
+        self.view.persistence._perform_write_to_file.assert_not_called()
+        self.assertTrue(self.view.model.is_modified)
+
+        journal.needs_compaction.return_value = True
+        with patch('threading.Thread') as mock_thread:
+            mock_thread.return_value.start.side_effect = lambda: mock_thread.call_args.kwargs['target']()
+            self.view._auto_save_check()
+        self.view.persistence._perform_write_to_file.assert_called_once()
+
     def test_after_is_called_again(self):
         """_auto_save_check の最後で再び after が呼ばれ、ループが継続すること"""
         self.root.after.reset_mock()
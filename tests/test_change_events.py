@@ -0,0 +1,95 @@
+import unittest
+from py_mind_memo.events import ChangeBus, ChangeEvent, ChangeType
+from py_mind_memo.models import MindMapModel, Node, Reference
+
+class TestChangeEvents(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.batches = []
+        self.model.subscribe(self.batches.append)
+
+    def types(self):
+        return [e.type for batch in self.batches for e in batch]
+
+    def test_one_event_per_mutation(self):
+        child = self.model.add_node(self.a, "C")
+        child.text = "C2"
+        child.text = "C2"  # 変化がなければ通知しない
+        child.image_data = b"data"
+        self.a.collapsed = True
+        child.move_to(self.b)
+        self.model.move_node_up(self.b)
+        self.b.remove_child(child)
+        self.assertEqual(self.types(), [
+            ChangeType.NODE_ADDED, ChangeType.TEXT_CHANGED, ChangeType.MEDIA_CHANGED,
+            ChangeType.COLLAPSED_TOGGLED, ChangeType.NODE_MOVED, ChangeType.REORDERED,
+            ChangeType.NODE_REMOVED,
+        ])
+        self.assertEqual(len(self.batches), 7)
+
+    def test_event_details(self):
+        self.a.text = "A2"
+        moved = self.a.add_child("M")
+        moved.move_to(self.b)
+        text_event = self.batches[0][0]
+        self.assertIs(text_event.node, self.a)
+        self.assertEqual((text_event.old_value, text_event.new_value), ("A", "A2"))
+        move_event = self.batches[-1][0]
+        self.assertIs(move_event.old_parent, self.a)
+        self.assertIs(move_event.parent, self.b)
+        self.assertEqual(move_event.index, 0)
+
+    def test_reference_events(self):
+        ref = self.model.add_reference(Reference(self.a.id, self.b.id))
+        self.model.set_reference_control_point(ref, "cp1", 10, 20)
+        self.model.root.remove_child(self.a)
+        events = [e for batch in self.batches for e in batch]
+        self.assertEqual([(e.type, e.attribute) for e in events], [
+            (ChangeType.REFERENCE_CHANGED, "added"),
+            (ChangeType.REFERENCE_CHANGED, "control_points"),
+            (ChangeType.REFERENCE_CHANGED, "removed"),
+            (ChangeType.NODE_REMOVED, None),
+        ])
+        self.assertIs(events[2].reference, ref)
+
+    def test_batch_delivers_once(self):
+        with self.model.events.batch():
+            self.a.text = "1"
+            with self.model.events.batch():
+                self.b.text = "2"
+            self.assertEqual(self.batches, [])
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0]), 2)
+
+    def test_load_is_one_batch(self):
+        data = self.model.save()
+        self.model.load(data)
+        self.assertEqual(len(self.batches), 1)
+        self.assertIn(ChangeType.MODEL_RESET, [e.type for e in self.batches[0]])
+
+    def test_detached_nodes_do_not_emit(self):
+        detached = Node("Detached")
+        detached.add_child("X").text = "Y"
+        self.assertEqual(self.batches, [])
+
+    def test_unsubscribe(self):
+        self.model.unsubscribe(self.batches.append)
+        self.a.text = "changed"
+        self.assertEqual(self.batches, [])
+
+class TestChangeBus(unittest.TestCase):
+    def test_no_listeners_no_pending(self):
+        bus = ChangeBus()
+        self.assertFalse(bus.active)
+        with bus.batch():
+            bus.emit(ChangeEvent(ChangeType.TEXT_CHANGED))
+        received = []
+        bus.subscribe(received.append)
+        with bus.batch():
+            pass
+        self.assertEqual(received, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from py_mind_memo.container import STRUCTURE_MEMBER, asset_member, load_container
+from py_mind_memo.json_loader import LoadError
+from py_mind_memo.lazy_payload import LazyPayload
+from py_mind_memo.models import MindMapModel, Reference, media_key
+from py_mind_memo.persistence import PersistenceHandler, load_file
+
+class TestContainer(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root 日本語")
+        a = self.model.add_node(self.model.root, "A")
+        b = self.model.add_node(self.model.root, "B")
+        self.a1 = a.add_child("A1")
+        self.image = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+        self.a1.image_data = self.image
+        a.add_child("A2").image_data = self.image
+        b.icon_data = b"icon"
+        self.model.add_reference(Reference(self.a1.id, b.id))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "map.pmm")
+        self.handler = PersistenceHandler(self.model, lambda **kwargs: None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, model=None, path=None):
+        model = model or self.model
+        PersistenceHandler(model, lambda **kwargs: None)._perform_write_to_file(
+            path or self.path, model.snapshot(), indent=None)
+
+    def load(self, path=None):
+        model = MindMapModel()
+        model.load_tree(*load_file(path or self.path))
+        return model
+
+    def test_round_trip(self):
+        self.write()
+        model = self.load()
+        self.assertEqual(model.fingerprint(), self.model.fingerprint())
+        self.assertEqual(model.save(), self.model.save())
+        self.assertEqual(model.verify_node_index(), [])
+
+    def test_images_are_stored_as_raw_members(self):
+        self.write()
+        with zipfile.ZipFile(self.path) as archive:
+            names = archive.namelist()
+            self.assertEqual(archive.getinfo(STRUCTURE_MEMBER).compress_type, zipfile.ZIP_DEFLATED)
+            member = asset_member(media_key(self.image))
+            self.assertEqual(archive.getinfo(member).compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.read(member), self.image)
+            self.assertNotIn(b"assets", archive.read(STRUCTURE_MEMBER))
+        # 同じ内容の画像は1つのメンバーにまとめる
+        self.assertEqual(len(names), 3)
+
+    def test_images_are_deferred(self):
+        self.write()
+        model = self.load()
+        node = model.find_node_by_id(self.a1.id)
+        self.assertIsInstance(node.image_payload, LazyPayload)
+        self.assertFalse(node.image_payload.encoded)
+        self.assertEqual(node.image_data, self.image)
+
+    def test_saving_over_source_keeps_images_readable(self):
+        self.write()
+        model = self.load()
+        node = model.find_node_by_id(self.a1.id)
+        icon_node = model.root.children[1]
+        removed = icon_node.icon_payload
+        icon_node.icon_data = None
+        node.text = "x" * 1000
+        self.write(model)
+        self.assertIsInstance(node.image_payload, LazyPayload)
+        self.assertEqual(node.image_data, self.image)
+        self.assertEqual(removed.load(), b"icon")
+        self.assertEqual(self.load().find_node_by_id(self.a1.id).image_data, self.image)
+
+    def test_conversion_between_formats(self):
+        json_path = os.path.join(self.tmp.name, "map.json")
+        self.write(path=json_path)
+        model = self.load(json_path)
+        self.write(model)
+        self.assertEqual(self.load().save(), self.model.save())
+        self.write(model, json_path)
+        self.assertEqual(self.load(json_path).save(), self.model.save())
+        self.assertEqual(model.find_node_by_id(self.a1.id).image_data, self.image)
+
+    def test_invalid_containers(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a zip")
+        with self.assertRaises(LoadError):
+            load_container(self.path)
+        with zipfile.ZipFile(self.path, "w") as archive:
+            archive.writestr("other.json", "{}")
+        with self.assertRaises(LoadError):
+            load_container(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import unittest
+from unittest.mock import MagicMock
+from py_mind_memo.layout import LayoutEngine
+from py_mind_memo.models import MindMapModel
+
+DEPTH = 10000
+
+class TestDeepTree(unittest.TestCase):
+    """再帰上限を超える深さのツリーでも走査・保存・レイアウトできること"""
+
+    def setUp(self):
+        self.assertGreater(DEPTH, sys.getrecursionlimit())
+        self.model = MindMapModel("Root")
+        node = self.model.root
+        for i in range(DEPTH):
+            node = node.add_child(f"Level {i}")
+        self.leaf = node
+
+    def test_to_dict_from_dict_round_trip(self):
+        data = self.model.save()
+        new_model = MindMapModel()
+        new_model.load(data)
+
+        depth = 0
+        node = new_model.root
+        while node.children:
+            node = node.children[0]
+            depth += 1
+        self.assertEqual(depth, DEPTH)
+        self.assertEqual(node.id, self.leaf.id)
+        self.assertEqual(new_model.verify_node_index(), [])
+        self.assertEqual([n.id for n in new_model.walk()], [n.id for n in self.model.walk()])
+
+    def test_find_node_by_id_in_subtree(self):
+        self.assertIs(self.model.find_node_by_id(self.leaf.id, self.model.root), self.leaf)
+        self.assertIsNone(self.model.find_node_by_id("missing", self.model.root))
+
+    def test_update_direction(self):
+        top = self.model.root.children[0]
+        top.update_direction_recursive("left")
+        self.assertEqual(self.leaf.direction, "left")
+
+    def test_apply_layout(self):
+        graphics = MagicMock()
+        graphics.get_text_size.return_value = (100, 40)
+        LayoutEngine().apply_layout(self.model, graphics, 0, 0)
+        self.assertEqual(self.model.root.subtree_height, 40)
+        self.assertEqual(self.leaf.y, 0)
+        self.assertGreater(self.leaf.x, self.leaf.parent.x)
+
+    def test_walk_orders(self):
+        pre = list(self.model.walk())
+        self.assertIs(pre[0], self.model.root)
+        self.assertIs(pre[-1], self.leaf)
+        post = list(self.model.walk(order="post"))
+        self.assertIs(post[0], self.leaf)
+        self.assertIs(post[-1], self.model.root)
+        self.assertEqual(len(pre), DEPTH + 1)
+
+class TestWalk(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        root = self.model.root
+        self.a = root.add_child("A")
+        self.a1 = self.a.add_child("A1")
+        self.a2 = self.a.add_child("A2")
+        self.b = root.add_child("B")
+
+    def test_preorder_follows_child_order(self):
+        self.assertEqual([n.text for n in self.model.walk()], ["Root", "A", "A1", "A2", "B"])
+
+    def test_postorder(self):
+        self.assertEqual([n.text for n in self.model.walk(order="post")], ["A1", "A2", "A", "B", "Root"])
+
+    def test_visible_only_skips_collapsed_descendants(self):
+        self.a.collapsed = True
+        self.assertEqual([n.text for n in self.model.walk(visible_only=True)], ["Root", "A", "B"])
+        self.assertEqual([n.text for n in self.model.walk(order="post", visible_only=True)], ["A", "B", "Root"])
+
+    def test_walk_from_start_node(self):
+        self.assertEqual(list(self.model.walk(start=self.a)), [self.a, self.a1, self.a2])
+        with self.assertRaises(ValueError):
+            list(self.model.walk(order="level"))
+
+if __name__ == '__main__':
+    unittest.main()
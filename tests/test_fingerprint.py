@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+from py_mind_memo import models
+from py_mind_memo.models import MindMapModel, Node
+from py_mind_memo.photo_cache import PhotoImageCache
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.a1 = self.a.add_child("A1")
+        self.b1 = self.b.add_child("B1")
+
+    def test_change_propagates_to_ancestors_only(self):
+        root_fp, a_fp, b_fp = self.model.fingerprint(), self.a.fingerprint, self.b.fingerprint
+        self.a1.text = "Edited"
+        self.assertNotEqual(self.a.fingerprint, a_fp)
+        self.assertNotEqual(self.model.fingerprint(), root_fp)
+        self.assertEqual(self.b.fingerprint, b_fp)
+        # 変更のないサブツリーは再計算しない
+        self.assertIsNotNone(self.b._subtree_hash)
+
+    def test_reverting_change_restores_fingerprint(self):
+        fp = self.model.fingerprint()
+        self.a1.image_data = b"data"
+        self.assertNotEqual(self.model.fingerprint(), fp)
+        self.a1.image_data = None
+        self.assertEqual(self.model.fingerprint(), fp)
+
+    def test_structure_changes(self):
+        fp = self.model.fingerprint()
+        self.model.move_node_down(self.a)
+        self.assertNotEqual(self.model.fingerprint(), fp)
+        self.model.move_node_up(self.a)
+        self.assertEqual(self.model.fingerprint(), fp)
+
+        a_fp, b_fp = self.a.fingerprint, self.b.fingerprint
+        self.a1.move_to(self.b)
+        self.assertNotEqual(self.a.fingerprint, a_fp)
+        self.assertNotEqual(self.b.fingerprint, b_fp)
+
+        fp = self.model.fingerprint()
+        self.b.remove_child(self.b1)
+        self.assertNotEqual(self.model.fingerprint(), fp)
+
+    def test_layout_only_attributes_are_ignored(self):
+        fp = self.model.fingerprint()
+        self.a.x, self.a.y = 123, 456
+        self.a.update_direction_recursive("left")
+        self.assertEqual(self.model.fingerprint(), fp)
+
+    def test_same_content_after_load(self):
+        other = MindMapModel()
+        other.load(self.model.save())
+        self.assertEqual(other.fingerprint(), self.model.fingerprint())
+
+    def test_media_is_hashed_once_when_set(self):
+        data = b"\x89PNG\r\n\x1a\n" * 1000
+        node = Node("Topic")
+        node.image_data = data
+        self.assertEqual(node.image_key, PhotoImageCache().key_for(data))
+        with patch.object(models.hashlib, "blake2b", wraps=models.hashlib.blake2b) as blake2b:
+            node.fingerprint
+            node.text = "Changed"
+            node.fingerprint
+        for call in blake2b.call_args_list:
+            self.assertLess(len(call.args[0]) if call.args else 0, len(data))
+
+    def test_deep_tree(self):
+        node = self.b1
+        for i in range(5000):
+            node = node.add_child(f"D{i}")
+        fp = self.model.fingerprint()
+        node.text = "Leaf"
+        self.assertNotEqual(self.model.fingerprint(), fp)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
+import struct
 import unittest
 from unittest.mock import MagicMock, patch
+from py_mind_memo.constants import IMAGE_SPACING
 from py_mind_memo.graphics import GraphicsEngine
+from py_mind_memo.models import MindMapModel
 
 class TestGraphicsLogic(unittest.TestCase):
     def setUp(self):
@@ -51,5 +54,149 @@ class TestGraphicsLogic(unittest.TestCase):
         self.assertEqual("".join(s[0] for s in wrapped[0]), "12345")
         self.assertEqual("".join(s[0] for s in wrapped[1]), "67890")
 
+    def test_draw_text_line_uses_precomputed_widths(self):
+        # 幅は折り返し結果から渡され、計測用の一時アイテム (create_text + bbox + delete) を作らない
+        self.engine.measurer.line_height = MagicMock(return_value=16)
+        segments = [("Hello", "normal", True, "#333333"), ("World", "bold", False, "#333333")]
+        ids = self.engine._draw_text_line(100, 0, segments, [40, 50], "Arial", 10, ("text", "n1"))
+        self.assertEqual(self.canvas.create_text.call_count, 2)
+        self.assertEqual(len(ids), 3)  # テキスト2つ + 下線1本
+        self.canvas.bbox.assert_not_called()
+        self.canvas.delete.assert_not_called()
+        first_x = self.canvas.create_text.call_args_list[0].args[0]
+        self.assertEqual(first_x, 100 - 45 + 20)
+
+    def test_connections_are_single_items(self):
+        self.canvas.create_line.return_value = 1
+        self.canvas.create_polygon.return_value = 2
+        items = self.engine._draw_bezier(0, 0, 40, 0, 60, 100, 100, 100, "#000000", 2)
+        self.assertEqual(items, [1])
+        coords = self.canvas.create_line.call_args.args
+        self.assertEqual(len(coords), (self.engine.BEZIER_STEPS + 1) * 2)
+
+        items = self.engine._draw_tapered_bezier(0, 0, 100, 100, "#000000", 8, 2)
+        self.assertEqual(items, [2])
+        coords = self.canvas.create_polygon.call_args.args
+        self.assertEqual(len(coords), (self.engine.TAPERED_BEZIER_STEPS + 1) * 4)
+
+    def test_set_curve_resolution(self):
+        self.engine.set_curve_resolution(8)
+        self.assertEqual(self.engine.BEZIER_STEPS, 8)
+        self.assertEqual(self.engine.TAPERED_BEZIER_STEPS, 16)
+        with self.assertRaises(ValueError):
+            self.engine.set_curve_resolution(0)
+
+class TestRetainedRendering(unittest.TestCase):
+    def setUp(self):
+        self.canvas = MagicMock()
+        self.engine = GraphicsEngine(self.canvas)
+        self.engine.get_text_size = MagicMock(return_value=(100, 40))
+        self.engine._draw_rich_text = MagicMock(return_value=[])
+        self.model = MindMapModel("Root")
+        self.child = self.model.add_node(self.model.root, "Child")
+        self.child.x, self.child.y = 200, 0
+
+    def _frame(self, *nodes):
+        self.engine.begin_frame()
+        for node in nodes:
+            self.engine.render_node(node)
+        self.engine.end_frame()
+
+    def _created_count(self):
+        return sum(getattr(self.canvas, name).call_count
+                   for name in ("create_line", "create_polygon", "create_oval", "create_text"))
+
+    def test_unchanged_frame_creates_no_items(self):
+        self._frame(self.model.root, self.child)
+        self.canvas.reset_mock()
+        self._frame(self.model.root, self.child)
+        self.assertEqual(self._created_count(), 0)
+        self.canvas.delete.assert_not_called()
+        self.canvas.move.assert_not_called()
+
+    def test_moved_node_is_translated(self):
+        self._frame(self.model.root, self.child)
+        self.canvas.reset_mock()
+        self.child.y = 50
+        self._frame(self.model.root, self.child)
+        self.canvas.move.assert_called_once_with(self.child.id, 0, 50)
+        self.assertEqual(self._created_count(), 0)
+        self.assertTrue(self.canvas.coords.called)  # 接続線は座標のみ更新
+
+    def test_changed_node_is_redrawn(self):
+        self._frame(self.model.root, self.child)
+        self.canvas.reset_mock()
+        self.child.text = "Edited"
+        self._frame(self.model.root, self.child)
+        self.assertGreater(self.canvas.create_line.call_count, 0)
+        self.canvas.move.assert_not_called()
+
+    def test_redrawn_fill_is_lowered_below_connections(self):
+        # 選択で作り直したルートの塗りつぶしと強調表示は、既存の子の接続線より背面に置く
+        self.canvas.create_polygon.side_effect = [11, 12]
+        self._frame(self.model.root, self.child)
+        self.canvas.reset_mock()
+        self.canvas.create_polygon.side_effect = [21, 22]
+        self.engine.begin_frame()
+        self.engine.render_node(self.model.root, is_selected=True)
+        self.engine.render_node(self.child)
+        self.engine.end_frame()
+        self.assertEqual([c.args for c in self.canvas.tag_lower.call_args_list], [(22,), (21,)])
+
+    def test_removed_node_items_are_deleted(self):
+        self._frame(self.model.root, self.child)
+        self.assertIn(self.child.id, self.engine.node_items)
+        self._frame(self.model.root)
+        self.assertNotIn(self.child.id, self.engine.node_items)
+        self.assertNotIn(self.child.id, self.engine.line_items)
+
+class TestMediaSizing(unittest.TestCase):
+    def setUp(self):
+        self.canvas = MagicMock()
+        self.engine = GraphicsEngine(self.canvas)
+        self.engine._layout_rich_text = MagicMock(return_value=MagicMock(block_width=40, height=20, first_line_width=40))
+        photo = MagicMock()
+        photo.width.return_value, photo.height.return_value = 120, 90
+        self.engine.photo_cache._factory = MagicMock(return_value=photo)
+        self.model = MindMapModel("Root")
+        self.node = self.model.add_node(self.model.root, "Child")
+        self.node.image_data = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", 120, 90) + b"rest"
+
+    def test_measuring_does_not_decode_images(self):
+        # レイアウトのための計測は画像ヘッダーの大きさを使い、PhotoImage を作らない
+        w, h = self.engine.get_text_size(self.node, self.engine.font)
+        self.assertEqual(w, 140)
+        self.assertEqual(h, 20 + 12 + 90 + IMAGE_SPACING)
+        self.engine.photo_cache._factory.assert_not_called()
+        self.assertEqual(self.engine.image_cache, {})
+
+    def test_drawing_decodes_image(self):
+        engine = self.engine
+        engine.draw_node(self.node)
+        engine.photo_cache._factory.assert_called_once()
+        self.assertIn(self.node.id, engine.image_cache)
+        self.assertEqual(self.canvas.create_image.call_count, 1)
+
+    def test_only_drawn_nodes_hold_photos(self):
+        # 計測したすべてのノードではなく、描画したノードだけが PhotoImage を保持する
+        engine = self.engine
+        others = [self.model.add_node(self.model.root, f"N{i}") for i in range(3)]
+        for node in others:
+            node.image_data = self.node.image_data
+        for node in [self.model.root, self.node] + others:
+            engine.get_text_size(node, engine.font)
+        self.assertEqual(engine.image_cache, {})
+
+        engine.begin_frame()
+        engine.render_node(self.node)
+        engine.end_frame()
+        self.assertEqual(set(engine.image_cache), {self.node.id})
+
+        # 表示範囲から外れたノードの PhotoImage は次のフレームで手放す
+        engine.begin_frame()
+        engine.render_node(others[0])
+        engine.end_frame()
+        self.assertEqual(set(engine.image_cache), {others[0].id})
+
 if __name__ == '__main__':
     unittest.main()
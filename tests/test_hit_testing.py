@@ -0,0 +1,69 @@
+import struct
+import unittest
+from unittest.mock import MagicMock
+from py_mind_memo.graphics import GraphicsEngine
+from py_mind_memo.hit_testing import HitTester
+from py_mind_memo.models import MindMapModel, Reference
+
+class TestHitTester(unittest.TestCase):
+    def setUp(self):
+        self.graphics = GraphicsEngine(MagicMock())
+        self.hit_tester = HitTester(self.graphics)
+        self.model = MindMapModel("Root")
+        self.root = self.model.root
+        self.a = self.model.add_node(self.root, "A")
+        self.a1 = self.a.add_child("A1")
+        self.b = self.model.add_node(self.root, "B")
+        self._place(self.root, 0, 0, 80, 20)
+        self._place(self.a, 200, -100, 40, 16)
+        self._place(self.a1, 350, -100, 40, 16)
+        self._place(self.b, 200, 100, 40, 16)
+        for node in (self.root, self.a, self.a1, self.b):
+            self.hit_tester.sync_node(node)
+
+    @staticmethod
+    def _place(node, x, y, w, h):
+        node.x, node.y, node.width, node.height = x, y, w, h
+
+    def test_node_at(self):
+        self.assertIs(self.hit_tester.node_at(0, 0), self.root)
+        self.assertIs(self.hit_tester.node_at(215, -95), self.a)
+        # クリック範囲は少し広げて判定する
+        self.assertIs(self.hit_tester.node_at(200, 100 + 8 + 4 + 5), self.b)
+        self.assertIsNone(self.hit_tester.node_at(200, 0))
+
+    def test_collapse_icon_at(self):
+        # 子を持つ右側のノードは右下にアイコンを持つ
+        self.assertIs(self.hit_tester.collapse_icon_at(200 + 20 + 10, -100 + 8), self.a)
+        self.assertIsNone(self.hit_tester.collapse_icon_at(200 + 20 + 10, 100 + 8))
+
+    def test_moved_node_is_reindexed(self):
+        self._place(self.b, 600, 400, 40, 16)
+        self.hit_tester.sync_node(self.b)
+        self.assertIsNone(self.hit_tester.node_at(200, 100))
+        self.assertIs(self.hit_tester.node_at(600, 400), self.b)
+        self.hit_tester.remove_node(self.b)
+        self.assertIsNone(self.hit_tester.node_at(600, 400))
+
+    def test_image_box_does_not_depend_on_drawing(self):
+        # 画像の当たり判定は描画済みかどうか（表示範囲外で PhotoImage を手放したか）に関係しない
+        self.b.image_data = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", 30, 20)
+        self._place(self.b, 200, 100, 40, 16 + 20)
+        self.hit_tester.sync_node(self.b)
+        self.assertNotIn(self.b.id, self.graphics.image_cache)
+        self.assertIs(self.hit_tester.image_at(200, 100 - 18 + 10 + 10), self.b)
+        self.assertIsNone(self.hit_tester.image_at(200 + 20, 100 - 18 + 10 + 10, padding=0))
+
+    def test_reference_and_handles(self):
+        ref = Reference(self.a1.id, self.b.id)
+        self.hit_tester.sync_reference(ref, self.a1, self.b)
+        sx, sy, cp1x, cp1y, cp2x, cp2y, tx, ty = self.graphics.get_reference_points(ref, self.a1, self.b)
+        # 始点付近は線上、始点から大きく外れた点は対象外
+        self.assertIs(self.hit_tester.reference_at(sx, sy + 2), ref)
+        self.assertIsNone(self.hit_tester.reference_at(sx + 100, sy))
+        self.assertEqual(self.hit_tester.reference_handle_at(cp1x, cp1y, ref, self.a1, self.b), "cp1")
+        self.assertEqual(self.hit_tester.reference_handle_at(cp2x + 3, cp2y, ref, self.a1, self.b), "cp2")
+        self.assertIsNone(self.hit_tester.reference_handle_at(sx - 50, sy, ref, self.a1, self.b))
+
+if __name__ == '__main__':
+    unittest.main()
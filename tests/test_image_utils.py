@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import patch, mock_open
 import base64
-from py_mind_memo.image_utils import calculate_subsample, file_to_base64
+import struct
+from py_mind_memo.image_utils import (calculate_subsample, decode_image_data, encode_image_data,
+                                      file_to_base64, file_to_bytes, image_size)
 
 class TestImageUtils(unittest.TestCase):
     def test_calculate_subsample(self):
@@ -36,5 +38,24 @@ class TestImageUtils(unittest.TestCase):
             result = file_to_base64("dummy.png")
             self.assertEqual(result, expected_base64)
 
+    def test_file_to_bytes(self):
+        dummy_content = b"fake image data"
+        with patch("builtins.open", mock_open(read_data=dummy_content)):
+            self.assertEqual(file_to_bytes("dummy.png"), dummy_content)
+
+    def test_encode_decode_image_data(self):
+        raw = bytes(range(256))
+        text = encode_image_data(raw)
+        self.assertEqual(text, base64.b64encode(raw).decode('ascii'))
+        self.assertEqual(decode_image_data(text), raw)
+
+    def test_image_size_from_header(self):
+        png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", 640, 480)
+        self.assertEqual(image_size(png), (640, 480))
+        self.assertEqual(image_size(b"GIF89a" + struct.pack("<HH", 32, 16)), (32, 16))
+        # ヘッダーが欠けている場合や未対応の形式は None
+        self.assertIsNone(image_size(png[:20]))
+        self.assertIsNone(image_size(b"P6\n32 16\n255\n"))
+
 if __name__ == '__main__':
     unittest.main()
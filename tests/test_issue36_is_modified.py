@@ -17,12 +17,12 @@ class TestIssue36IsModified(unittest.TestCase):
 
     @patch('py_mind_memo.editor.ImageHandler.pick_and_load_image')
     @patch('py_mind_memo.editor.ImageHandler.process_image')
-    @patch('py_mind_memo.editor.ImageHandler.base64_from_photo')
+    @patch('py_mind_memo.editor.ImageHandler.png_from_photo')
     def test_insert_image_sets_is_modified(self, mock_b64, mock_process, mock_pick):
         # Setup mocks
         mock_pick.return_value = "dummy.png"
         mock_process.return_value = MagicMock(spec=tk.PhotoImage)
-        mock_b64.return_value = "dummy_base64"
+        mock_b64.return_value = b"dummy_png"
         
         # Initialize NodeEditor
         editor = NodeEditor(self.canvas, self.root, MagicMock(), lambda: None, self.model)
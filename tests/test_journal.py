@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+import unittest
+from py_mind_memo.journal import JOURNAL_VERSION, _file_stamp, journal_path, read_journal
+from py_mind_memo.json_loader import LoadError
+from py_mind_memo.models import MindMapModel, Reference
+from py_mind_memo.persistence import PersistenceHandler
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.a1 = self.a.add_child("A1")
+        self.r = self.a.add_child("R")
+        self.r.add_child("R1")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "map.json")
+        self.handler = PersistenceHandler(self.model, lambda **kwargs: None)
+        self.assertTrue(self.handler._write_to_file(self.path))
+
+    def tearDown(self):
+        self.handler.discard_journal()
+        self.tmp.cleanup()
+
+    def edit(self):
+        self.a1.text = "Edited"
+        c = self.model.add_node(self.b, "C")
+        c.image_data = b"\x89PNG\r\n\x1a\n image"
+        self.a1.move_to(self.b)
+        self.model.move_node_up(self.b)
+        self.model.add_reference(Reference(c.id, self.a.id))
+        self.a.remove_child(self.r)
+        self.model.add_node(self.a, "D").add_child("D1")
+
+    def reopen(self):
+        """ジャーナルを閉じずに（異常終了した状態で）文書を開き直す"""
+        model = MindMapModel()
+        handler = PersistenceHandler(model, lambda **kwargs: None)
+        handler._apply_loaded(self.path, *handler._read_document(self.path))
+        self.addCleanup(handler.discard_journal)
+        return model, handler
+
+    def test_unsaved_changes_are_recovered(self):
+        self.edit()
+        self.handler.journal.sync()
+        self.assertFalse(self.handler.journal.needs_compaction())
+        model, handler = self.reopen()
+        self.assertEqual(model.save(), self.model.save())
+        self.assertEqual(model.verify_node_index(), [])
+        self.assertTrue(model.is_modified)
+        # 復元後の変更は同じジャーナルに続けて記録される
+        model.root.children[0].text = "After recovery"
+        handler.journal.sync()
+        handler.journal.close()
+        recovered, _ = self.reopen()
+        self.assertEqual(recovered.save(), model.save())
+
+    def test_save_compacts_journal(self):
+        self.edit()
+        self.assertTrue(os.path.exists(journal_path(self.path)))
+        self.assertTrue(self.handler.on_save())
+        self.assertFalse(os.path.exists(journal_path(self.path)))
+        model, _ = self.reopen()
+        self.assertEqual(model.save(), self.model.save())
+        self.assertFalse(model.is_modified)
+
+    def test_compaction_keeps_later_changes(self):
+        self.edit()
+        snapshot = self.model.snapshot()
+        self.b.text = "Changed while saving"
+        # 自動保存と同様に、取得済みのスナップショットを書き出す
+        self.handler._perform_write_to_file(self.path, snapshot, indent=None)
+        records, _ = read_journal(self.path)
+        self.assertEqual(len(records), 1)
+        model, _ = self.reopen()
+        self.assertEqual(model.save(), self.model.save())
+
+    def test_torn_record_is_ignored(self):
+        self.a1.text = "Kept"
+        self.handler.journal.close()
+        with open(journal_path(self.path), "ab") as f:
+            f.write(b'{"nodes": [["')
+        model, handler = self.reopen()
+        self.assertEqual(model.find_node_by_id(self.a1.id).text, "Kept")
+        model.root.text = "Next"
+        handler.journal.close()
+        records, _ = read_journal(self.path)
+        self.assertEqual(len(records), 2)
+
+    def test_stale_journal_is_ignored(self):
+        self.a1.text = "Unsaved"
+        self.handler.journal.close()
+        other = PersistenceHandler(MindMapModel("Other"), lambda **kwargs: None)
+        other._perform_write_to_file(self.path, other.model.snapshot())
+        model, _ = self.reopen()
+        self.assertEqual(model.root.text, "Other")
+        self.assertFalse(model.is_modified)
+
+    def test_malformed_record_is_set_aside(self):
+        self.a1.text = "Unsaved"
+        self.handler.journal.close()
+        with open(journal_path(self.path), "ab") as f:
+            f.write(b'{"nodes": [["x"]]}\n')
+        model, _ = self.reopen()
+        # 適用できないジャーナルは別名で残し、保存済みの文書を開く
+        self.assertEqual(model.find_node_by_id(self.a1.id).text, "A1")
+        self.assertFalse(model.is_modified)
+        self.assertTrue(os.path.exists(journal_path(self.path) + ".bad"))
+
+    def test_corrupt_document_keeps_journal(self):
+        self.a1.text = "Unsaved"
+        self.handler.journal.close()
+        with open(self.path, "r+b") as f:
+            f.write(b"{ broken")
+        # ジャーナルは壊れた文書を基準としたものとして残っている状態にする
+        with open(journal_path(self.path), "rb") as f:
+            records = f.read().split(b"\n", 1)[1]
+        header = json.dumps({"journal": JOURNAL_VERSION, "base": _file_stamp(self.path)}).encode()
+        with open(journal_path(self.path), "wb") as f:
+            f.write(header + b"\n" + records)
+        handler = PersistenceHandler(MindMapModel(), lambda **kwargs: None)
+        # 文書の破損はジャーナルのせいではないため、ジャーナルは別名にせずそのまま残す
+        with self.assertRaises(LoadError):
+            handler._read_document(self.path)
+        self.assertIsNotNone(read_journal(self.path))
+        self.assertFalse(os.path.exists(journal_path(self.path) + ".bad"))
+
+    def test_discard(self):
+        self.a1.text = "Discarded"
+        self.handler.discard_journal()
+        self.assertFalse(os.path.exists(journal_path(self.path)))
+        model, _ = self.reopen()
+        self.assertEqual(model.find_node_by_id(self.a1.id).text, "A1")
+
+if __name__ == '__main__':
+    unittest.main()
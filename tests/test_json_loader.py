@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from py_mind_memo.json_loader import LoadError, load_document
+from py_mind_memo.lazy_payload import LazyPayload
+from py_mind_memo.models import MindMapModel, Reference, media_key
+from py_mind_memo.persistence import PersistenceHandler
+
+class TestJsonLoader(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel('Root "quoted" 日本語 \\ ☃')
+        a = self.model.add_node(self.model.root, "A")
+        b = self.model.add_node(self.model.root, "B\nsecond line")
+        self.a1 = a.add_child("A1")
+        self.a1.image_data = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+        a.add_child("A2").image_data = self.a1.image_data
+        b.icon_data = b"icon"
+        b.collapsed = True
+        b.color = "#FF0000"
+        ref = self.model.add_reference(Reference(self.a1.id, b.id))
+        self.model.set_reference_control_point(ref, "cp1", 1.5, -2)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "map.json")
+        self.handler = PersistenceHandler(self.model, lambda **kwargs: None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data=None, indent=4):
+        self.handler._perform_write_to_file(self.path, self.model.snapshot() if data is None else data, indent)
+
+    def load(self, chunk_size=7):
+        with open(self.path, "rb") as f:
+            root, references = load_document(f, self.path, chunk_size=chunk_size)
+        model = MindMapModel()
+        model.load_tree(root, references)
+        return model
+
+    def test_matches_json_load(self):
+        for indent in (4, None):
+            self.write(indent=indent)
+            with open(self.path, encoding="utf-8") as f:
+                expected = MindMapModel()
+                expected.load(json.load(f))
+            model = self.load()
+            self.assertEqual(model.save(), expected.save())
+            self.assertEqual(model.fingerprint(), self.model.fingerprint())
+            self.assertEqual(model.verify_node_index(), [])
+
+    def test_images_are_deferred(self):
+        self.write()
+        model = self.load()
+        node = model.find_node_by_id(self.a1.id)
+        self.assertIsInstance(node.image_payload, LazyPayload)
+        self.assertEqual(node.image_key, media_key(self.a1.image_data))
+        self.assertEqual(node.image_data, self.a1.image_data)
+        # 同じ内容の画像は1つのデータを共有する
+        self.assertEqual(len(model.assets), 2)
+
+    def test_payload_head(self):
+        # 画像ヘッダーの参照では Base64 の先頭だけを読み、データはメモリに保持しない
+        self.write()
+        node = self.load().find_node_by_id(self.a1.id)
+        payload = node.image_payload
+        self.assertEqual(payload.head(24), self.a1.image_data[:24])
+        self.assertIsNone(payload._data)
+
+    def test_legacy_formats(self):
+        # 他のツールで書き出された "\/" のエスケープを含む Base64 も読めること
+        text = json.dumps(self.model.root.to_dict()).replace("/", "\\/")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        with open(self.path, encoding="utf-8") as f:
+            expected = MindMapModel()
+            expected.load(json.load(f))
+        model = self.load(chunk_size=5)
+        self.assertEqual(model.save(), expected.save())
+        self.assertEqual(model.references, [])
+        node = model.find_node_by_id(self.a1.id)
+        self.assertIsInstance(node.image_payload, LazyPayload)
+        self.assertEqual(node.image_data, self.a1.image_data)
+
+    def test_deep_tree(self):
+        node = self.model.root
+        for i in range(3000):
+            node = node.add_child(f"D{i}")
+        self.write(indent=None)
+        model = self.load(chunk_size=4096)
+        self.assertEqual(model.fingerprint(), self.model.fingerprint())
+
+    def test_saving_over_source_keeps_images_readable(self):
+        self.write()
+        model = self.load()
+        handler = PersistenceHandler(model, lambda **kwargs: None)
+        node = model.find_node_by_id(self.a1.id)
+        icon_node = model.root.children[1]
+        removed = icon_node.icon_payload
+        # 取り消し履歴だけが持つデータは、ファイルが置き換えられる前にメモリに読み込まれる
+        icon_node.icon_data = None
+        node.text = "x" * 1000  # 保存ファイル内の画像データの位置がずれるように変更する
+        handler._perform_write_to_file(self.path, model.snapshot(), indent=None)
+        self.assertIsInstance(node.image_payload, LazyPayload)
+        self.assertEqual(node.image_data, self.a1.image_data)
+        self.assertEqual(removed.load(), b"icon")
+        self.assertEqual(self.load().find_node_by_id(self.a1.id).image_data, self.a1.image_data)
+
+    def test_invalid_files(self):
+        for text in (b'{"root": {"text": "A", "children": [', b'{"root": {"text": "A"} "x": 1}',
+                     b'{"root": {"children": []}}', b'{"root": {"text": "A", "image_data": "abc"}}'):
+            with self.assertRaises(LoadError):
+                load_document(io.BytesIO(text), self.path, chunk_size=4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from py_mind_memo.json_stream import write_snapshot
+from py_mind_memo.models import MindMapModel, Reference
+from py_mind_memo.persistence import PersistenceHandler
+
+class TestJsonStream(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel('Root "quoted" 日本語')
+        a = self.model.add_node(self.model.root, "A")
+        b = self.model.add_node(self.model.root, "B\nsecond line")
+        a1 = a.add_child("A1")
+        a1.image_data = b"\x89PNG\r\n\x1a\n"
+        b.icon_data = b"icon"
+        b.collapsed = True
+        ref = self.model.add_reference(Reference(a1.id, b.id))
+        self.model.set_reference_control_point(ref, "cp1", 1.5, -2)
+
+    def stream(self, indent, chunk_chars=16):
+        buf = io.BytesIO()
+        write_snapshot(self.model.snapshot(), buf.write, indent=indent, chunk_chars=chunk_chars)
+        return buf.getvalue().decode("utf-8")
+
+    def test_indented_output_matches_json_dump(self):
+        expected = json.dumps(self.model.snapshot().to_dict(), ensure_ascii=False, indent=4)
+        self.assertEqual(self.stream(4), expected)
+
+    def test_compact_output(self):
+        expected = json.dumps(self.model.snapshot().to_dict(), ensure_ascii=False, separators=(",", ":"))
+        self.assertEqual(self.stream(None), expected)
+
+    def test_empty_sections(self):
+        model = MindMapModel()
+        buf = io.BytesIO()
+        write_snapshot(model.snapshot(), buf.write, indent=4)
+        self.assertEqual(buf.getvalue().decode("utf-8"), json.dumps(model.save(), ensure_ascii=False, indent=4))
+
+    def test_deep_tree(self):
+        node = self.model.root
+        for i in range(3000):
+            node = node.add_child(f"D{i}")
+        # 標準の json デコーダは再帰するため、深さの検証は書き出した文字列で行う
+        text = self.stream(None, chunk_chars=4096)
+        # 葉は A1, B と最も深いノードの3つ
+        self.assertEqual(text.count('"children":[]'), 3)
+        self.assertTrue(text.endswith("}"))
+
+    def test_perform_write_to_file_with_snapshot(self):
+        handler = PersistenceHandler(self.model, lambda **kwargs: None)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "map.json")
+            handler._perform_write_to_file(path, self.model.snapshot(), indent=None)
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.assertEqual(os.listdir(tmp), ["map.json"])
+        other = MindMapModel()
+        other.load(data)
+        self.assertEqual(other.save(), self.model.save())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -52,5 +52,89 @@ class TestLayoutEngine(unittest.TestCase):
         height = self.engine.calculate_subtree_height(c1, self.graphics)
         self.assertEqual(height, 40) # 子ノードがあっても折りたたまれていれば自身の高さのみ
 
+class TestIncrementalLayout(unittest.TestCase):
+    def setUp(self):
+        self.engine = LayoutEngine(incremental=True)
+        self.model = MindMapModel("Root")
+        self.graphics = MagicMock()
+        self.graphics.get_text_size.return_value = (100, 40)
+        root = self.model.root
+        self.a = self.model.add_node(root, "A")  # right
+        self.a1 = self.model.add_node(self.a, "A1")
+        self.a2 = self.model.add_node(self.a, "A2")
+        self.a3 = self.model.add_node(self.a, "A3")
+        self.b = self.model.add_node(root, "B")  # right (below A)
+        self.b1 = self.model.add_node(self.b, "B1")
+        self.c = self.model.add_node(root, "C")  # left
+        self.c1 = self.model.add_node(self.c, "C1")
+
+    def _positions(self):
+        return {n.id: (n.x, n.y, n.width, n.height) for n in
+                (self.model.root, self.a, self.a1, self.a2, self.a3,
+                 self.b, self.b1, self.c, self.c1)}
+
+    def _full_layout_positions(self):
+        full = LayoutEngine()
+        full.apply_layout(self.model, self.graphics, 0, 0)
+        return self._positions()
+
+    def test_clean_tree_is_not_recomputed(self):
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        self.graphics.get_text_size.reset_mock()
+
+        moved = self.engine.apply_layout(self.model, self.graphics, 0, 0)
+
+        self.graphics.get_text_size.assert_not_called()
+        self.assertEqual(moved, set())
+
+    def test_text_change_recomputes_only_dirty_path(self):
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        self.graphics.get_text_size.reset_mock()
+
+        self.a1.text = "Changed"
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+
+        measured = {call.args[0] for call in self.graphics.get_text_size.call_args_list}
+        self.assertEqual(measured, {self.model.root, self.a, self.a1})
+
+    def test_growing_node_shifts_siblings_below(self):
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        before = self._positions()
+
+        def size(node, font):
+            return (100, 100) if node is self.a2 else (100, 40)
+        self.graphics.get_text_size.side_effect = size
+        self.a2.text = "Taller"
+        moved = self.engine.apply_layout(self.model, self.graphics, 0, 0)
+
+        self.assertIn(self.a2, moved)
+        self.assertIn(self.a3, moved)
+        self.assertIn(self.b1, moved)  # 下側の兄弟サブツリーは平行移動される
+        self.assertNotIn(self.c, moved)
+        self.assertNotIn(self.c1, moved)
+        self.assertEqual(self._positions()[self.c1.id], before[self.c1.id])
+
+        incremental = self._positions()
+        self.assertEqual(incremental, self._full_layout_positions())
+
+    def test_collapse_toggle_matches_full_layout(self):
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        self.a.collapsed = True
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        self.a.collapsed = False
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        incremental = self._positions()
+        self.assertEqual(incremental, self._full_layout_positions())
+
+    def test_move_and_reorder_match_full_layout(self):
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        self.a3.move_to(self.b)
+        self.a3.update_direction_recursive(self.b.direction)
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        self.model.move_node_up(self.a3)
+        self.engine.apply_layout(self.model, self.graphics, 0, 0)
+        incremental = self._positions()
+        self.assertEqual(incremental, self._full_layout_positions())
+
 if __name__ == '__main__':
     unittest.main()
@@ -47,5 +47,17 @@ class TestReferenceModel(unittest.TestCase):
         self.assertEqual(compat_model.root.text, "Old Root")
         self.assertEqual(len(compat_model.references), 0)
 
+    def test_slots_layout(self):
+        """Node と Reference はインスタンス辞書を持たず、未宣言の属性は設定できないこと"""
+        node = Node("Topic")
+        ref = Reference(node.id, node.id)
+        for obj in (node, ref):
+            self.assertFalse(hasattr(obj, "__dict__"))
+            with self.assertRaises(AttributeError):
+                obj.undeclared_attribute = 1
+        # レイアウト・描画用のキャッシュは宣言済みで初期値を持つ
+        self.assertEqual(node.subtree_height, node.height)
+        self.assertIsNone(node._size_cache_key)
+
 if __name__ == '__main__':
     unittest.main()
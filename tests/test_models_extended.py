@@ -61,7 +61,7 @@ class TestModelsExtended(unittest.TestCase):
     def test_serialization_full_tree(self):
         root = self.model.root
         child = self.model.add_node(root, "Child")
-        child.image_data = "dummy_base64"
+        child.image_data = b"dummy_png"
         child.collapsed = True
         
         data = self.model.save()
@@ -73,7 +73,7 @@ class TestModelsExtended(unittest.TestCase):
         self.assertEqual(len(new_model.root.children), 1)
         restored_child = new_model.root.children[0]
         self.assertEqual(restored_child.text, "Child")
-        self.assertEqual(restored_child.image_data, "dummy_base64")
+        self.assertEqual(restored_child.image_data, b"dummy_png")
         self.assertTrue(restored_child.collapsed)
 
     def test_move_node_up(self):
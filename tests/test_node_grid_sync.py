@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tkinter as tk
+from py_mind_memo.graphics import GraphicsEngine
+from py_mind_memo.hit_testing import HitTester
+from py_mind_memo.layout import LayoutEngine
+from py_mind_memo.view import MindMapView
+
+class TestNodeGridSync(unittest.TestCase):
+    def setUp(self):
+        # UIコンポーネントをモック化し、レイアウトと索引は実物を使う
+        with patch('py_mind_memo.view.GraphicsEngine'), \
+             patch('py_mind_memo.view.NodeEditor'), \
+             patch('py_mind_memo.view.DragDropHandler'), \
+             patch('py_mind_memo.view.KeyboardNavigator'), \
+             patch('py_mind_memo.view.PersistenceHandler'), \
+             patch('py_mind_memo.view.MindMapView.render'), \
+             patch('tkinter.Canvas'), \
+             patch('tkinter.Frame'), \
+             patch('tkinter.Scrollbar'), \
+             patch('tkinter.Menu'), \
+             patch('tkinter.Label'):
+            self.view = MindMapView(MagicMock(spec=tk.Tk))
+        view = self.view
+        view.editor.is_editing.return_value = False
+        view.graphics = GraphicsEngine(MagicMock())
+        view.graphics.get_text_size = MagicMock(return_value=(100, 30))
+        view.hit_tester = HitTester(view.graphics)
+        view.layout_engine = LayoutEngine(incremental=True)
+
+        model = view.model
+        self.branches = [model.add_node(model.root, f"B{i}") for i in range(4)]
+        self.leaves = [model.add_node(branch, f"L{i}") for branch in self.branches for i in range(5)]
+        self.sync()
+        view.hit_tester.sync_node = MagicMock(wraps=view.hit_tester.sync_node)
+
+    def sync(self):
+        view = self.view
+        moved = view.layout_engine.apply_layout(view.model, view.graphics, 0, 0)
+        return view._sync_node_grid(moved)
+
+    def indexed(self):
+        return set(self.view.node_grid.keys())
+
+    def test_unchanged_frame_does_not_walk_tree(self):
+        self.assertEqual(self.sync(), set())
+        self.view.hit_tester.sync_node.assert_not_called()
+
+    def test_edit_syncs_only_affected_nodes(self):
+        self.leaves[0].text = "Edited"
+        self.sync()
+        total = len(self.indexed())
+        self.assertLess(self.view.hit_tester.sync_node.call_count, total)
+
+    def test_collapse_and_expand(self):
+        branch = self.branches[1]
+        children = set(branch.children)
+        branch.collapsed = True
+        changed = self.sync()
+        self.assertTrue(children <= changed)
+        self.assertFalse(children & self.indexed())
+        self.assertFalse(children & set(self.view.hit_tester.nodes()))
+        # 展開後は位置が前回と同じでも索引に戻す
+        branch.collapsed = False
+        self.sync()
+        self.assertTrue(children <= self.indexed())
+        self.assertTrue(children <= set(self.view.hit_tester.nodes()))
+
+    def test_add_and_remove(self):
+        model = self.view.model
+        leaf = self.leaves[-1]
+        node = model.add_node(leaf, "New")
+        self.sync()
+        self.assertIn(node, self.indexed())
+        # 子を持った親は折りたたみアイコンの当たり判定を持つ
+        x1, y1, x2, y2 = self.view.graphics.get_collapse_icon_box(leaf)
+        self.assertIs(self.view.hit_tester.collapse_icon_at((x1 + x2) / 2, (y1 + y2) / 2), leaf)
+
+        branch = self.branches[0]
+        removed = {branch} | set(branch.children)
+        model.root.remove_child(branch)
+        self.sync()
+        self.assertFalse(removed & self.indexed())
+        self.assertFalse(removed & set(self.view.hit_tester.nodes()))
+
+if __name__ == '__main__':
+    unittest.main()
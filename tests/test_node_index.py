@@ -0,0 +1,60 @@
+import unittest
+from py_mind_memo.models import MindMapModel, Node
+
+class TestNodeIndex(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+
+    def assertIndexConsistent(self):
+        self.assertEqual(self.model.verify_node_index(), [])
+
+    def test_add_node_registers_node(self):
+        child = self.model.add_node(self.model.root, "Child")
+        grandchild = child.add_child("Grandchild")
+        self.assertIs(self.model.find_node_by_id(child.id), child)
+        self.assertIs(self.model.find_node_by_id(grandchild.id), grandchild)
+        self.assertIndexConsistent()
+
+    def test_remove_child_unregisters_subtree(self):
+        child = self.model.add_node(self.model.root, "Child")
+        grandchild = child.add_child("Grandchild")
+        self.model.root.remove_child(child)
+        self.assertIsNone(self.model.find_node_by_id(child.id))
+        self.assertIsNone(self.model.find_node_by_id(grandchild.id))
+        self.assertIndexConsistent()
+
+    def test_move_to_keeps_index(self):
+        p1 = self.model.add_node(self.model.root, "P1")
+        p2 = self.model.add_node(self.model.root, "P2")
+        child = p1.add_child("Child")
+        leaf = child.add_child("Leaf")
+        child.move_to(p2)
+        self.assertIs(self.model.find_node_by_id(leaf.id), leaf)
+        self.assertIndexConsistent()
+
+    def test_move_detached_node_into_model(self):
+        detached = Node("Detached")
+        sub = detached.add_child("Sub")
+        detached.move_to(self.model.root)
+        self.assertIs(self.model.find_node_by_id(sub.id), sub)
+        self.assertIndexConsistent()
+
+    def test_load_rebuilds_index(self):
+        child = self.model.add_node(self.model.root, "Child")
+        data = self.model.save()
+
+        new_model = MindMapModel()
+        old_root = new_model.root
+        new_model.load(data)
+        self.assertIsNotNone(new_model.find_node_by_id(child.id))
+        self.assertIsNone(new_model.find_node_by_id(old_root.id))
+        self.assertEqual(new_model.verify_node_index(), [])
+
+    def test_verify_detects_stale_entry(self):
+        child = self.model.add_node(self.model.root, "Child")
+        # 索引を経由せずにツリーから外すと不整合として検出される
+        self.model.root.children.remove(child)
+        self.assertNotEqual(self.model.verify_node_index(), [])
+
+if __name__ == '__main__':
+    unittest.main()
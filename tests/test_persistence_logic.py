@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import MagicMock, patch, mock_open
 import json
+import os
 import re
+import tempfile
 from py_mind_memo.persistence import PersistenceHandler
 from py_mind_memo.models import MindMapModel
 
@@ -31,25 +33,25 @@ class TestPersistenceLogic(unittest.TestCase):
         self.handler.on_save_as()
         self.assertEqual(mock_ask.call_args.kwargs['initialfile'], "VeryLongTitleThatExc")
 
-    @patch("py_mind_memo.persistence.open", new_callable=mock_open)
-    def test_write_to_file(self, mocked_open):
+    def test_write_to_file(self):
         self.model.add_node(self.model.root, "Child")
         self.model.is_modified = True
         
-        test_path = "test.json"
-        self.handler._write_to_file(test_path)
-        
-        mocked_open.assert_called_once_with(test_path, "w", encoding="utf-8")
-        self.assertEqual(self.handler.current_file_path, test_path)
-        self.assertFalse(self.model.is_modified)
+        with tempfile.TemporaryDirectory() as tmp:
+            test_path = os.path.join(tmp, "test.json")
+            self.assertTrue(self.handler._write_to_file(test_path))
+            self.handler.discard_journal()
+            
+            self.assertEqual(self.handler.current_file_path, test_path)
+            self.assertFalse(self.model.is_modified)
             
-        # 書き込まれた内容の検証
-        handle = mocked_open()
-        written_data = "".join(call.args[0] for call in handle.write.call_args_list)
-        data = json.loads(written_data)
+            # 書き込まれた内容の検証
+            with open(test_path, encoding="utf-8") as f:
+                data = json.load(f)
         self.assertEqual(data["root"]["text"], "Root Topic")
+        self.assertEqual([c["text"] for c in data["root"]["children"]], ["Child"])
 
-    @patch("py_mind_memo.persistence.open", new_callable=mock_open, read_data='{"root": {"text": "Loaded"}}')
+    @patch("py_mind_memo.persistence.open", new_callable=mock_open, read_data=b'{"root": {"text": "Loaded"}}')
     def test_on_open_logic(self, mocked_open):
         # filedialog をモック
         with patch("tkinter.filedialog.askopenfilename", return_value="open.json"):
@@ -59,5 +61,71 @@ class TestPersistenceLogic(unittest.TestCase):
             self.assertEqual(self.handler.current_file_path, "open.json")
             self.render_callback.assert_called_once()
 
+class TestBackgroundOpen(unittest.TestCase):
+    def setUp(self):
+        source = MindMapModel("Loaded")
+        for i in range(200):
+            source.add_node(source.root, f"Topic {i} " * 20)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "map.json")
+        PersistenceHandler(source, None)._perform_write_to_file(self.path, source.snapshot())
+
+        self.model = MindMapModel("Current")
+        self.render_callback = MagicMock()
+        self.status = []
+        # Tk のスレッドでの実行の予約は、呼び出し順に記録して後から実行する
+        self.scheduled = []
+        self.handler = PersistenceHandler(self.model, self.render_callback,
+                                          schedule=lambda func, *args: self.scheduled.append((func, args)),
+                                          status_callback=lambda text, transient=False: self.status.append(text))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def start(self):
+        with patch("py_mind_memo.persistence.threading.Thread") as thread, \
+             patch("tkinter.filedialog.askopenfilename", return_value=self.path):
+            self.handler.on_open()
+        return thread.call_args.kwargs["target"]
+
+    def run_scheduled(self):
+        for func, args in self.scheduled:
+            func(*args)
+        self.scheduled.clear()
+
+    def test_model_is_replaced_on_ui_thread(self):
+        worker = self.start()
+        self.assertIsNotNone(self.handler.open_job)
+        worker()
+        # ワーカースレッドはモデルを変更しない
+        self.assertEqual(self.model.root.text, "Current")
+        self.run_scheduled()
+        self.assertEqual(self.model.root.text, "Loaded")
+        self.assertEqual(len(self.model.root.children), 200)
+        self.assertEqual(self.handler.current_file_path, self.path)
+        self.assertIsNone(self.handler.open_job)
+        self.render_callback.assert_called_once()
+        self.assertEqual(self.status[-1], "")
+
+    def test_cancel(self):
+        worker = self.start()
+        self.assertTrue(self.handler.cancel_open())
+        worker()
+        self.run_scheduled()
+        self.assertEqual(self.model.root.text, "Current")
+        self.assertIsNone(self.handler.current_file_path)
+        self.render_callback.assert_not_called()
+        self.assertFalse(self.handler.cancel_open())
+
+    def test_result_of_replaced_job_is_discarded(self):
+        first = self.start()
+        second = self.start()
+        first()
+        self.run_scheduled()
+        self.assertEqual(self.model.root.text, "Current")
+        second()
+        self.run_scheduled()
+        self.assertEqual(self.model.root.text, "Loaded")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import MagicMock
+from py_mind_memo.photo_cache import PhotoImageCache
+
+def fake_photo(width, height):
+    photo = MagicMock()
+    photo.width.return_value = width
+    photo.height.return_value = height
+    return photo
+
+class TestPhotoImageCache(unittest.TestCase):
+    def setUp(self):
+        self.factory = MagicMock(side_effect=lambda raw: fake_photo(10, 10))  # 400 bytes each
+        self.cache = PhotoImageCache(max_bytes=1000, factory=self.factory)
+
+    def test_same_content_shares_photo(self):
+        # 別オブジェクトでも内容が同じなら同じ PhotoImage を返す
+        data1 = b"icon-png"
+        data2 = bytes(bytearray(data1))
+        self.assertIsNot(data1, data2)
+        self.assertIs(self.cache.get(data1), self.cache.get(data2))
+        self.assertEqual(self.factory.call_count, 1)
+
+    def test_lru_eviction_by_pixel_bytes(self):
+        a, b, c = b"a", b"b", b"c"
+        self.cache.get(a)
+        self.cache.get(b)
+        self.cache.get(a)  # a を最近使用にする
+        self.cache.get(c)  # 1200 bytes > 1000 なので最古の b を破棄
+        self.assertIn(self.cache.key_for(a), self.cache)
+        self.assertNotIn(self.cache.key_for(b), self.cache)
+        self.assertIn(self.cache.key_for(c), self.cache)
+        self.assertEqual(self.cache.total_bytes, 800)
+
+    def test_decode_failure_returns_none(self):
+        self.factory.side_effect = ValueError("broken")
+        self.assertIsNone(self.cache.get(b"broken"))
+        self.assertEqual(len(self.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import MagicMock
+from py_mind_memo.layout import LayoutEngine
+from py_mind_memo.models import MindMapModel
+from py_mind_memo.progressive import ProgressiveReveal
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+class TestProgressiveReveal(unittest.TestCase):
+    def setUp(self):
+        # 各階層のノード数: 1, 3, 9, 27, 81
+        self.model = MindMapModel("Root")
+        level = [self.model.root]
+        for depth in range(4):
+            level = [n.add_child(f"{depth}-{i}") for n in level for i in range(3)]
+        self.graphics = MagicMock()
+        self.graphics.get_text_size.return_value = (100, 40)
+
+    def test_initial_depth_follows_node_budget(self):
+        self.assertEqual(ProgressiveReveal(self.model.root, print, initial_nodes=13).depth, 2)
+        self.assertEqual(ProgressiveReveal(self.model.root, print, initial_nodes=12).depth, 1)
+        # ルートの子は常に表示する
+        self.assertEqual(ProgressiveReveal(self.model.root, print, initial_nodes=1).depth, 1)
+        self.assertTrue(ProgressiveReveal(self.model.root, print, initial_nodes=1000).done)
+
+    def test_step_measures_next_level_within_budget(self):
+        measured = []
+        reveal = ProgressiveReveal(self.model.root, measured.append, initial_nodes=13, clock=FakeClock())
+        self.assertTrue(reveal.step(1.0))
+        self.assertEqual(reveal.depth, 3)
+        self.assertEqual(len(measured), 27)
+        self.assertTrue(all(n.parent.parent.parent is self.model.root for n in measured))
+        # 時間を使い切ると階層の途中で中断し、次の呼び出しで続きから計算する
+        self.assertFalse(reveal.step(0))
+        self.assertEqual(len(measured), 27 + 32)
+        self.assertEqual(reveal.depth, 3)
+        while not reveal.done:
+            reveal.step(1.0)
+        self.assertEqual(reveal.depth, 4)
+        self.assertEqual(len(measured), 27 + 81)
+
+    def test_collapsed_subtrees_are_skipped(self):
+        for child in self.model.root.children:
+            child.collapsed = True
+        self.assertTrue(ProgressiveReveal(self.model.root, print, initial_nodes=1).done)
+
+    def test_layout_depth_limit(self):
+        engine = LayoutEngine(incremental=True)
+        engine.max_depth = 1
+        engine.apply_layout(self.model, self.graphics, 0, 0)
+        measured = {call.args[0] for call in self.graphics.get_text_size.call_args_list}
+        self.assertEqual(measured, {self.model.root} | set(self.model.root.children))
+        shown = list(self.model.walk(visible_only=True, max_depth=engine.max_depth))
+        self.assertEqual(len(shown), 4)
+        self.assertFalse(engine.within_max_depth(self.model.root.children[0].children[0]))
+
+        # 上限を外すと全体を配置し、上限なしで配置した場合と同じ位置になる
+        engine.max_depth = None
+        engine.apply_layout(self.model, self.graphics, 0, 0)
+        positions = [(n.x, n.y) for n in self.model.walk()]
+        LayoutEngine().apply_layout(self.model, self.graphics, 0, 0)
+        self.assertEqual(positions, [(n.x, n.y) for n in self.model.walk()])
+
+if __name__ == '__main__':
+    unittest.main()
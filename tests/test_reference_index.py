@@ -0,0 +1,59 @@
+import unittest
+from py_mind_memo.models import MindMapModel, Reference
+
+class TestReferenceIndex(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.a1 = self.a.add_child("A1")
+        self.b = self.model.add_node(self.model.root, "B")
+
+    def test_add_and_lookup(self):
+        ref = self.model.add_reference(Reference(self.a.id, self.b.id))
+        self.assertIs(self.model.find_reference_by_id(ref.id), ref)
+        self.assertIs(self.model.find_reference(self.a.id, self.b.id), ref)
+        self.assertIsNone(self.model.find_reference(self.b.id, self.a.id))
+        self.assertEqual(self.model.outgoing_references(self.a.id), [ref])
+        self.assertEqual(self.model.incoming_references(self.b.id), [ref])
+        self.assertEqual(self.model.references_of(self.b.id), [ref])
+
+    def test_list_operations_keep_index(self):
+        # 既存コードと同様にリストとして操作しても索引に反映される
+        ref = Reference(self.a.id, self.b.id)
+        self.model.references.append(ref)
+        self.assertIs(self.model.find_reference_by_id(ref.id), ref)
+        self.model.references.remove(ref)
+        self.assertIsNone(self.model.find_reference_by_id(ref.id))
+        self.assertEqual(self.model.references_of(self.a.id), [])
+
+    def test_remove_reference(self):
+        ref = self.model.add_reference(Reference(self.a.id, self.b.id))
+        self.assertTrue(self.model.remove_reference(ref))
+        self.assertFalse(self.model.remove_reference(ref))
+        self.assertEqual(self.model.references, [])
+
+    def test_node_deletion_drops_subtree_references(self):
+        kept = self.model.add_reference(Reference(self.b.id, self.model.root.id))
+        self.model.add_reference(Reference(self.a1.id, self.b.id))
+        self.model.add_reference(Reference(self.b.id, self.a.id))
+        self.model.root.remove_child(self.a)
+        self.assertEqual(self.model.references, [kept])
+        self.assertEqual(self.model.references_of(self.b.id), [kept])
+        self.assertEqual(self.model.references_of(self.a1.id), [])
+
+    def test_move_keeps_references(self):
+        ref = self.model.add_reference(Reference(self.a1.id, self.b.id))
+        self.a1.move_to(self.b)
+        self.assertEqual(self.model.references, [ref])
+
+    def test_load_rebuilds_index(self):
+        ref = self.model.add_reference(Reference(self.a1.id, self.b.id))
+        data = self.model.save()
+        new_model = MindMapModel()
+        new_model.load(data)
+        restored = new_model.find_reference_by_id(ref.id)
+        self.assertIsNotNone(restored)
+        self.assertEqual(new_model.outgoing_references(self.a1.id), [restored])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tkinter as tk
+from py_mind_memo.view import MindMapView
+
+class TestRenderScheduler(unittest.TestCase):
+    def setUp(self):
+        # UIコンポーネントをすべてモック化して MindMapView を初期化
+        self.root = MagicMock(spec=tk.Tk)
+        with patch('py_mind_memo.view.GraphicsEngine'), \
+             patch('py_mind_memo.view.LayoutEngine'), \
+             patch('py_mind_memo.view.NodeEditor'), \
+             patch('py_mind_memo.view.DragDropHandler'), \
+             patch('py_mind_memo.view.KeyboardNavigator'), \
+             patch('py_mind_memo.view.PersistenceHandler'), \
+             patch('py_mind_memo.view.MindMapView.render'), \
+             patch('tkinter.Canvas'), \
+             patch('tkinter.Frame'), \
+             patch('tkinter.Scrollbar'), \
+             patch('tkinter.Menu'), \
+             patch('tkinter.Label'):
+            self.view = MindMapView(self.root)
+        self.view.render = MagicMock()
+        self.view.ensure_node_visible = MagicMock()
+        self.view.editor.is_editing.return_value = False
+        self.root.after_idle.reset_mock()
+
+    def test_requests_are_coalesced(self):
+        """複数の描画要求はアイドル時の1回の描画にまとめられること"""
+        for _ in range(5):
+            self.view.request_render()
+        self.root.after_idle.assert_called_once_with(self.view.flush_render)
+        self.view.render.assert_not_called()
+
+        self.view.flush_render()
+        self.view.render.assert_called_once_with(force_center=False)
+
+        # 予約がなければ何もしない
+        self.view.flush_render()
+        self.view.render.assert_called_once()
+
+    def test_force_center_is_merged(self):
+        self.view.request_render(force_center=True)
+        self.view.request_render()
+        self.view.flush_render()
+        self.view.render.assert_called_once_with(force_center=True)
+
+        # フラグは描画ごとにリセットされる
+        self.view.request_render()
+        self.view.flush_render()
+        self.view.render.assert_called_with(force_center=False)
+
+    def test_reveal_node_after_render(self):
+        node = self.view.model.add_node(self.view.model.root, "Child")
+        self.view.request_render(reveal_node=node)
+        self.view.flush_render()
+        self.view.ensure_node_visible.assert_called_once_with(node)
+
+    def test_delete_key_repeat_renders_once(self):
+        root = self.view.model.root
+        for i in range(3):
+            self.view.model.add_node(root, f"Child {i}")
+        for child in list(root.children):
+            self.view.selected_node = child
+            self.view.on_delete(None)
+        self.assertEqual(root.children, [])
+        self.view.render.assert_not_called()
+        self.view.flush_render()
+        self.view.render.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from py_mind_memo.models import MindMapModel, Reference
+
+class TestModelSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.a1 = self.a.add_child("A1")
+        self.a1.image_data = b"data"
+        self.b1 = self.b.add_child("B1")
+        self.ref = self.model.add_reference(Reference(self.a1.id, self.b1.id))
+
+    def test_to_dict_matches_save(self):
+        self.assertEqual(self.model.snapshot().to_dict(), self.model.save())
+
+    def test_snapshot_is_not_affected_by_later_edits(self):
+        snapshot = self.model.snapshot()
+        expected = self.model.save()
+        self.a1.text = "Edited"
+        self.b1.move_to(self.a)
+        self.model.set_reference_control_point(self.ref, "cp1", 10, 20)
+        self.assertEqual(snapshot.to_dict(), expected)
+        self.assertEqual(self.model.snapshot().to_dict(), self.model.save())
+
+    def test_unchanged_subtrees_are_shared(self):
+        first = self.model.snapshot()
+        self.a1.text = "Edited"
+        second = self.model.snapshot()
+        self.assertIsNot(second.root, first.root)
+        self.assertIs(self.b.snapshot_record(), first.root[-1][1])
+        self.assertIs(second.root[-1][1], first.root[-1][1])
+
+    def test_direction_and_color_changes_are_captured(self):
+        self.model.snapshot()
+        self.a1.direction = "left"
+        self.a1.color = "#123456"
+        self.assertEqual(self.model.snapshot().to_dict(), self.model.save())
+
+    def test_revision(self):
+        self.model.is_modified = True
+        self.assertEqual(self.model.snapshot().revision, self.model.modification_count)
+
+    def test_deep_tree(self):
+        node = self.b1
+        for i in range(5000):
+            node = node.add_child(f"D{i}")
+        data = self.model.snapshot().to_dict()
+        depth = 0
+        current = data["root"]
+        while current["children"]:
+            current = current["children"][-1]
+            depth += 1
+        self.assertEqual(depth, 5002)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from py_mind_memo.spatial_index import SpatialGrid, bboxes_intersect
+
+class TestSpatialGrid(unittest.TestCase):
+    def setUp(self):
+        self.grid = SpatialGrid(cell_size=100)
+
+    def test_query_returns_intersecting_keys(self):
+        self.grid.insert("a", (0, 0, 50, 50))
+        self.grid.insert("b", (500, 500, 560, 540))
+        self.grid.insert("c", (-300, -20, -250, 20))
+        self.assertEqual(self.grid.query((-10, -10, 100, 100)), {"a"})
+        self.assertEqual(self.grid.query((-400, -400, 1000, 1000)), {"a", "b", "c"})
+        self.assertEqual(self.grid.query((200, 200, 300, 300)), set())
+
+    def test_query_excludes_same_cell_non_overlapping(self):
+        # 同じセルにあっても矩形が交差しないものは返さない
+        self.grid.insert("a", (0, 0, 10, 10))
+        self.assertEqual(self.grid.query((20, 20, 30, 30)), set())
+
+    def test_insert_replaces_and_remove(self):
+        self.grid.insert("a", (0, 0, 50, 50))
+        self.grid.insert("a", (1000, 1000, 1050, 1050))
+        self.assertEqual(len(self.grid), 1)
+        self.assertEqual(self.grid.query((0, 0, 60, 60)), set())
+        self.assertEqual(self.grid.query_point(1020, 1020), ["a"])
+        self.grid.remove("a")
+        self.assertNotIn("a", self.grid)
+        self.assertEqual(self.grid.query_point(1020, 1020), [])
+
+    def test_bounds_follow_updates(self):
+        self.assertIsNone(self.grid.bounds())
+        self.grid.insert("a", (0, 0, 50, 50))
+        self.grid.insert("b", (-100, 200, -50, 260))
+        self.assertEqual(self.grid.bounds(), (-100, 0, 50, 260))
+        self.grid.remove("b")
+        self.assertEqual(self.grid.bounds(), (0, 0, 50, 50))
+
+    def test_bboxes_intersect(self):
+        self.assertTrue(bboxes_intersect((0, 0, 10, 10), (10, 10, 20, 20)))
+        self.assertFalse(bboxes_intersect((0, 0, 10, 10), (11, 0, 20, 10)))
+
+if __name__ == '__main__':
+    unittest.main()
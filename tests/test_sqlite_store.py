@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from py_mind_memo.json_loader import LoadError
+from py_mind_memo.lazy_payload import LazyPayload
+from py_mind_memo.models import MindMapModel, Reference
+from py_mind_memo.persistence import PersistenceHandler, load_file
+from py_mind_memo.snapshot import diff_trees
+from py_mind_memo.sqlite_store import SqliteStore, load_database
+
+class TestSqliteStore(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root 日本語")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.a1 = self.a.add_child("A1")
+        self.b1 = self.b.add_child("B1")
+        self.b1.add_child("B1a")
+        self.image = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+        self.a1.image_data = self.image
+        self.b.icon_data = b"icon"
+        self.b.collapsed = True
+        self.ref = self.model.add_reference(Reference(self.a1.id, self.b.id))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "map.sqlite")
+        self.handler = PersistenceHandler(self.model, lambda **kwargs: None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def save(self):
+        self.handler._perform_write_to_file(self.path, self.model.snapshot(), indent=None)
+
+    def load(self):
+        model = MindMapModel()
+        model.load_tree(*load_file(self.path))
+        return model
+
+    def assertStored(self):
+        model = self.load()
+        self.assertEqual(model.save(), self.model.save())
+        self.assertEqual(model.verify_node_index(), [])
+
+    def test_round_trip(self):
+        self.save()
+        self.assertStored()
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_only_changed_nodes_are_written(self):
+        store = SqliteStore(self.path)
+        self.assertEqual(store.save(self.model.snapshot()), 6)
+        self.b1.text = "Edited"
+        self.assertEqual(store.save(self.model.snapshot()), 1)
+        self.assertEqual(store.save(self.model.snapshot()), 0)
+
+    def test_structure_changes(self):
+        self.save()
+        self.model.move_node_up(self.b)
+        self.save()
+        self.assertStored()
+        self.b1.move_to(self.a1)
+        self.save()
+        self.assertStored()
+        self.model.add_node(self.b, "New").add_child("Deep")
+        self.a.remove_child(self.a1)  # 移動した B1 を含むサブツリーを削除する
+        self.model.remove_reference(self.ref)
+        self.save()
+        self.assertStored()
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0], 5)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0], 1)
+
+    def test_diff_of_moved_subtree(self):
+        old = self.model.snapshot().root
+        self.b1.move_to(self.a)
+        rows, deleted = diff_trees(old, self.model.snapshot().root)
+        # 移動したノードの行だけを書き換え、その子孫は書き込まない
+        self.assertEqual(deleted, [])
+        self.assertIn(self.b1.id, rows)
+        self.assertNotIn(self.b1.children[0].id, rows)
+        self.assertEqual(rows[self.b1.id][1:3], (self.a.id, 1))
+
+    def test_images_are_deferred_and_survive_removal(self):
+        self.save()
+        model = MindMapModel()
+        handler = PersistenceHandler(model, lambda **kwargs: None)
+        handler._apply_loaded(self.path, *load_database(self.path))
+        # 読み込んだ内容を基準に差分だけを書き込む
+        self.assertEqual(handler.sqlite_store.save(model.snapshot()), 0)
+        node = model.find_node_by_id(self.a1.id)
+        payload = node.image_payload
+        self.assertIsInstance(payload, LazyPayload)
+        self.assertEqual(node.image_data, self.image)
+        # 取り消し履歴だけが持つデータは、行を削除する前にメモリへ読み込まれる
+        node.image_data = None
+        handler._perform_write_to_file(self.path, model.snapshot())
+        self.assertEqual(payload.load(), self.image)
+
+    def test_invalid_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a database" * 100)
+        with self.assertRaises(LoadError):
+            load_database(self.path)
+        os.remove(self.path)
+        sqlite3.connect(self.path).close()
+        with self.assertRaises(LoadError):
+            load_database(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
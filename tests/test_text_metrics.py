@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import MagicMock
+from py_mind_memo.graphics import GraphicsEngine
+from py_mind_memo.text_metrics import TextMeasurer
+
+class TestTextMeasurer(unittest.TestCase):
+    def setUp(self):
+        self.font = MagicMock()
+        self.font.measure.side_effect = lambda char: 10
+        self.font.metrics.return_value = 16
+        self.font_getter = MagicMock(return_value=self.font)
+        self.measurer = TextMeasurer(self.font_getter, max_layouts=2)
+
+    def test_glyph_width_is_measured_once_per_font_and_char(self):
+        key = ("Arial", 10, "normal")
+        self.assertEqual(self.measurer.text_width(key, "ああいああ"), 50)
+        self.assertEqual(self.font.measure.call_count, 2)
+        self.measurer.text_width(("Arial", 10, "bold"), "あ")
+        self.assertEqual(self.font.measure.call_count, 3)
+
+    def test_layout_memo_is_bounded(self):
+        for i in range(3):
+            self.measurer.put_layout(("t", i), object())
+        self.assertIsNone(self.measurer.get_layout(("t", 0)))
+        self.assertIsNotNone(self.measurer.get_layout(("t", 2)))
+
+class TestWrapCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = GraphicsEngine(MagicMock())
+        self.font = MagicMock()
+        self.font.measure.side_effect = lambda char: 10
+        self.font.metrics.return_value = 16
+        self.engine._get_font = MagicMock(return_value=self.font)
+        self.engine.measurer._get_font = self.engine._get_font
+
+    def test_wrap_result_is_shared(self):
+        text = "あいうえおかきくけこ" * 30
+        first = self.engine._layout_rich_text(text, ("Arial", 10), 50)
+        calls = self.font.measure.call_count
+        second = self.engine._layout_rich_text(text, ("Arial", 10), 50)
+        self.assertIs(first, second)
+        self.assertEqual(self.font.measure.call_count, calls)
+        self.assertEqual(first.block_width, 50)
+        self.assertEqual(len(first.lines), 60)
+        self.assertEqual(first.height, 60 * 16)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from py_mind_memo.events import ChangeType
+from py_mind_memo.models import MindMapModel, Reference
+
+class TestTransaction(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.a1 = self.a.add_child("A1")
+        self.ref = self.model.add_reference(Reference(self.a1.id, self.b.id))
+        self.model.is_modified = False
+        self.batches = []
+        self.model.subscribe(self.batches.append)
+
+    def test_commit_is_single_modification_and_batch(self):
+        count = self.model.modification_count
+        with self.model.transaction():
+            for i in range(1000):
+                self.model.add_node(self.model.root, f"N{i}")
+            self.a1.move_to(self.b)
+            self.model.move_node_down(self.a)
+            self.assertFalse(self.model.is_modified)
+        self.assertTrue(self.model.is_modified)
+        self.assertEqual(self.model.modification_count, count + 1)
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0]), 1002)
+        self.assertEqual(self.model.verify_node_index(), [])
+
+    def test_balanced_directions_match_non_transactional(self):
+        other = MindMapModel("Root")
+        with self.model.transaction():
+            for i in range(20):
+                self.model.add_node(self.model.root, f"N{i}")
+        for i in range(22):
+            other.add_node(other.root, f"N{i}")
+        self.assertEqual([c.direction for c in self.model.root.children],
+                         [c.direction for c in other.root.children])
+
+    def test_rollback_on_exception(self):
+        before = self.model.save()
+        count = self.model.modification_count
+        with self.assertRaises(RuntimeError):
+            with self.model.transaction():
+                new = self.model.add_node(self.a, "New")
+                new.text = "Changed"
+                self.a1.move_to(self.b)
+                self.a1.text = "Renamed"
+                self.model.move_node_down(self.a)
+                self.b.collapsed = True
+                self.model.set_reference_control_point(self.ref, "cp1", 1, 2)
+                self.model.root.remove_child(self.b)
+                raise RuntimeError("boom")
+        self.assertEqual(self.model.save(), before)
+        self.assertEqual(self.model.references, [self.ref])
+        self.assertIs(self.model.find_node_by_id(self.a1.id).parent, self.a)
+        self.assertEqual(self.model.verify_node_index(), [])
+        self.assertEqual(self.model.modification_count, count)
+        self.assertFalse(self.model.is_modified)
+        self.assertEqual(self.batches, [])
+
+    def test_nested_rollback_keeps_outer_changes(self):
+        with self.model.transaction():
+            self.a.text = "Outer"
+            try:
+                with self.model.transaction():
+                    self.b.text = "Inner"
+                    raise ValueError()
+            except ValueError:
+                pass
+        self.assertEqual(self.a.text, "Outer")
+        self.assertEqual(self.b.text, "B")
+        self.assertEqual([e.type for e in self.batches[0]], [ChangeType.TEXT_CHANGED])
+
+if __name__ == '__main__':
+    unittest.main()
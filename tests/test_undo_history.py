@@ -0,0 +1,124 @@
+import time
+import unittest
+from py_mind_memo.history import UndoHistory
+from py_mind_memo.models import MindMapModel, Reference
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestUndoHistory(unittest.TestCase):
+    def setUp(self):
+        self.model = MindMapModel("Root")
+        self.a = self.model.add_node(self.model.root, "A")
+        self.b = self.model.add_node(self.model.root, "B")
+        self.a1 = self.a.add_child("A1")
+        self.ref = self.model.add_reference(Reference(self.a1.id, self.b.id))
+        self.clock = FakeClock()
+        self.history = UndoHistory(self.model, clock=self.clock)
+
+    def snapshot(self):
+        return self.model.save()
+
+    def assertUndoRedo(self, action):
+        before = self.snapshot()
+        action()
+        after = self.snapshot()
+        self.assertNotEqual(before, after)
+        self.history.undo()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(self.model.verify_node_index(), [])
+        self.history.redo()
+        self.assertEqual(self.snapshot(), after)
+        self.assertEqual(self.model.verify_node_index(), [])
+
+    def test_undo_redo_add_node(self):
+        self.assertUndoRedo(lambda: self.model.add_node(self.a1, "New"))
+
+    def test_undo_redo_delete_restores_references(self):
+        self.assertUndoRedo(lambda: self.model.root.remove_child(self.a))
+        self.model.root.remove_child(self.a)
+        self.history.undo()
+        self.assertIs(self.model.find_reference(self.a1.id, self.b.id), self.ref)
+
+    def test_undo_redo_move(self):
+        def move():
+            with self.model.transaction():
+                self.a1.move_to(self.b)
+                self.a1.update_direction_recursive(self.b.direction)
+        self.assertUndoRedo(move)
+
+    def test_undo_redo_text_and_reorder(self):
+        self.assertUndoRedo(lambda: setattr(self.a1, "text", "Edited"))
+        self.assertUndoRedo(lambda: self.model.move_node_down(self.a))
+
+    def test_transaction_is_single_step(self):
+        with self.model.transaction():
+            for i in range(10):
+                self.model.add_node(self.b, f"N{i}")
+        self.assertEqual(len(self.history._undo), 1)
+        self.history.undo()
+        self.assertEqual(self.b.children, [])
+        self.assertFalse(self.history.can_undo())
+
+    def test_new_change_clears_redo(self):
+        self.a.text = "X"
+        self.history.undo()
+        self.assertTrue(self.history.can_redo())
+        self.b.text = "Y"
+        self.assertFalse(self.history.can_redo())
+
+    def test_control_point_drag_is_coalesced(self):
+        for i in range(50):
+            self.model.set_reference_control_point(self.ref, "cp1", i, i)
+            self.clock.now += 0.02
+        self.assertEqual(len(self.history._undo), 1)
+        self.history.undo()
+        self.assertIsNone(self.ref.cp1_x)
+
+        self.model.set_reference_control_point(self.ref, "cp1", 1, 1)
+        self.history.break_coalescing()
+        self.model.set_reference_control_point(self.ref, "cp1", 2, 2)
+        self.assertEqual(len(self.history._undo), 2)
+
+    def test_coalescing_window_expires(self):
+        self.a.text = "1"
+        self.clock.now += 5
+        self.a.text = "2"
+        self.assertEqual(len(self.history._undo), 2)
+
+    def test_memory_budget_drops_oldest_steps(self):
+        history = UndoHistory(self.model, memory_budget=10000, clock=self.clock)
+        for i in range(20):
+            self.b.text = str(i) * 1000
+            self.clock.now += 5
+        self.assertLessEqual(history.memory_usage, 10000)
+        self.assertLess(len(history._undo), 20)
+        self.assertGreater(len(history._undo), 0)
+
+    def test_load_clears_history(self):
+        self.a.text = "X"
+        self.model.load(self.model.save())
+        self.assertFalse(self.history.can_undo())
+
+    def test_undo_on_large_map_is_fast(self):
+        model = MindMapModel("Root")
+        with model.transaction():
+            parents = [model.add_node(model.root, f"P{i}") for i in range(50)]
+            for i in range(50000):
+                parents[i % 50].add_child(f"N{i}")
+        history = UndoHistory(model)
+        leaf = parents[7].children[3]
+        leaf.text = "Edited"
+        start = time.perf_counter()
+        history.undo()
+        history.redo()
+        elapsed = time.perf_counter() - start
+        self.assertEqual(leaf.text, "Edited")
+        self.assertLess(elapsed, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()